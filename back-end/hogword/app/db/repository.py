@@ -0,0 +1,234 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List
+from app.db.supabase import client
+from app.services import metrics
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# The Supabase client is synchronous, so every `.execute()` is pushed onto a bounded
+# thread pool instead of blocking the event loop. The bound caps concurrent PostgREST
+# requests per worker.
+DB_MAX_WORKERS = int(os.environ.get("DB_MAX_WORKERS", "32"))
+
+_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="supabase")
+
+
+async def execute(query):
+    """Run a prepared Supabase query builder without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    with metrics.track("supabase"):
+        return await loop.run_in_executor(_executor, query.execute)
+
+
+# --- user_state ---
+
+async def get_current_log_id(user_id: str) -> Optional[str]:
+    response = await execute(
+        client().table("user_state").select("current_log_id").eq("user_id", user_id)
+    )
+    if not response.data:
+        return None
+    return response.data[0]["current_log_id"]
+
+
+async def set_current_log(user_id: str, log_id: str):
+    await execute(
+        client().table("user_state").upsert(
+            {"user_id": user_id, "current_log_id": log_id}, on_conflict="user_id"
+        )
+    )
+
+
+async def set_current_logs(states: List[dict]):
+    """Upsert many `{user_id, current_log_id}` pointers in a single request."""
+    await execute(client().table("user_state").upsert(states, on_conflict="user_id"))
+
+
+# --- practice_logs ---
+
+async def get_log(log_id: str) -> Optional[dict]:
+    response = await execute(client().table("practice_logs").select("*").eq("id", log_id))
+    if response.data:
+        return response.data[0]
+    return None
+
+
+async def insert_log(log: dict) -> dict:
+    response = await execute(client().table("practice_logs").insert(log))
+    return response.data[0]
+
+
+async def insert_logs(logs: List[dict]) -> List[dict]:
+    """Insert many logs in a single request."""
+    if not logs:
+        return []
+    response = await execute(client().table("practice_logs").insert(logs))
+    return response.data
+
+
+async def upsert_logs(logs: List[dict]):
+    """
+    Insert or update many logs in a single request. Every row has the same columns; columns left
+    out keep their stored values.
+    """
+    await execute(client().table("practice_logs").upsert(logs, on_conflict="id"))
+
+
+async def update_log(log_id: str, payload: dict):
+    await execute(client().table("practice_logs").update(payload).eq("id", log_id))
+
+
+async def list_provisional_logs(limit: int) -> List[dict]:
+    """Oldest logs graded by the fallback scorer, across all users (served by a partial index)."""
+    response = await execute(
+        client().table("practice_logs")
+        .select("id,user_id,word,sentence")
+        .eq("provisional", True)
+        .order("created_at")
+        .limit(limit)
+    )
+    return response.data
+
+
+async def regrade_log(log_id: str, payload: dict) -> bool:
+    """Replace a provisional grade; returns False if the log was already re-graded."""
+    response = await execute(
+        client().table("practice_logs").update(payload).eq("id", log_id).eq("provisional", True)
+    )
+    return bool(response.data)
+
+
+async def list_logs(
+    user_id: str,
+    columns: str = "*",
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    desc: bool = False,
+) -> List[dict]:
+    """List a user's logs ordered by `created_at`, optionally filtered by status and start time."""
+    query = client().table("practice_logs").select(columns).eq("user_id", user_id)
+    if status:
+        query = query.eq("status", status)
+    if since:
+        query = query.gte("created_at", since)
+    response = await execute(query.order("created_at", desc=desc))
+    return response.data
+
+
+async def list_logs_for_users(user_ids: List[str], columns: str = "*") -> List[dict]:
+    """List the logs of several users (e.g. a class) ordered by `created_at`."""
+    response = await execute(
+        client().table("practice_logs").select(columns).in_("user_id", user_ids).order("created_at")
+    )
+    return response.data
+
+
+# --- word session procedures (schema.sql) ---
+# Each is one round trip and runs under a lock on the user's user_state row.
+
+async def fetch_word_session(user_id: str) -> Optional[dict]:
+    response = await execute(client().rpc("fetch_word_session", {"p_user_id": user_id}))
+    return response.data or None
+
+
+async def generate_word_session(user_id: str, word: str, difficulty: str) -> dict:
+    response = await execute(
+        client().rpc("generate_word_session", {"p_user_id": user_id, "p_word": word, "p_difficulty": difficulty})
+    )
+    return response.data
+
+
+async def complete_word_session(user_id: str, log_id: str, result: dict) -> Optional[dict]:
+    response = await execute(
+        client().rpc("complete_word_session", {"p_user_id": user_id, "p_log_id": log_id, "p_result": result})
+    )
+    return response.data or None
+
+
+async def list_logs_page(
+    user_id: str,
+    columns: str,
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    before: Optional[tuple] = None,
+    limit: Optional[int] = None,
+    until: Optional[str] = None,
+    desc: bool = True,
+) -> List[dict]:
+    """
+    One page of a user's logs, keyset-paginated on (`created_at`, `id`), newest first unless `desc=False`.
+    `before` is the (created_at, id) of the last row of the previous page, so this page starts past it
+    in the requested order. `until` is an exclusive upper bound on `created_at`.
+    """
+    query = client().table("practice_logs").select(columns).eq("user_id", user_id)
+    if status:
+        query = query.eq("status", status)
+    if since:
+        query = query.gte("created_at", since)
+    if until:
+        query = query.lt("created_at", until)
+    if before:
+        created_at, log_id = before
+        op = "lt" if desc else "gt"
+        query = query.or_(
+            f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}.{log_id})'
+        )
+    query = query.order("created_at", desc=desc).order("id", desc=desc)
+    if limit:
+        query = query.limit(limit)
+    response = await execute(query)
+    return response.data
+
+
+async def latest_log_update(user_id: str, status: Optional[str] = None, since: Optional[str] = None) -> tuple:
+    """(number of matching logs, latest `updated_at` among them) in a single small request."""
+    query = client().table("practice_logs").select("updated_at", count="exact").eq("user_id", user_id)
+    if status:
+        query = query.eq("status", status)
+    if since:
+        query = query.gte("created_at", since)
+    response = await execute(query.order("updated_at", desc=True).limit(1))
+    latest = response.data[0]["updated_at"] if response.data else None
+    return response.count or 0, latest
+
+
+# --- compaction (schema.sql) ---
+
+async def compaction_candidates(before: str, limit: int) -> List[str]:
+    """Up to `limit` users with logs that can be compacted up to `before`."""
+    response = await execute(client().rpc("compaction_candidates", {"p_before": before, "p_limit": limit}))
+    return [row["user_id"] for row in response.data or []]
+
+
+async def compaction_cutoff(user_id: str, before: str) -> Optional[str]:
+    response = await execute(client().rpc("compaction_cutoff", {"p_user_id": user_id, "p_before": before}))
+    return response.data
+
+
+async def compact_logs(user_id: str, before: str) -> dict:
+    """Fold the user's logs before their cutoff into the rollup tables and delete them, atomically."""
+    response = await execute(client().rpc("compact_practice_logs", {"p_user_id": user_id, "p_before": before}))
+    return response.data
+
+
+async def fetch_log_rollups(user_ids: List[str]) -> dict:
+    """{user_id: {"compacted_before", "words", "attempts"}} for the users with compacted history."""
+    response = await execute(client().rpc("fetch_log_rollups", {"p_user_ids": user_ids}))
+    return response.data or {}
+
+
+# --- background job leases (schema.sql) ---
+
+async def acquire_lease(name: str, holder: str, seconds: float) -> bool:
+    """Take or extend the lease `name` for `seconds`; False while another holder has it."""
+    response = await execute(
+        client().rpc("acquire_lease", {"p_name": name, "p_holder": holder, "p_seconds": seconds})
+    )
+    return bool(response.data)
+
+
+async def release_lease(name: str, holder: str):
+    await execute(client().rpc("release_lease", {"p_name": name, "p_holder": holder}))
@@ -1,4 +1,12 @@
+"""
+The worker's Supabase client, created on first use rather than at import.
+
+`startup` creates it from the FastAPI lifespan, so every worker process (including workers forked
+from a preloaded gunicorn master) gets its own client and connections, and importing the app
+without credentials (tests, tooling) does not fail.
+"""
 import os
+from typing import Optional
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
@@ -7,7 +15,27 @@ load_dotenv()
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
 
-if not url or not key:
-    raise ValueError("Supabase credentials not found in environment variables.")
+_client: Optional[Client] = None
+
+
+def client() -> Client:
+    global _client
+    if _client is None:
+        if not url or not key:
+            raise ValueError("Supabase credentials not found in environment variables.")
+        _client = create_client(url, key)
+    return _client
+
+
+def is_ready() -> bool:
+    return _client is not None
+
+
+async def startup():
+    """Create the client. Called from the FastAPI lifespan."""
+    client()
+
 
-supabase: Client = create_client(url, key)
+async def shutdown():
+    global _client
+    _client = None
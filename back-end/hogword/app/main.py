@@ -1,8 +1,56 @@
+import os
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, words, validation, analytics, logs
+from app.middleware import CompressionMiddleware, MetricsMiddleware
+from app.db import supabase
+from app.routers import auth, words, validation, analytics, logs, export, ops, metrics, health
+from app.services import n8n_service, validation_jobs, admission, regrade, write_behind, auth_service, compaction, vocabulary, cache, validation_cache
 
-app = FastAPI(title="Hogword API")
+load_dotenv()
+
+# Responses smaller than this many bytes are not compressed; 0 turns compression off
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients and data are created here, once per worker process, not at import
+    app.state.ready = False
+    await supabase.startup()
+    await cache.startup()
+    await validation_cache.startup()
+    await vocabulary.startup()
+    await admission.startup()
+    await auth_service.startup()
+    await n8n_service.startup()
+    await write_behind.startup()
+    await validation_jobs.startup()
+    await regrade.startup()
+    await compaction.startup()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    await compaction.shutdown()
+    await regrade.shutdown()
+    await validation_jobs.shutdown()
+    # After the workers that write, so their last writes are drained too
+    await write_behind.shutdown()
+    await n8n_service.shutdown()
+    await auth_service.shutdown()
+    await admission.shutdown()
+    await validation_cache.shutdown()
+    await cache.shutdown()
+    await supabase.shutdown()
+
+
+app = FastAPI(title="Hogword API", lifespan=lifespan)
+
+app.add_middleware(MetricsMiddleware)
+
+if COMPRESSION_MIN_SIZE > 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,7 +65,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    # Listed explicitly because browsers ignore "*" on credentialed requests
+    expose_headers=["*", "ETag", "X-Next-Cursor"],
     max_age=3600,
 )
 
@@ -26,6 +75,10 @@ app.include_router(words.router)
 app.include_router(validation.router)
 app.include_router(analytics.router)
 app.include_router(logs.router)
+app.include_router(export.router)
+app.include_router(ops.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
 
 
 @app.get("/")
@@ -0,0 +1,125 @@
+"""
+ASGI middleware for the app.
+
+`CompressionMiddleware`: brotli when the client accepts it and the `brotli` package is installed,
+gzip otherwise. Bodies under `minimum_size` are sent as-is, and so are streamed responses
+(SSE, exports), since compressing those would hold back their chunks. Whenever the client
+negotiated an encoding, a strong `ETag` is sent weak (`W/`), 304s included: the same tag then never
+names both an encoded and an identity body, and revalidation compares tags weakly.
+
+`MetricsMiddleware`: route latency, in-flight requests and the per-request upstream breakdown
+(see `app.services.metrics`).
+"""
+import gzip
+import time
+from starlette.datastructures import Headers, MutableHeaders
+from app.services import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+def _weaken_etag(headers: MutableHeaders):
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _encoding(self, scope) -> str:
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        if brotli is not None and "br" in accept:
+            return "br"
+        if "gzip" in accept:
+            return "gzip"
+        return ""
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        encoding = self._encoding(scope) if scope["type"] == "http" else ""
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            if "content-encoding" in headers:
+                await send(start)
+                await send(message)
+                return
+            _weaken_etag(headers)
+            if message.get("more_body") or len(body) < self.minimum_size:
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._routes = None  # endpoint -> route path template
+
+    def _route(self, scope) -> str:
+        # Label by path template, never by raw path, so unmatched URLs cannot blow up cardinality
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+        return self._routes.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        token = metrics.start_request()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if metrics.METRICS_TIMING_HEADER:
+                    elapsed = time.perf_counter() - start
+                    calls = metrics.current_calls()
+                    MutableHeaders(scope=message).append("Server-Timing", metrics.server_timing(calls, elapsed))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.finish_request(token, scope["method"], self._route(scope), status, time.perf_counter() - start)
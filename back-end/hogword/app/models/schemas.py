@@ -10,6 +10,12 @@ class AuthResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
     user_id: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # seconds the access token is valid for
+    expires_at: Optional[int] = None  # unix time the access token expires at
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class WordResponse(BaseModel):
     word: str
@@ -25,14 +31,37 @@ class ValidationResult(BaseModel):
     score: float
     suggestion: Optional[str] = None
     corrected_sentence: Optional[str] = None
+    provisional: bool = False  # graded by the local fallback scorer; n8n will re-grade it
 
 class ValidationResponse(ValidationResult):
     pass
 
+class ValidationJobResponse(BaseModel):
+    job_id: str
+    status: str
+    result: Optional[ValidationResponse] = None
+    error: Optional[str] = None
+
+class BatchValidationRequest(BaseModel):
+    items: List[SentenceInput]
+
+class BatchValidationItem(BaseModel):
+    index: int
+    word: str
+    score: Optional[float] = None
+    suggestion: Optional[str] = None
+    corrected_sentence: Optional[str] = None
+    provisional: bool = False
+    error: Optional[str] = None
+
+class BatchValidationResponse(BaseModel):
+    results: List[BatchValidationItem]
+
 class ScoreCountData(BaseModel):
     count: int
     score: float
     difficulty: str
+    samples: Optional[int] = None  # attempts averaged into this point (aggregated mode only)
 
 class SummaryResponse(BaseModel):
     avg_score_today: float
@@ -0,0 +1,21 @@
+"""
+Opt-in fast response path (`FAST_JSON_RESPONSES=1`).
+
+Endpoints that assemble their payload themselves can return it as a plain dict/list through
+`FastJSONResponse` instead of a response model, which skips Pydantic re-validation and
+serializes with orjson. Without orjson installed it falls back to the standard encoder.
+"""
+import os
+from dotenv import load_dotenv
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+    FastJSONResponse = JSONResponse
+
+load_dotenv()
+
+FAST_JSON_RESPONSES = os.environ.get("FAST_JSON_RESPONSES", "0") == "1"
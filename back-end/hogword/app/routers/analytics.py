@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
 from app.routers.auth import get_current_user
-from app.services import stats_service
+from app.services import stats_service, stats_store
 from app.models.schemas import SummaryResponse
+from app.responses import FastJSONResponse, FAST_JSON_RESPONSES
 
 router = APIRouter(prefix="/api/summary", tags=["Analytics"])
 
-@router.get("", response_model=SummaryResponse)
-async def get_summary(user=Depends(get_current_user)):
+@router.get("", response_model=SummaryResponse, response_model_exclude_none=True)
+async def get_summary(
+    score_points: str = "aggregated",
+    max_points: Optional[int] = Query(None, ge=1, le=5000),
+    user=Depends(get_current_user),
+):
     """
     **Get User Analytics Summary Endpoint**
 
@@ -14,6 +20,10 @@ async def get_summary(user=Depends(get_current_user)):
 
     **How to use:**
     - Send a GET request to obtain the dashboard data.
+    - `score_points=aggregated` (default): `score_count_data` holds the mean score per (attempt number, difficulty),
+      merged into bins so there are at most `max_points` entries. Each entry carries the number of averaged `samples`.
+    - `score_points=full`: `score_count_data` holds one entry per completed attempt (unbounded). Returns `409`
+      once part of the user's history has been compacted, since only the aggregated form covers it.
     
     **Returns:**
     - **word_per_day**: List showing count of words practiced each day for the last 7 days.
@@ -24,6 +34,22 @@ async def get_summary(user=Depends(get_current_user)):
     - **scatter_data**: Raw data points (time vs score) suitable for plotting a scatter graph.
     - **today_skip**: Count of how many words the user skipped (resigned) today.
     """
+    if score_points not in ("aggregated", "full"):
+        raise HTTPException(status_code=400, detail="Invalid score_points parameter. Use 'aggregated' or 'full'.")
+
     user_id = user.user.id
-    stats = await stats_service.get_user_dashboard_stats(user_id)
+    try:
+        stats = await stats_service.get_user_dashboard_stats(user_id, score_points, max_points)
+    except stats_store.FullPointsUnavailable:
+        raise HTTPException(
+            status_code=409,
+            detail="score_points=full is not available after older history was compacted. Use 'aggregated'.",
+        )
+    if FAST_JSON_RESPONSES:
+        # Built by stats_service in the SummaryResponse shape; only the float fields need coercing
+        return FastJSONResponse({
+            **stats,
+            "avg_score_today": float(stats["avg_score_today"]),
+            "avg_score_all": float(stats["avg_score_all"]),
+        })
     return SummaryResponse(**stats)
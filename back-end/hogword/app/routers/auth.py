@@ -1,21 +1,40 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.models.schemas import AuthRequest, AuthResponse
-from app.db.supabase import supabase
+from app.models.schemas import AuthRequest, AuthResponse, RefreshRequest
+from app.db.supabase import client
+from app.services import token_service, metrics, auth_service
 from typing import Optional
+import httpx
+import jwt
+import secrets
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 security = HTTPBearer()
+ops_security = HTTPBearer(auto_error=False)
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
-    Dependency to verify JWT token. 
-    In a real unified Supabase setup, you might verify against Supabase's JWT secret using python-jose.
-    Here we rely on Supabase's `get_user` which validates the session token.
+    Dependency to verify JWT token.
+    In `local` mode (default) the token is verified in-process against the cached JWT secret / JWKS.
+    We only fall back to Supabase's `get_user` when no local key can decide, or in `remote` mode.
     """
     token = credentials.credentials
+
+    if token_service.AUTH_VERIFY_MODE == "local":
+        try:
+            return token_service.verify_token(token)
+        except jwt.InvalidTokenError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid authentication credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        except token_service.LocalVerificationUnavailable:
+            pass
+
     try:
-        user = supabase.auth.get_user(token)
+        with metrics.track("supabase_auth"):
+            user = client().auth.get_user(token)
         return user
     except Exception as e:
         raise HTTPException(
@@ -24,6 +43,22 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def require_ops_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(ops_security)):
+    """
+    Dependency guarding the operational endpoints with the static `OPS_TOKEN` (sent as a Bearer token).
+    They answer 404 while `OPS_TOKEN` is unset, so a deployment never exposes them by accident.
+    """
+    if not token_service.OPS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials.encode(), token_service.OPS_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid ops credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
 @router.post("/signin-up", response_model=AuthResponse)
 async def signin_up(auth_data: AuthRequest):
     """
@@ -36,36 +71,47 @@ async def signin_up(auth_data: AuthRequest):
     - **Behavior:**
         1.  **Attempt Sign In**: The system first tries to log the user in with the provided credentials.
         2.  **Fallback to Sign Up**: If the user does not exist (and sign-in fails), the system automatically attempts to register a new user with the same credentials.
+        Emails seen recently go straight to the right step, so returning users cost a single auth call.
     
     **Returns:**
     - On success (both login or registration), returns an `access_token` and `user_id`.
     - Use this token in the `Authorization: Bearer <token>` header for protected routes.
+    - `refresh_token`, `expires_in` and `expires_at`: When the access token expires, get a new one from
+      `/auth/refresh` instead of sending the password again.
     """
     try:
-        response = supabase.auth.sign_in_with_password({
-            "email": auth_data.email,
-            "password": auth_data.password
-        })
-        return AuthResponse(
-            access_token=response.session.access_token,
-            user_id=response.user.id
-        )
-    except Exception as e:
-        try:
-            response = supabase.auth.sign_up({
-                "email": auth_data.email,
-                "password": auth_data.password
-            })
-            
-            if response.session:
-                 return AuthResponse(
-                    access_token=response.session.access_token,
-                    user_id=response.user.id
-                )
-            else:
-                raise HTTPException(status_code=400, detail="Registration successful. Please check your email to confirm.")
-                
-        except Exception as signup_error:
-             raise HTTPException(status_code=400, detail=str(signup_error))
+        session = await auth_service.sign_in_or_up(auth_data.email, auth_data.password)
+    except auth_service.ConfirmationRequired:
+        raise HTTPException(status_code=400, detail="Registration successful. Please check your email to confirm.")
+    except auth_service.AuthError as e:
+        if e.status_code >= 500:
+            raise HTTPException(status_code=503, detail="Authentication service is unavailable.")
+        raise HTTPException(status_code=400, detail=e.message)
+    except httpx.HTTPError:
+        raise HTTPException(status_code=503, detail="Authentication service is unavailable.")
+    return AuthResponse(**session)
+
+@router.post("/refresh", response_model=AuthResponse)
+async def refresh_session(refresh_data: RefreshRequest):
+    """
+    **Refresh Session Endpoint**
 
+    Exchanges the `refresh_token` from `/auth/signin-up` (or from a previous refresh) for a new access token,
+    without the password.
 
+    **How to use:**
+    - Send a POST request with `refresh_token`. Each refresh token can be used once; store the new one from the response.
+    - Returns `401` when the refresh token is invalid, expired or already used. Sign in again in that case.
+
+    **Returns:**
+    - The same fields as `/auth/signin-up`.
+    """
+    try:
+        session = await auth_service.refresh(refresh_data.refresh_token)
+    except auth_service.AuthError as e:
+        if e.status_code >= 500:
+            raise HTTPException(status_code=503, detail="Authentication service is unavailable.")
+        raise HTTPException(status_code=401, detail=e.message, headers={"WWW-Authenticate": "Bearer"})
+    except httpx.HTTPError:
+        raise HTTPException(status_code=503, detail="Authentication service is unavailable.")
+    return AuthResponse(**session)
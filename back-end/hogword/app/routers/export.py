@@ -0,0 +1,107 @@
+import io
+import os
+import csv
+import json
+from datetime import date, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.routers.auth import get_current_user
+from app.db import repository
+from app.services import write_behind
+
+router = APIRouter(prefix="/api/export", tags=["Export"])
+
+# Rows fetched per keyset page; the export holds at most one page in memory
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", "1000"))
+
+EXPORT_COLUMNS = [
+    "id", "created_at", "updated_at", "word", "difficulty", "status",
+    "sentence", "score", "level", "suggestion", "corrected_sentence", "provisional",
+]
+EXPORT_STATUSES = ("active", "completed", "resigned", "skipped")
+
+
+async def _iter_pages(user_id: str, status: Optional[str], since: Optional[str], until: Optional[str]):
+    await write_behind.flush_user(user_id)
+    before = None
+    while True:
+        page = await repository.list_logs_page(
+            user_id,
+            ",".join(EXPORT_COLUMNS),
+            status=status,
+            since=since,
+            until=until,
+            before=before,
+            limit=EXPORT_PAGE_SIZE,
+            desc=False,
+        )
+        if page:
+            yield page
+        if len(page) < EXPORT_PAGE_SIZE:
+            return
+        before = (page[-1]["created_at"], page[-1]["id"])
+
+
+async def _ndjson(pages):
+    async for page in pages:
+        yield "".join(json.dumps(log) + "\n" for log in page)
+
+
+async def _csv(pages):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    async for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get("")
+async def export_logs(
+    format: str = "ndjson",
+    status: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    user=Depends(get_current_user),
+):
+    """
+    **Export Practice History Endpoint**
+
+    Streams the user's complete practice history, oldest first, without loading it into memory.
+    Logs already folded into rollups by compaction (see `COMPACTION_RETENTION_DAYS`) are not included.
+
+    **How to use:**
+    - `format=ndjson` (default): One JSON object per line (`application/x-ndjson`).
+    - `format=csv`: A header row followed by one row per log (`text/csv`).
+    - `status` (optional): Only logs with this status (`active`, `completed`, `resigned` or `skipped`).
+    - `start` / `end` (optional, `YYYY-MM-DD`, UTC): Only logs created on or after `start` and on or before `end`.
+
+    **Returns:**
+    - Every column of `practice_logs` except `user_id`, as a download.
+    """
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Invalid format parameter. Use 'ndjson' or 'csv'.")
+    if status is not None and status not in EXPORT_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status parameter. Use one of: {', '.join(EXPORT_STATUSES)}.")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="'start' must not be after 'end'.")
+
+    since = start.isoformat() if start else None
+    until = (end + timedelta(days=1)).isoformat() if end else None
+    pages = _iter_pages(user.user.id, status, since, until)
+
+    if format == "csv":
+        body, media_type = _csv(pages), "text/csv"
+    else:
+        body, media_type = _ndjson(pages), "application/x-ndjson"
+    filename = f"practice_logs.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from app.db import supabase
+from app.services import vocabulary
+
+router = APIRouter(tags=["Health"])
+
+@router.get("/healthz")
+async def liveness():
+    """
+    **Liveness Endpoint**
+
+    Answers as long as this worker's event loop is serving requests. Restart the container when it stops answering.
+    """
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readiness(request: Request):
+    """
+    **Readiness Endpoint**
+
+    `200` once this worker finished its startup (Supabase client created, vocabulary loaded, background workers
+    running) and until it starts shutting down; `503` otherwise, with the failing checks. Route traffic only to
+    ready workers.
+    """
+    checks = {
+        "started": getattr(request.app.state, "ready", False),
+        "supabase": supabase.is_ready(),
+        "vocabulary": vocabulary.is_loaded(),
+    }
+    ready = all(checks.values())
+    return JSONResponse({"status": "ready" if ready else "not_ready", "checks": checks}, status_code=200 if ready else 503)
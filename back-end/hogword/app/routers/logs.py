@@ -1,14 +1,58 @@
-from fastapi import APIRouter, Depends
-from typing import List
+import json
+import uuid
+import base64
+import hashlib
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from typing import List, Optional
 from datetime import datetime
 from app.routers.auth import get_current_user
-from app.db.supabase import supabase
+from app.db import repository
+from app.services import write_behind
 from app.models.schemas import TodayLogItem
+from app.responses import FastJSONResponse, FAST_JSON_RESPONSES
 
 router = APIRouter(prefix="/api/today-log", tags=["Logs"])
 
+MAX_PAGE_SIZE = 500
+
+
+def _encode_cursor(log: dict) -> str:
+    raw = json.dumps([log["created_at"], log["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, log_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        # Both values end up in a PostgREST filter, so only a real UUID is accepted
+        return created_at, str(uuid.UUID(log_id))
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def _etag(user_id: str, day: str, cursor: Optional[str], limit: Optional[int], count: int, latest: Optional[str]) -> str:
+    # Today's completed logs only grow or get updated, so their count and latest
+    # `updated_at` identify the state of every page
+    digest = hashlib.sha256(f"{user_id}|{day}|{cursor}|{limit}|{count}|{latest}".encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
 @router.get("", response_model=List[TodayLogItem])
-async def get_today_logs(user=Depends(get_current_user)):
+async def get_today_logs(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    user=Depends(get_current_user),
+):
     """
     **Get Today's Practice Logs Endpoint**
 
@@ -16,7 +60,12 @@ async def get_today_logs(user=Depends(get_current_user)):
 
     **How to use:**
     - Send a GET request to see what the user has achieved so far today.
-    
+    - `?limit=N` (optional, at most 500): Return at most `N` logs, newest first. When more remain, the
+      `X-Next-Cursor` response header holds a cursor; pass it back as `?cursor=...` for the next page.
+    - Every response carries an `ETag` (weak, `W/"..."`, when the client accepts gzip or brotli). Send it
+      back in `If-None-Match` when polling; the server answers `304 Not Modified` with no body while
+      nothing has changed. Tags are compared weakly, so either form matches.
+
     **Returns:**
     - A list of log objects, each containing:
         - `datetime`: Timestamp of the practice.
@@ -26,20 +75,47 @@ async def get_today_logs(user=Depends(get_current_user)):
         - `suggestion`: Feedback provided by the AI.
     """
     user_id = user.user.id
-    
+    before = _decode_cursor(cursor) if cursor else None
+
     # Get today's start time in UTC
     today_start = datetime.utcnow().date().isoformat()
-    
-    response = supabase.table("practice_logs")\
-        .select("created_at, word, sentence, score, suggestion")\
-        .eq("user_id", user_id)\
-        .eq("status", "completed")\
-        .gte("created_at", today_start)\
-        .order("created_at", desc=True)\
-        .execute()
-        
+
+    await write_behind.flush_user(user_id)
+    count, latest = await repository.latest_log_update(user_id, status="completed", since=today_start)
+    etag = _etag(user_id, today_start, cursor, limit, count, latest)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    today_logs = await repository.list_logs_page(
+        user_id,
+        "id, created_at, word, sentence, score, suggestion",
+        status="completed",
+        since=today_start,
+        before=before,
+        limit=limit + 1 if limit else None,
+    )
+    if limit and len(today_logs) > limit:
+        today_logs = today_logs[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(today_logs[-1])
+
+    if FAST_JSON_RESPONSES:
+        # Timestamps are passed through as PostgREST returns them
+        return FastJSONResponse([
+            {
+                "datetime": log["created_at"],
+                "word": log["word"],
+                "user_sentence": log["sentence"],
+                "score": float(log["score"]),
+                "suggestion": log.get("suggestion"),
+            }
+            for log in today_logs
+        ], headers=headers)
+
+    response.headers.update(headers)
+
     logs = []
-    for log in response.data:
+    for log in today_logs:
         logs.append(TodayLogItem(
             datetime=log["created_at"],
             word=log["word"],
@@ -47,5 +123,5 @@ async def get_today_logs(user=Depends(get_current_user)):
             score=log["score"],
             suggestion=log.get("suggestion")
         ))
-        
+
     return logs
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.services import (
+    metrics, n8n_service, validation_cache, validation_jobs, stats_store,
+    summary_cache, active_log_cache, vocabulary, admission, regrade, write_behind, auth_service,
+    compaction,
+)
+from app.routers.auth import require_ops_token
+
+router = APIRouter(tags=["Ops"])
+
+metrics.register_collector("n8n_pool", lambda: n8n_service.pool_stats.as_dict())
+metrics.register_collector("validation_cache", validation_cache.stats)
+metrics.register_collector("validation_queue", validation_jobs.stats)
+metrics.register_collector("stats_store", stats_store.stats)
+metrics.register_collector("summary_cache", summary_cache.stats)
+metrics.register_collector("active_log_cache", active_log_cache.stats)
+metrics.register_collector("vocabulary", vocabulary.stats)
+metrics.register_collector("admission", admission.stats)
+metrics.register_collector("circuit_breaker", lambda: {**n8n_service.breaker.as_dict(), "open": int(n8n_service.breaker.state != "closed")})
+metrics.register_collector("regrade", regrade.stats)
+metrics.register_collector("write_behind", write_behind.stats)
+metrics.register_collector("auth", auth_service.stats)
+metrics.register_collector("compaction", compaction.stats)
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_ops_token)])
+async def get_metrics():
+    """
+    **Prometheus Metrics Endpoint**
+
+    This worker's metrics in the Prometheus text format: route latency histograms, Supabase / n8n call
+    latency and calls per request, in-flight requests, and the cache, pool and queue counters from `/ops/*`.
+    Needs the `OPS_TOKEN` as a Bearer token (Prometheus: `authorization: {credentials: ...}` in the scrape config).
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,199 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from app.routers.auth import require_ops_token
+from app.services import n8n_service, validation_cache, validation_jobs, stats_store, summary_cache, active_log_cache, vocabulary, admission, regrade, write_behind, auth_service, compaction
+
+# Every endpoint here reads or changes any user's data, so all of them need the ops token
+router = APIRouter(prefix="/ops", tags=["Ops"], dependencies=[Depends(require_ops_token)])
+
+@router.get("/n8n-pool")
+async def get_n8n_pool_stats():
+    """
+    **n8n Connection Pool Stats Endpoint**
+
+    Reports how busy the shared n8n webhook client is, to help size `N8N_MAX_CONNECTIONS`.
+
+    **Returns:**
+    - `in_use` / `waiting`: Requests currently holding or waiting for a connection slot.
+    - `wait_seconds_avg` / `wait_seconds_max`: Time spent waiting for a free slot.
+    - `retries`: Number of retried webhook calls since startup.
+    """
+    return n8n_service.pool_stats.as_dict()
+
+@router.get("/validation-cache")
+async def get_validation_cache_stats():
+    """
+    **Validation Cache Stats Endpoint**
+
+    Hit/miss counters for the (word, normalized sentence) validation cache, per tier.
+    """
+    return validation_cache.stats()
+
+@router.get("/validation-queue")
+async def get_validation_queue_stats():
+    """
+    **Validation Queue Stats Endpoint**
+
+    Depth and worker count of the queue behind `POST /api/validate-sentence?mode=async`.
+    """
+    return validation_jobs.stats()
+
+@router.get("/stats-store")
+async def get_stats_store_stats():
+    """
+    **Stats Store Stats Endpoint**
+
+    Size and hit ratio of the in-memory per-user dashboard aggregates.
+    """
+    return stats_store.stats()
+
+@router.post("/stats-store/{user_id}/rebuild")
+async def rebuild_user_stats(user_id: str):
+    """
+    **Rebuild User Stats Endpoint**
+
+    Re-backfills one user's dashboard aggregate from practice_logs.
+    """
+    await stats_store.rebuild(user_id)
+    await summary_cache.invalidate(user_id)
+    return {"user_id": user_id, "rebuilt": True}
+
+@router.get("/stats-store/{user_id}/check")
+async def check_user_stats(user_id: str):
+    """
+    **Check User Stats Endpoint**
+
+    Compares this worker's incremental aggregate for a user with a full scan of their practice_logs.
+
+    **Returns:**
+    - `consistent`: Whether both produce the same dashboard.
+    - `mismatched_fields`: Names of the summary fields that differ.
+    """
+    return await stats_store.check(user_id)
+
+@router.get("/summary-cache")
+async def get_summary_cache_stats():
+    """
+    **Summary Cache Stats Endpoint**
+
+    Hit ratio, invalidations and the age of served entries for the `/api/summary` cache.
+    """
+    return summary_cache.stats()
+
+@router.get("/active-log-cache")
+async def get_active_log_cache_stats():
+    """
+    **Active Log Cache Stats Endpoint**
+
+    Hit ratio of the write-through cache behind `/api/word?state=fetch` and `/api/validate-sentence`.
+    """
+    return active_log_cache.stats()
+
+@router.get("/vocabulary")
+async def get_vocabulary_stats():
+    """
+    **Vocabulary Stats Endpoint**
+
+    Size of the loaded vocabulary per difficulty and how many users have a recent-words buffer.
+    """
+    return vocabulary.stats()
+
+@router.post("/vocabulary/reload")
+async def reload_vocabulary():
+    """
+    **Reload Vocabulary Endpoint**
+
+    Re-reads the words file on this worker without a restart. A file that fails to parse leaves the current vocabulary in place.
+    """
+    return {"reloaded": await asyncio.to_thread(vocabulary.reload), **vocabulary.stats()}
+
+@router.get("/admission")
+async def get_admission_stats():
+    """
+    **Admission Control Stats Endpoint**
+
+    Rate-limited and shed validation requests, n8n calls in flight against the current limit, and the
+    latency moving average that switches load shedding on.
+    """
+    return admission.stats()
+
+@router.get("/circuit-breaker")
+async def get_circuit_breaker_stats():
+    """
+    **n8n Circuit Breaker Stats Endpoint**
+
+    State of this worker's circuit breaker around the n8n webhook (`closed`, `open` or `half_open`), the failures
+    and slow calls in its window, and how many validations were answered by the local fallback scorer instead.
+    """
+    return n8n_service.breaker.as_dict()
+
+@router.get("/regrade")
+async def get_regrade_stats():
+    """
+    **Re-grading Stats Endpoint**
+
+    Progress of the background job that re-grades provisional (fallback-scored) practice logs through n8n.
+    """
+    return regrade.stats()
+
+@router.post("/regrade/run")
+async def run_regrade():
+    """
+    **Run Re-grading Endpoint**
+
+    Re-grades one batch of provisional practice logs now, if the n8n circuit breaker is closed.
+    """
+    return {"regraded": await regrade.run_once(), **regrade.stats()}
+
+@router.get("/write-behind")
+async def get_write_behind_stats():
+    """
+    **Write-behind Buffer Stats Endpoint**
+
+    Pending practice_logs rows and user_state pointers in this worker's write-behind buffer, how many writes were
+    coalesced, and how many bulk upserts were sent to Supabase for them.
+    """
+    return write_behind.stats()
+
+@router.post("/write-behind/flush")
+async def flush_write_behind():
+    """
+    **Flush Write-behind Buffer Endpoint**
+
+    Writes everything pending in this worker's write-behind buffer now.
+    """
+    await write_behind.flush()
+    return write_behind.stats()
+
+@router.get("/auth")
+async def get_auth_stats():
+    """
+    **Auth Stats Endpoint**
+
+    Sign-in, sign-up and refresh calls made to the Supabase auth server, and how often the known-email cache let
+    `/auth/signin-up` skip a round trip.
+    """
+    return auth_service.stats()
+
+@router.get("/compaction")
+async def get_compaction_stats():
+    """
+    **Compaction Stats Endpoint**
+
+    Progress of the job that folds practice logs older than the retention window into per-day and per-word rollups
+    (and optionally archives them to compressed columnar files).
+    """
+    return compaction.stats()
+
+@router.post("/compaction/run")
+async def run_compaction():
+    """
+    **Run Compaction Endpoint**
+
+    Compacts one batch of users now. Answers 409 while `COMPACTION_ENABLED` is off.
+    """
+    try:
+        compacted = await compaction.run_once()
+    except compaction.CompactionDisabled:
+        raise HTTPException(status_code=409, detail="Compaction is disabled.")
+    return {"compacted": compacted, **compaction.stats()}
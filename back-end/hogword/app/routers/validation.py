@@ -1,13 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import json
+import asyncio
+from typing import Union
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from app.routers.auth import get_current_user
-from app.models.schemas import SentenceInput, ValidationResponse
-from app.services import word_service, n8n_service
-from app.db.supabase import supabase
+from app.models.schemas import (
+    SentenceInput, ValidationResponse, ValidationJobResponse,
+    BatchValidationRequest, BatchValidationItem, BatchValidationResponse,
+)
+from app.services import word_service, n8n_service, validation_jobs, stats_store, summary_cache, admission, write_behind
 
 router = APIRouter(prefix="/api/validate-sentence", tags=["Validation"])
 
-@router.post("", response_model=ValidationResponse)
-async def validate_sentence_endpoint(input_data: SentenceInput, user=Depends(get_current_user)):
+SSE_KEEPALIVE_SECONDS = 15
+BATCH_VALIDATION_CONCURRENCY = int(os.environ.get("BATCH_VALIDATION_CONCURRENCY", "8"))
+BATCH_VALIDATION_MAX_ITEMS = int(os.environ.get("BATCH_VALIDATION_MAX_ITEMS", "100"))
+
+async def _get_matching_active_log(user_id: str, word: str):
+    active_log = await word_service.fetch_current_word(user_id)
+    
+    if not active_log:
+        raise HTTPException(status_code=400, detail="No active word found for this user. Please fetch a word first.")
+    
+    if active_log["word"].lower() != word.lower():
+         raise HTTPException(status_code=400, detail=f"Input word '{word}' does not match active word '{active_log['word']}'.")
+
+    return active_log
+
+@router.post("", response_model=Union[ValidationResponse, ValidationJobResponse])
+async def validate_sentence_endpoint(input_data: SentenceInput, response: Response, mode: str = "sync", user=Depends(get_current_user)):
     """
     **Validate Sentence Endpoint**
 
@@ -16,10 +38,19 @@ async def validate_sentence_endpoint(input_data: SentenceInput, user=Depends(get
     **How to use:**
     - Send a POST request with the `word` (the specific word being practiced) and the `user_sentence` (the sentence constructed by the user).
     - **Prerequisite**: The user must have an active practice word (fetched via `/api/word?state=fetch`).
+    - `?mode=async` (optional): Returns `202` with a `job_id` right away instead of waiting for the AI.
+      Get the result from `/api/validate-sentence/jobs/{job_id}` (polling) or `/api/validate-sentence/jobs/{job_id}/events` (Server-Sent Events).
+      Returns `429` when the validation queue is full.
+    - Returns `429` with `Retry-After` when the user exceeds their validation rate, and `503` with `Retry-After`
+      when the validation service is overloaded.
+    - Returns `409` when the practice word changed while the sentence was graded (`WORD_SESSION_MODE=rpc`);
+      an async job fails with the same message.
     
     **What it does:**
     1.  **Verifies Active Session**: Checks if the submitted word matches the user's currently active practice word.
     2.  **AI Analysis**: Sends the sentence to an AI service (n8n) to grade the usage of the word.
+        If n8n is failing or its circuit breaker is open, a fast local scorer answers instead and the result has
+        `provisional: true`; the stored log is re-graded by n8n once it recovers (`REGRADE_ENABLED=1`).
     3.  **Data Persistence**: 
         - Updates the current practice log with the score, suggestion, and corrected sentence.
         - Marks the log as "completed".
@@ -32,46 +63,170 @@ async def validate_sentence_endpoint(input_data: SentenceInput, user=Depends(get
     """
     user_id = user.user.id
     
-    active_log = await word_service.fetch_current_word(user_id)
-    
-    if not active_log:
-        raise HTTPException(status_code=400, detail="No active word found for this user. Please fetch a word first.")
-    
-    if active_log["word"].lower() != input_data.word.lower():
-         raise HTTPException(status_code=400, detail=f"Input word '{input_data.word}' does not match active word '{active_log['word']}'.")
+    active_log = await _get_matching_active_log(user_id, input_data.word)
+
+    try:
+        await admission.check_rate(user_id)
+    except admission.AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": e.retry_after_header})
+
+    if mode == "async":
+        try:
+            job = await validation_jobs.submit(user_id, active_log, input_data.word, input_data.user_sentence)
+        except validation_jobs.QueueFull:
+            raise HTTPException(status_code=429, detail="Validation queue is full. Please retry shortly.", headers={"Retry-After": "5"})
+        except validation_jobs.QueueUnavailable:
+            raise HTTPException(status_code=503, detail="Validation queue is not available.", headers={"Retry-After": "5"})
+        response.status_code = 202
+        return ValidationJobResponse(**job.as_dict())
+    elif mode != "sync":
+        raise HTTPException(status_code=400, detail="Invalid mode parameter. Use 'sync' or 'async'.")
 
     try:
         n8n_result = await n8n_service.validate_sentence(input_data.word, input_data.user_sentence)
+    except admission.AdmissionRejected as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": e.retry_after_header})
     except Exception as e:
         raise HTTPException(status_code=502, detail="Error communicating with validation service.")
     
-    update_payload = {
-        "sentence": input_data.user_sentence,
-        "score": n8n_result.get("score"),
-        "level": n8n_result.get("level"),
-        "suggestion": n8n_result.get("suggestion"),
-        "corrected_sentence": n8n_result.get("corrected_sentence"),
-        "status": "completed",
-        "updated_at": "now()"
-    }
-    
-    if active_log["status"] == "active":
-        supabase.table("practice_logs").update(update_payload).eq("id", active_log["id"]).execute()
-    else:
-        new_log = {
-            "user_id": user_id,
-            "word": active_log["word"],
-            "difficulty": active_log["difficulty"],
-            **update_payload
-        }
-        res = supabase.table("practice_logs").insert(new_log).execute()
-        
-        if res.data:
-             new_id = res.data[0]["id"]
-             supabase.table("user_state").update({"current_log_id": new_id}).eq("user_id", user_id).execute()
+    try:
+        await word_service.record_attempt(user_id, active_log, input_data.user_sentence, n8n_result)
+    except word_service.LogNotFound:
+        raise HTTPException(status_code=409, detail=word_service.LogNotFound.detail)
     
     return ValidationResponse(
         score=n8n_result.get("score", 0),
         suggestion=n8n_result.get("suggestion"),
-        corrected_sentence=n8n_result.get("corrected_sentence")
+        corrected_sentence=n8n_result.get("corrected_sentence"),
+        provisional=bool(n8n_result.get("provisional")),
     )
+
+@router.get("/jobs/{job_id}", response_model=ValidationJobResponse)
+async def get_validation_job(job_id: str, user=Depends(get_current_user)):
+    """
+    **Get Validation Job Endpoint**
+
+    Polls a job submitted with `POST /api/validate-sentence?mode=async`.
+
+    **Returns:**
+    - `status`: `queued`, `running`, `completed` or `failed`.
+    - `result`: The same payload as the synchronous endpoint once `completed`.
+    - `error`: A message when the job `failed`.
+    """
+    job = await validation_jobs.get_job(job_id, user.user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Validation job not found.")
+    return ValidationJobResponse(**job)
+
+@router.get("/jobs/{job_id}/events")
+async def stream_validation_job(job_id: str, user=Depends(get_current_user)):
+    """
+    **Stream Validation Job Endpoint**
+
+    Server-Sent Events stream for a job submitted with `POST /api/validate-sentence?mode=async`.
+    Sends a `status` event right away, keep-alive comments while the job runs, and a final `result` event
+    carrying the same payload as `GET /api/validate-sentence/jobs/{job_id}`.
+    """
+    job = await validation_jobs.get_job(job_id, user.user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Validation job not found.")
+
+    async def events():
+        state = job
+        yield f"event: status\ndata: {json.dumps(state)}\n\n"
+        while state["status"] not in validation_jobs.FINISHED:
+            state = await validation_jobs.wait_finished(job_id, user.user.id, SSE_KEEPALIVE_SECONDS)
+            if state is None:
+                # Expired from the job store before it finished
+                return
+            if state["status"] not in validation_jobs.FINISHED:
+                yield ": keep-alive\n\n"
+        yield f"event: result\ndata: {json.dumps(state)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/batch", response_model=BatchValidationResponse)
+async def validate_sentence_batch(batch: BatchValidationRequest, user=Depends(get_current_user)):
+    """
+    **Batch Validate Sentences Endpoint**
+
+    Grades many (word, sentence) pairs in one request, e.g. for classroom or import tooling.
+
+    **How to use:**
+    - Send a POST request with `items`, a list of `{word, user_sentence}` objects (at most `BATCH_VALIDATION_MAX_ITEMS`,
+      and at most `ADMISSION_USER_BURST` while per-user rate limiting is on). Each item counts as one validation
+      against the user's rate limit.
+    - Items do not need to match the user's active practice word, but each word must be in the vocabulary.
+
+    **What it does:**
+    1.  **AI Analysis**: Validates items concurrently (at most `BATCH_VALIDATION_CONCURRENCY` at a time), reusing the validation cache.
+    2.  **Data Persistence**: Stores every graded item as a completed practice log in a single bulk insert. The active practice word is left untouched.
+
+    **Returns:**
+    - `results`: One entry per item, in request order, with either the grading fields or an `error`.
+    """
+    user_id = user.user.id
+
+    if len(batch.items) > BATCH_VALIDATION_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {BATCH_VALIDATION_MAX_ITEMS} items.")
+
+    # A batch costs one token per item, so it can never exceed what single requests could spend
+    if admission.rate_limited() and len(batch.items) > admission.ADMISSION_USER_BURST:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {int(admission.ADMISSION_USER_BURST)} items under the per-user rate limit.",
+        )
+    try:
+        await admission.check_rate(user_id, len(batch.items))
+    except admission.AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": e.retry_after_header})
+
+    semaphore = asyncio.Semaphore(BATCH_VALIDATION_CONCURRENCY)
+
+    async def validate_item(index: int, item: SentenceInput):
+        difficulty = word_service.get_word_difficulty(item.word)
+        if difficulty is None:
+            return BatchValidationItem(index=index, word=item.word, error=f"Word '{item.word}' is not in the vocabulary."), None
+        async with semaphore:
+            try:
+                n8n_result = await n8n_service.validate_sentence(item.word, item.user_sentence)
+            except admission.AdmissionRejected as e:
+                return BatchValidationItem(index=index, word=item.word, error=str(e)), None
+            except Exception as e:
+                return BatchValidationItem(index=index, word=item.word, error="Error communicating with validation service."), None
+
+        log = {
+            "user_id": user_id,
+            "word": item.word,
+            "difficulty": difficulty,
+            "sentence": item.user_sentence,
+            "score": n8n_result.get("score"),
+            "level": n8n_result.get("level"),
+            "suggestion": n8n_result.get("suggestion"),
+            "corrected_sentence": n8n_result.get("corrected_sentence"),
+            "provisional": bool(n8n_result.get("provisional")),
+            "status": "completed",
+        }
+        result = BatchValidationItem(
+            index=index,
+            word=item.word,
+            score=n8n_result.get("score", 0),
+            suggestion=n8n_result.get("suggestion"),
+            corrected_sentence=n8n_result.get("corrected_sentence"),
+            provisional=bool(n8n_result.get("provisional")),
+        )
+        return result, log
+
+    graded = await asyncio.gather(*(validate_item(i, item) for i, item in enumerate(batch.items)))
+
+    inserted_logs = await write_behind.insert_logs([log for _, log in graded if log is not None])
+    for log in inserted_logs:
+        stats_store.record_completed(user_id, log)
+    if inserted_logs:
+        await summary_cache.invalidate(user_id)
+
+    return BatchValidationResponse(results=[result for result, _ in graded])
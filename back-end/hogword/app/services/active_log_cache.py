@@ -0,0 +1,97 @@
+"""
+Write-through cache of each user's current practice log (user_state -> practice_logs).
+
+Only `word_service` changes a user's current log, and every one of its write paths calls
+`put`, so a hit on `/api/word?state=fetch` or `/api/validate-sentence` is served without touching
+Supabase. Each entry carries the user's generation, a counter in the backend that every write
+increments, and is only served while that is still the current generation; a log read from the
+database across a write (`fill`) therefore never hides the write. With several workers, set
+`CACHE_BACKEND=redis` so all of them share the entries and the generations. The per-process
+backend only sees its own worker's writes, so the cache turns itself off when it would run in
+more than one worker (`WEB_CONCURRENCY` > 1).
+"""
+import os
+from typing import Optional
+from dotenv import load_dotenv
+from app.services.cache import CACHE_BACKEND, make_backend
+
+load_dotenv()
+
+ACTIVE_LOG_CACHE_ENABLED = (
+    os.environ.get("ACTIVE_LOG_CACHE_ENABLED", "1") == "1"
+    and (CACHE_BACKEND == "redis" or int(os.environ.get("WEB_CONCURRENCY") or 1) == 1)
+)
+ACTIVE_LOG_CACHE_SIZE = int(os.environ.get("ACTIVE_LOG_CACHE_SIZE", "10000"))
+ACTIVE_LOG_CACHE_TTL = float(os.environ.get("ACTIVE_LOG_CACHE_TTL", "120"))
+
+_backend = make_backend("active_log", ACTIVE_LOG_CACHE_SIZE, ACTIVE_LOG_CACHE_TTL)
+
+
+class ActiveLogCacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.stale_entries = 0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": ACTIVE_LOG_CACHE_ENABLED,
+            "backend": type(_backend).__name__,
+            "size": _backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "stale_entries": self.stale_entries,
+        }
+
+
+cache_stats = ActiveLogCacheStats()
+
+
+async def generation(user_id: str) -> int:
+    """Snapshot to pass back to `fill`, taken before reading the log from the database."""
+    if not ACTIVE_LOG_CACHE_ENABLED:
+        return 0
+    return await _backend.counter(user_id)
+
+
+async def lookup(user_id: str) -> Optional[dict]:
+    if not ACTIVE_LOG_CACHE_ENABLED:
+        return None
+    entry, current = await _backend.get_with_counter(user_id)
+    if entry is None or entry["generation"] != current:
+        if entry is not None:
+            cache_stats.stale_entries += 1
+        cache_stats.misses += 1
+        return None
+    cache_stats.hits += 1
+    return dict(entry["log"])
+
+
+async def fill(user_id: str, log: dict, generation_seen: int):
+    """Cache a log read from the database; it is only served while no write came after `generation_seen`."""
+    if not ACTIVE_LOG_CACHE_ENABLED:
+        return
+    await _backend.set(user_id, {"generation": generation_seen, "log": dict(log)})
+
+
+async def put(user_id: str, log: dict):
+    """Write-through: record the log a write path just made current."""
+    cache_stats.writes += 1
+    if not ACTIVE_LOG_CACHE_ENABLED:
+        return
+    await _backend.set(user_id, {"generation": await _backend.incr(user_id), "log": dict(log)})
+
+
+async def invalidate(user_id: str):
+    if not ACTIVE_LOG_CACHE_ENABLED:
+        return
+    await _backend.incr(user_id)
+    await _backend.delete(user_id)
+
+
+def stats() -> dict:
+    return cache_stats.as_dict()
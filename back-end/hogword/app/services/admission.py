@@ -0,0 +1,215 @@
+"""
+Admission control for the validation path.
+
+- `check_rate(user_id, cost)`: per-user token bucket (`ADMISSION_USER_RATE` tokens per second,
+  bursts of up to `ADMISSION_USER_BURST`). Buckets live in this process, or in Redis when
+  `CACHE_BACKEND=redis` so every worker shares them.
+- `upstream_slot()`: per-worker limit on concurrent n8n calls. A call that cannot get a slot
+  within `ADMISSION_MAX_WAIT` seconds is shed instead of queueing. While the moving average of
+  n8n latency is above `ADMISSION_SHED_LATENCY`, the limit drops to `ADMISSION_SHED_CONCURRENCY`
+  so a slow backend gets fewer requests, not more.
+
+Both raise `AdmissionRejected` (with a `retry_after` in seconds) for the router to turn into
+429 / 503 responses.
+"""
+import os
+import time
+import asyncio
+from typing import Optional
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from app.services.cache import TTLCache, CACHE_BACKEND, REDIS_URL, redis_client
+
+load_dotenv()
+
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_USER_RATE = float(os.environ.get("ADMISSION_USER_RATE", "0.5"))
+ADMISSION_USER_BURST = float(os.environ.get("ADMISSION_USER_BURST", "10"))
+ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", "20"))
+ADMISSION_MAX_WAIT = float(os.environ.get("ADMISSION_MAX_WAIT", "1"))
+ADMISSION_SHED_LATENCY = float(os.environ.get("ADMISSION_SHED_LATENCY", "8"))
+ADMISSION_SHED_CONCURRENCY = int(os.environ.get("ADMISSION_SHED_CONCURRENCY", str(max(1, ADMISSION_MAX_CONCURRENT // 4))))
+# Weight of the newest call in the latency moving average
+ADMISSION_LATENCY_ALPHA = 0.2
+
+USER_BUCKETS_SIZE = 100000
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is rate limited (`overloaded=False`) or shed (`overloaded=True`)."""
+
+    def __init__(self, retry_after: float, overloaded: bool):
+        super().__init__("Validation service is overloaded." if overloaded else "Too many validation requests.")
+        self.retry_after = retry_after
+        self.overloaded = overloaded
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, int(self.retry_after + 0.999)))
+
+
+class AdmissionStats:
+    def __init__(self):
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+        self.in_flight = 0
+        self.latency_ewma = 0.0
+
+    def as_dict(self):
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "bucket_backend": "redis" if SHARED_BUCKETS else "memory",
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+            "in_flight": self.in_flight,
+            "concurrency_limit": current_limit(),
+            "latency_ewma_seconds": round(self.latency_ewma, 3),
+            "shedding": self.latency_ewma > ADMISSION_SHED_LATENCY,
+        }
+
+
+admission_stats = AdmissionStats()
+
+
+# --- per-user token buckets ---
+
+_buckets = TTLCache(USER_BUCKETS_SIZE, ADMISSION_USER_BURST / ADMISSION_USER_RATE + 60)
+
+# KEYS[1] = bucket; ARGV = rate, burst, now, cost. Returns {allowed, seconds until enough tokens}.
+_TOKEN_BUCKET_SCRIPT = """
+local rate, burst, now, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed, wait = 0, (cost - tokens) / rate
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed, wait = 1, 0
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 60000)
+return {allowed, tostring(wait)}
+"""
+
+SHARED_BUCKETS = CACHE_BACKEND == "redis" and bool(REDIS_URL)
+_token_bucket = None  # registered on the process's Redis client on first use
+
+
+def _bucket_script():
+    global _token_bucket
+    client = redis_client()
+    # The client is re-created after a shutdown / startup cycle, and a script is bound to its client
+    if _token_bucket is None or _token_bucket.registered_client is not client:
+        _token_bucket = client.register_script(_TOKEN_BUCKET_SCRIPT)
+    return _token_bucket
+
+
+def _take_local(user_id: str, cost: float, now: float) -> float:
+    """Take `cost` tokens; returns 0 when allowed, else the seconds until enough tokens."""
+    tokens, updated_at = _buckets.get(user_id) or (ADMISSION_USER_BURST, now)
+    tokens = min(ADMISSION_USER_BURST, tokens + (now - updated_at) * ADMISSION_USER_RATE)
+    if tokens >= cost:
+        _buckets.set(user_id, (tokens - cost, now))
+        return 0.0
+    _buckets.set(user_id, (tokens, now))
+    return (cost - tokens) / ADMISSION_USER_RATE
+
+
+def rate_limited() -> bool:
+    """Whether per-user token buckets are enforced."""
+    return ADMISSION_ENABLED and ADMISSION_USER_RATE > 0
+
+
+async def check_rate(user_id: str, cost: float = 1):
+    """Charge `cost` validations to the user's bucket, or raise `AdmissionRejected`."""
+    if not rate_limited():
+        return
+    if cost > ADMISSION_USER_BURST:
+        raise AdmissionRejected(cost / ADMISSION_USER_RATE, overloaded=False)
+    now = time.time()
+    if SHARED_BUCKETS:
+        allowed, wait = await _bucket_script()(
+            keys=[f"admission:{user_id}"], args=[ADMISSION_USER_RATE, ADMISSION_USER_BURST, now, cost]
+        )
+        wait = 0.0 if allowed else float(wait)
+    else:
+        wait = _take_local(user_id, cost, now)
+    if wait > 0:
+        admission_stats.rate_limited += 1
+        raise AdmissionRejected(wait, overloaded=False)
+
+
+# --- global concurrency and latency shedding ---
+
+_slot_released: Optional[asyncio.Condition] = None
+
+
+async def startup():
+    """Create the slot condition on the running loop. Called from the FastAPI lifespan."""
+    global _slot_released
+    if _slot_released is None:
+        _slot_released = asyncio.Condition()
+
+
+async def shutdown():
+    global _slot_released
+    _slot_released = None
+
+
+def current_limit() -> int:
+    if admission_stats.latency_ewma > ADMISSION_SHED_LATENCY:
+        return min(ADMISSION_SHED_CONCURRENCY, ADMISSION_MAX_CONCURRENT)
+    return ADMISSION_MAX_CONCURRENT
+
+
+def _record_latency(elapsed: float):
+    if admission_stats.latency_ewma == 0.0:
+        admission_stats.latency_ewma = elapsed
+    else:
+        admission_stats.latency_ewma += ADMISSION_LATENCY_ALPHA * (elapsed - admission_stats.latency_ewma)
+
+
+@asynccontextmanager
+async def upstream_slot():
+    """Hold one of this worker's n8n call slots for the duration of the block."""
+    if not ADMISSION_ENABLED:
+        yield
+        return
+    if _slot_released is None:
+        await startup()
+    slot_released = _slot_released
+
+    async with slot_released:
+        if admission_stats.in_flight >= current_limit():
+            try:
+                await asyncio.wait_for(
+                    slot_released.wait_for(lambda: admission_stats.in_flight < current_limit()),
+                    timeout=ADMISSION_MAX_WAIT,
+                )
+            except asyncio.TimeoutError:
+                admission_stats.shed += 1
+                raise AdmissionRejected(max(1.0, admission_stats.latency_ewma), overloaded=True)
+        admission_stats.in_flight += 1
+        admission_stats.admitted += 1
+
+    start = time.perf_counter()
+    cancelled = False
+    try:
+        yield
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    finally:
+        # Failures count too: timeouts are exactly the slow calls shedding reacts to
+        if not cancelled:
+            _record_latency(time.perf_counter() - start)
+        async with slot_released:
+            admission_stats.in_flight -= 1
+            slot_released.notify_all()
+
+
+def stats() -> dict:
+    return admission_stats.as_dict()
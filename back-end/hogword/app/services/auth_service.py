@@ -0,0 +1,221 @@
+"""
+Password sign-in / sign-up and session refresh against the Supabase auth (GoTrue) REST API.
+
+Calls go through one pooled `httpx.AsyncClient`, so they do not block the event loop and do not
+store a user session on the shared service-role `supabase` client.
+
+`sign_in_or_up` remembers per email which path worked, so a returning user costs one auth round
+trip instead of a failed sign-in plus a sign-up:
+- "registered" (kept `AUTH_EMAIL_CACHE_TTL` seconds): sign in only. A failed sign-in is a wrong
+  password, not a new user.
+- "unregistered" (kept `AUTH_EMAIL_NEGATIVE_TTL` seconds): sign-in failed and sign-up was
+  rejected (e.g. a weak password), so the next attempt goes straight to sign-up.
+Emails are cached as SHA-256 digests, shared through Redis when `CACHE_BACKEND=redis`.
+"""
+import os
+import time
+import hashlib
+from typing import Optional
+import httpx
+from dotenv import load_dotenv
+from app.services import metrics
+from app.services.cache import make_backend
+
+load_dotenv()
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+AUTH_TIMEOUT = float(os.environ.get("AUTH_TIMEOUT", "10"))
+AUTH_EMAIL_CACHE_ENABLED = os.environ.get("AUTH_EMAIL_CACHE_ENABLED", "1") == "1"
+AUTH_EMAIL_CACHE_SIZE = int(os.environ.get("AUTH_EMAIL_CACHE_SIZE", "10000"))
+AUTH_EMAIL_CACHE_TTL = float(os.environ.get("AUTH_EMAIL_CACHE_TTL", "600"))
+AUTH_EMAIL_NEGATIVE_TTL = float(os.environ.get("AUTH_EMAIL_NEGATIVE_TTL", "60"))
+
+REGISTERED, UNREGISTERED = "registered", "unregistered"
+# GoTrue error codes (and older messages) that mean the email already has an account
+_EXISTS_CODES = {"user_already_exists", "email_exists"}
+_EXISTS_MESSAGES = ("already registered", "already exists")
+
+
+class AuthError(Exception):
+    """An error answer from the auth server, with its HTTP status and GoTrue error code."""
+
+    def __init__(self, status_code: int, message: str, code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.code = code
+
+    @property
+    def user_exists(self) -> bool:
+        return self.code in _EXISTS_CODES or any(text in self.message.lower() for text in _EXISTS_MESSAGES)
+
+    @property
+    def email_not_confirmed(self) -> bool:
+        return self.code == "email_not_confirmed" or "not confirmed" in self.message.lower()
+
+
+class ConfirmationRequired(Exception):
+    """Raised when sign-up succeeded but the account must be confirmed by email first."""
+
+
+class AuthStats:
+    def __init__(self):
+        self.sign_ins = 0
+        self.sign_ups = 0
+        self.refreshes = 0
+        self.email_cache_hits = 0
+        self.email_cache_misses = 0
+        self.round_trips_saved = 0
+
+    def as_dict(self):
+        lookups = self.email_cache_hits + self.email_cache_misses
+        return {
+            "email_cache_enabled": AUTH_EMAIL_CACHE_ENABLED,
+            "email_cache_backend": type(_emails).__name__,
+            "email_cache_size": _emails.size(),
+            "email_cache_hit_ratio": round(self.email_cache_hits / lookups, 4) if lookups else 0.0,
+            "sign_ins": self.sign_ins,
+            "sign_ups": self.sign_ups,
+            "refreshes": self.refreshes,
+            "round_trips_saved": self.round_trips_saved,
+        }
+
+
+auth_stats = AuthStats()
+
+_emails = make_backend("auth_email", AUTH_EMAIL_CACHE_SIZE, AUTH_EMAIL_CACHE_TTL)
+_client: Optional[httpx.AsyncClient] = None
+
+
+async def startup():
+    """Create the auth API client. Called from the FastAPI lifespan."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=f"{(SUPABASE_URL or '').rstrip('/')}/auth/v1",
+            headers={"apikey": SUPABASE_KEY or "", "Authorization": f"Bearer {SUPABASE_KEY or ''}"},
+            timeout=AUTH_TIMEOUT,
+        )
+
+
+async def shutdown():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _post(path: str, body: dict, params: Optional[dict] = None) -> dict:
+    if _client is None:
+        await startup()
+    with metrics.track("supabase_auth"):
+        response = await _client.post(path, json=body, params=params)
+    try:
+        payload = response.json()
+    except ValueError:
+        payload = {}
+    if response.status_code >= 400:
+        message = (
+            payload.get("msg") or payload.get("error_description") or payload.get("message")
+            or payload.get("error") or f"Auth server returned {response.status_code}."
+        )
+        raise AuthError(response.status_code, message, payload.get("error_code") or payload.get("error"))
+    return payload
+
+
+def session_of(payload: dict) -> dict:
+    """The fields of a GoTrue token response that `/auth/*` returns to clients."""
+    expires_in = payload.get("expires_in")
+    return {
+        "access_token": payload["access_token"],
+        "refresh_token": payload.get("refresh_token"),
+        "expires_in": expires_in,
+        "expires_at": payload.get("expires_at") or (int(time.time()) + expires_in if expires_in else None),
+        "user_id": payload["user"]["id"],
+    }
+
+
+async def sign_in(email: str, password: str) -> dict:
+    auth_stats.sign_ins += 1
+    return session_of(await _post("/token", {"email": email, "password": password}, {"grant_type": "password"}))
+
+
+async def sign_up(email: str, password: str) -> dict:
+    """Register a user; raises `ConfirmationRequired` when the project requires email confirmation."""
+    auth_stats.sign_ups += 1
+    payload = await _post("/signup", {"email": email, "password": password})
+    if not payload.get("access_token"):
+        raise ConfirmationRequired()
+    return session_of(payload)
+
+
+async def refresh(refresh_token: str) -> dict:
+    """Exchange a refresh token for a new session (refresh tokens are single use)."""
+    auth_stats.refreshes += 1
+    return session_of(await _post("/token", {"refresh_token": refresh_token}, {"grant_type": "refresh_token"}))
+
+
+def _email_key(email: str) -> str:
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+
+async def _known_state(email: str) -> Optional[str]:
+    if not AUTH_EMAIL_CACHE_ENABLED:
+        return None
+    entry = await _emails.get(_email_key(email))
+    if entry is None or (entry["state"] == UNREGISTERED and time.time() - entry["at"] > AUTH_EMAIL_NEGATIVE_TTL):
+        auth_stats.email_cache_misses += 1
+        return None
+    auth_stats.email_cache_hits += 1
+    return entry["state"]
+
+
+async def _remember(email: str, state: str):
+    if AUTH_EMAIL_CACHE_ENABLED:
+        await _emails.set(_email_key(email), {"state": state, "at": time.time()})
+
+
+async def sign_in_or_up(email: str, password: str) -> dict:
+    """
+    Sign in, or register the email if it has no account. Raises `AuthError` for bad credentials
+    and `ConfirmationRequired` when a new account must be confirmed first.
+    """
+    state = await _known_state(email)
+
+    if state == UNREGISTERED:
+        auth_stats.round_trips_saved += 1
+    else:
+        try:
+            session = await sign_in(email, password)
+        except AuthError as e:
+            if state == REGISTERED or e.email_not_confirmed:
+                # Known account: a wrong password (or an unconfirmed email), not a new user
+                if state == REGISTERED:
+                    auth_stats.round_trips_saved += 1
+                raise
+        else:
+            await _remember(email, REGISTERED)
+            return session
+
+    try:
+        session = await sign_up(email, password)
+    except ConfirmationRequired:
+        await _remember(email, REGISTERED)
+        raise
+    except AuthError as e:
+        if not e.user_exists:
+            await _remember(email, UNREGISTERED)
+            raise
+        await _remember(email, REGISTERED)
+        if state != UNREGISTERED:
+            # Sign-in already failed for this existing account
+            raise AuthError(400, "Invalid login credentials", "invalid_credentials")
+        # Registered since it was cached as unknown (e.g. on another device)
+        return await sign_in(email, password)
+    await _remember(email, REGISTERED)
+    return session
+
+
+def stats() -> dict:
+    return auth_stats.as_dict()
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Backend for caches that must be shared between workers: "memory" (per process) or "redis"
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory").lower()
+REDIS_URL = os.environ.get("REDIS_URL")
+
+_MISSING = object()
+
+_redis = None
+
+
+def redis_client():
+    """
+    This process's Redis client, shared by every Redis-backed cache. Created by `startup` or on
+    first use, never at import, so a client made before gunicorn forks is not inherited.
+    """
+    global _redis
+    if _redis is None:
+        import redis.asyncio
+
+        _redis = redis.asyncio.from_url(REDIS_URL)
+    return _redis
+
+
+async def startup():
+    """Create the Redis client, if one is configured. Called from the FastAPI lifespan."""
+    if CACHE_BACKEND == "redis" and REDIS_URL:
+        redis_client()
+
+
+async def shutdown():
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries also expire `ttl` seconds after being written.
+    Not thread-safe; meant to be used from the event loop.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default: Any = None):
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class MemoryBackend:
+    """Per-process backend for `make_backend`, bounded by `maxsize` entries."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+        # Bounded like the entries they guard. A counter that expired or was evicted restarts above
+        # every value handed out before, so entries stored under its old values never match again.
+        self._counters = TTLCache(maxsize, ttl)
+        self._counter_floor = 0
+
+    async def get(self, key):
+        return self._cache.get(key)
+
+    async def set(self, key, value):
+        self._cache.set(key, value)
+
+    async def delete(self, key):
+        self._cache.delete(key)
+
+    def _counter(self, key) -> int:
+        value = self._counters.get(key)
+        if value is None:
+            self._counter_floor += 1
+            value = self._counter_floor
+            self._counters.set(key, value)
+        return value
+
+    async def counter(self, key) -> int:
+        return self._counter(key)
+
+    async def get_with_counter(self, key) -> tuple:
+        """(`get(key)`, `counter(key)`)."""
+        return self._cache.get(key), self._counter(key)
+
+    async def incr(self, key) -> int:
+        """Increment a counter by one, renewing its TTL."""
+        value = self._counter(key) + 1
+        self._counters.set(key, value)
+        self._counter_floor = max(self._counter_floor, value)
+        return value
+
+    def size(self) -> Optional[int]:
+        return len(self._cache)
+
+
+class RedisBackend:
+    """Shared backend for multi-worker deployments. Values must be JSON serializable."""
+
+    def __init__(self, namespace: str, ttl: float):
+        self.namespace = namespace
+        self.ttl = ttl
+
+    @property
+    def _redis(self):
+        return redis_client()
+
+    async def get(self, key):
+        raw = await self._redis.get(f"{self.namespace}:{key}")
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key, value):
+        await self._redis.set(f"{self.namespace}:{key}", json.dumps(value), ex=max(1, int(self.ttl)))
+
+    async def delete(self, key):
+        await self._redis.delete(f"{self.namespace}:{key}")
+
+    async def counter(self, key) -> int:
+        raw = await self._redis.get(f"{self.namespace}:counter:{key}")
+        return int(raw) if raw is not None else 0
+
+    async def get_with_counter(self, key) -> tuple:
+        """(`get(key)`, `counter(key)`) in one round trip (MGET)."""
+        raw, counter = await self._redis.mget(f"{self.namespace}:{key}", f"{self.namespace}:counter:{key}")
+        return (json.loads(raw) if raw is not None else None), (int(counter) if counter is not None else 0)
+
+    async def incr(self, key) -> int:
+        """Increment a counter atomically (INCR); counters have no TTL."""
+        return await self._redis.incr(f"{self.namespace}:counter:{key}")
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+def make_backend(namespace: str, maxsize: int, ttl: float):
+    """Pick the cache backend from `CACHE_BACKEND` ("memory" or "redis")."""
+    if CACHE_BACKEND == "redis":
+        if not REDIS_URL:
+            raise ValueError("CACHE_BACKEND=redis requires REDIS_URL.")
+        return RedisBackend(namespace, ttl)
+    return MemoryBackend(maxsize, ttl)
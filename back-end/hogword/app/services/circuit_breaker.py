@@ -0,0 +1,139 @@
+"""
+Circuit breaker around the n8n webhook.
+
+The breaker keeps the outcome of the last `CIRCUIT_WINDOW` calls. Once at least
+`CIRCUIT_MIN_CALLS` are recorded and either the failure rate reaches `CIRCUIT_FAILURE_RATE` or the
+share of calls slower than `CIRCUIT_SLOW_CALL_SECONDS` reaches `CIRCUIT_SLOW_CALL_RATE`, it opens:
+validations are answered by the local fallback scorer without calling n8n. After
+`CIRCUIT_OPEN_SECONDS` it goes half-open and lets `CIRCUIT_HALF_OPEN_PROBES` real calls through.
+If they all succeed (and are not slow) it closes; if any fails it opens again.
+
+State is per worker process.
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CIRCUIT_ENABLED = os.environ.get("CIRCUIT_ENABLED", "1") == "1"
+CIRCUIT_WINDOW = int(os.environ.get("CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_CALLS = int(os.environ.get("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_FAILURE_RATE = float(os.environ.get("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.environ.get("CIRCUIT_SLOW_CALL_SECONDS", "10"))
+CIRCUIT_SLOW_CALL_RATE = float(os.environ.get("CIRCUIT_SLOW_CALL_RATE", "0.8"))
+CIRCUIT_OPEN_SECONDS = float(os.environ.get("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.environ.get("CIRCUIT_HALF_OPEN_PROBES", "2"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised by `CircuitBreaker.guard` when the call is not allowed through."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.outcomes = deque(maxlen=CIRCUIT_WINDOW)  # (failed, slow) per call
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.half_open_round = 0  # probes from an earlier half-open period are ignored
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allows_calls(self) -> bool:
+        """Whether a call would be let through right now (moves an expired open circuit to half-open)."""
+        if not CIRCUIT_ENABLED or self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < CIRCUIT_OPEN_SECONDS:
+                return False
+            self.state = HALF_OPEN
+            self.half_open_round += 1
+            self.probes_in_flight = 0
+            self.probe_successes = 0
+        return self.probes_in_flight + self.probe_successes < CIRCUIT_HALF_OPEN_PROBES
+
+    @contextmanager
+    def guard(self):
+        """Run one upstream call through the breaker; raises `CircuitOpen` if it is not allowed."""
+        if not CIRCUIT_ENABLED:
+            yield
+            return
+        if not self.allows_calls():
+            self.rejected += 1
+            raise CircuitOpen(f"Circuit '{self.name}' is open.")
+        probe = self.half_open_round if self.state == HALF_OPEN else None
+        if probe is not None:
+            self.probes_in_flight += 1
+        start = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            # A cancelled caller says nothing about the upstream
+            self._release_probe(probe)
+            raise
+        except Exception:
+            self._record(True, time.monotonic() - start, probe)
+            raise
+        else:
+            self._record(False, time.monotonic() - start, probe)
+
+    def _release_probe(self, probe) -> bool:
+        """Returns whether the probe belongs to the current half-open period."""
+        if probe is None or self.state != HALF_OPEN or probe != self.half_open_round:
+            return False
+        self.probes_in_flight -= 1
+        return True
+
+    def _record(self, failed: bool, elapsed: float, probe):
+        slow = elapsed >= CIRCUIT_SLOW_CALL_SECONDS
+        if probe is not None:
+            if not self._release_probe(probe):
+                return
+            if failed or slow:
+                self._open()
+            else:
+                self.probe_successes += 1
+                if self.probe_successes >= CIRCUIT_HALF_OPEN_PROBES:
+                    self.state = CLOSED
+                    self.outcomes.clear()
+            return
+        if self.state != CLOSED:
+            return
+        self.outcomes.append((failed, slow))
+        if len(self.outcomes) >= CIRCUIT_MIN_CALLS:
+            failures = sum(1 for f, _ in self.outcomes if f)
+            slow_calls = sum(1 for _, s in self.outcomes if s)
+            if failures / len(self.outcomes) >= CIRCUIT_FAILURE_RATE or slow_calls / len(self.outcomes) >= CIRCUIT_SLOW_CALL_RATE:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+        self.times_opened += 1
+
+    def as_dict(self):
+        failures = sum(1 for f, _ in self.outcomes if f)
+        slow_calls = sum(1 for _, s in self.outcomes if s)
+        return {
+            "enabled": CIRCUIT_ENABLED,
+            "name": self.name,
+            "state": self.state,
+            "open": self.state != CLOSED,
+            "window_calls": len(self.outcomes),
+            "window_failures": failures,
+            "window_slow_calls": slow_calls,
+            "seconds_until_half_open": round(max(0.0, self.opened_at + CIRCUIT_OPEN_SECONDS - time.monotonic()), 3)
+            if self.state == OPEN else 0.0,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+        }
+
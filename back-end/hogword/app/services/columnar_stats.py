@@ -0,0 +1,230 @@
+"""
+Vectorized (NumPy) computation of dashboard statistics for one user or a whole cohort.
+
+Logs are transposed into columns once; strings are dictionary-encoded into integer codes
+and every per-user / per-day / per-level / per-word aggregate is a `bincount` over the codes.
+Sums are accumulated in row order, so averages match `stats_service.compute_dashboard_stats`
+bit for bit. Totals of compacted history (`stats_store.LogRollup`) are added per user afterwards.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+from app.services.stats_store import (
+    LogRollup,
+    UserStats,
+    DIFFICULTY_LEVEL_MAP,
+    DIFFICULTY_ORDER,
+    WINDOW_DAYS,
+    SUMMARY_MAX_SCORE_POINTS,
+    aggregate_score_points,
+    with_rollup,
+)
+
+LOG_COLUMNS = ("user_id", "created_at", "word", "score", "difficulty", "status")
+
+
+def to_columns(logs: List[Dict]) -> Dict[str, list]:
+    """Transpose PostgREST rows into columns."""
+    return {column: [log.get(column) for log in logs] for column in LOG_COLUMNS}
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _float_column(values) -> np.ndarray:
+    try:
+        return np.array(values, dtype=float)
+    except (ValueError, TypeError):
+        return np.array([_to_float(v) for v in values], dtype=float)
+
+
+def _is_date(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _encode(values) -> tuple:
+    """Dictionary-encode a column into (distinct values in first-seen order, int codes)."""
+    distinct = list(dict.fromkeys(values))
+    codes = {value: code for code, value in enumerate(distinct)}
+    return distinct, np.fromiter(map(codes.__getitem__, values), dtype=np.int64, count=len(values))
+
+
+def aggregate(
+    columns: Dict[str, list],
+    now: Optional[datetime] = None,
+    score_points: str = "full",
+    max_points: Optional[int] = None,
+    user_ids: Optional[List[str]] = None,
+    rollups: Optional[Dict[str, LogRollup]] = None,
+) -> Dict[str, dict]:
+    """
+    Compute `SummaryResponse` payloads for every user present in `columns`, plus ones for any
+    `user_ids` without rows. Rows must be ordered by `created_at`, like `repository.list_logs`
+    returns them, and come after the user's compacted history in `rollups`, if any.
+    """
+    now = now or datetime.utcnow()
+    rollups = rollups or {}
+    results = {
+        user_id: UserStats(rollups.get(user_id)).summary(now, max_points, [] if score_points == "full" else None)
+        for user_id in (user_ids or [])
+    }
+    if not len(columns["created_at"]):
+        return results
+
+    # --- Encode columns ---
+    user_values, user_idx = _encode(columns["user_id"])
+    word_values, word_idx = _encode(columns["word"])
+    diff_values, diff_idx = _encode(columns["difficulty"])
+    status_values, status_idx = _encode(columns["status"])
+    scores = _float_column(columns["score"])
+
+    # Only the date part matters for bucketing, and there are far fewer distinct days than rows
+    # (a fixed-width "U10" array truncates in C; non-strings end up as values `_is_date` rejects)
+    day_values, day_idx = _encode(np.array(columns["created_at"], dtype="U10").tolist())
+    valid_day = np.array([_is_date(d) for d in day_values], dtype=bool)[day_idx]
+
+    def has_status(name):
+        return status_idx == status_values.index(name) if name in status_values else np.zeros(len(status_idx), dtype=bool)
+
+    n_users = len(user_values)
+    n_words = len(word_values)
+    today = now.date().isoformat()
+
+    # --- Skips today ---
+    resigned = has_status("resigned") & valid_day & np.array([d >= today for d in day_values], dtype=bool)[day_idx]
+    today_skip = np.bincount(user_idx[resigned], minlength=n_users)
+
+    # --- Completed attempts ---
+    completed = np.flatnonzero(has_status("completed") & valid_day & ~np.isnan(scores))
+    c_user = user_idx[completed]
+    c_word = word_idx[completed]
+    c_diff = diff_idx[completed]
+    c_day = day_idx[completed]
+    c_score = scores[completed]
+    m = len(completed)
+
+    # Attempt number of each row within its (user, word) group, in row order
+    group_key = c_user.astype(np.int64) * n_words + c_word
+    order = np.argsort(group_key, kind="stable")
+    sorted_key = group_key[order]
+    positions = np.arange(m)
+    starts = np.ones(m, dtype=bool)
+    starts[1:] = sorted_key[1:] != sorted_key[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, positions, 0))
+    attempts = np.empty(m, dtype=np.int64)
+    attempts[order] = positions - group_start + 1
+    user_rollups = [rollups.get(user_id) or LogRollup() for user_id in user_values]
+    if any(rollup.word_attempts for rollup in user_rollups) and m:
+        # Attempt numbers continue from the compacted history: one offset per (user, word) group
+        group_keys = sorted_key[starts]
+        offsets = np.array([
+            user_rollups[key // n_words].word_attempts.get(word_values[key % n_words], 0) for key in group_keys.tolist()
+        ], dtype=np.int64)
+        attempts[order] += offsets[np.cumsum(starts) - 1]
+
+    total_sum = np.bincount(c_user, weights=c_score, minlength=n_users)
+    total_count = np.bincount(c_user, minlength=n_users)
+
+    # Per-level sums, listed in first-seen order before sorting by DIFFICULTY_ORDER
+    n_diffs = len(diff_values)
+    level_key = c_user.astype(np.int64) * n_diffs + c_diff
+    level_sum = np.bincount(level_key, weights=c_score, minlength=n_users * n_diffs)
+    level_count = np.bincount(level_key, minlength=n_users * n_diffs)
+    level_keys, level_first = np.unique(level_key, return_index=True)
+    level_totals_by_user = [{} for _ in range(n_users)]
+    for key in level_keys[np.argsort(level_first, kind="stable")].tolist():
+        user, diff = divmod(key, n_diffs)
+        level_totals_by_user[user][diff_values[diff]] = [float(level_sum[key]), int(level_count[key])]
+    levels_by_user = [
+        [
+            {"level": DIFFICULTY_LEVEL_MAP.get(lvl, lvl), "score": round(score_sum / count, 2)}
+            for lvl, (score_sum, count) in with_rollup(totals, rollup.level_totals).items()
+        ]
+        for totals, rollup in zip(level_totals_by_user, user_rollups)
+    ]
+
+    # --- 7-day window ---
+    window = [(now - timedelta(days=WINDOW_DAYS - 1 - i)).date().isoformat() for i in range(WINDOW_DAYS)]
+    window_pos = np.full(len(day_values), -1, dtype=np.int64)
+    day_codes = {d: code for code, d in enumerate(day_values)}
+    for pos, d in enumerate(window):
+        if d in day_codes:
+            window_pos[day_codes[d]] = pos
+    c_pos = window_pos[c_day]
+    in_window = c_pos >= 0
+    day_key = c_user[in_window].astype(np.int64) * WINDOW_DAYS + c_pos[in_window]
+    day_sum = np.bincount(day_key, weights=c_score[in_window], minlength=n_users * WINDOW_DAYS)
+    day_count = np.bincount(day_key, minlength=n_users * WINDOW_DAYS)
+
+    word_key = day_key * n_words + c_word[in_window]
+    word_keys, word_first, word_counts = np.unique(word_key, return_index=True, return_counts=True)
+    words_by_day = {}
+    first_order = np.argsort(word_first, kind="stable")
+    for key, count in zip(word_keys[first_order].tolist(), word_counts[first_order].tolist()):
+        slot, word = divmod(key, n_words)
+        words_by_day.setdefault(slot, {})[word_values[word]] = count
+
+    # --- score_count_data ---
+    display_diffs = [DIFFICULTY_LEVEL_MAP.get(d, d) for d in diff_values]
+    points_by_user = [[] for _ in range(n_users)]
+    if score_points == "full":
+        by_user = np.argsort(c_user, kind="stable")
+        for user, count, score, diff in zip(
+            c_user[by_user].tolist(), attempts[by_user].tolist(), c_score[by_user].tolist(), c_diff[by_user].tolist()
+        ):
+            points_by_user[user].append({"count": count, "score": score, "difficulty": display_diffs[diff]})
+    else:
+        display_values, display_idx = _encode(display_diffs)
+        c_display = display_idx[c_diff]
+        max_attempt = int(attempts.max()) + 1 if m else 1
+        point_key = (c_user.astype(np.int64) * max_attempt + attempts) * len(display_values) + c_display
+        point_keys, point_inverse = np.unique(point_key, return_inverse=True)
+        point_sum = np.bincount(point_inverse, weights=c_score, minlength=len(point_keys))
+        point_count = np.bincount(point_inverse, minlength=len(point_keys))
+        totals_by_user = [{} for _ in range(n_users)]
+        for key, score_sum, count in zip(point_keys.tolist(), point_sum.tolist(), point_count.tolist()):
+            rest, display = divmod(key, len(display_values))
+            user, attempt = divmod(rest, max_attempt)
+            totals_by_user[user][(attempt, display_values[display])] = [score_sum, count]
+        points_by_user = [
+            aggregate_score_points(with_rollup(totals, rollup.point_totals), max_points or SUMMARY_MAX_SCORE_POINTS)
+            for totals, rollup in zip(totals_by_user, user_rollups)
+        ]
+
+    # --- Format outputs ---
+    for user in range(n_users):
+        word_per_day = []
+        score_per_day = []
+        for pos, d in enumerate(window):
+            slot = user * WINDOW_DAYS + pos
+            word_per_day.append({"date": d, "words": words_by_day.get(slot, {})})
+            avg_s = float(day_sum[slot] / day_count[slot]) if day_count[slot] else 0
+            score_per_day.append({"date": d, "score": round(avg_s, 2)})
+
+        today_slot = user * WINDOW_DAYS + WINDOW_DAYS - 1
+        avg_score_today = float(day_sum[today_slot] / day_count[today_slot]) if day_count[today_slot] else 0
+        rollup = user_rollups[user]
+        count = int(total_count[user]) + rollup.total_count
+        avg_score_all = (float(total_sum[user]) + rollup.total_sum) / count if count else 0
+
+        avg_score_level = levels_by_user[user]
+        avg_score_level.sort(key=lambda x: DIFFICULTY_ORDER.index(x["level"]) if x["level"] in DIFFICULTY_ORDER else 999)
+
+        results[user_values[user]] = {
+            "avg_score_today": round(avg_score_today, 2),
+            "avg_score_all": round(avg_score_all, 2),
+            "today_skip": int(today_skip[user]),
+            "word_per_day": word_per_day,
+            "score_per_day": score_per_day,
+            "avg_score_level": avg_score_level,
+            "score_count_data": points_by_user[user]
+        }
+    return results
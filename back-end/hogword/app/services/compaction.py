@@ -0,0 +1,224 @@
+"""
+Compaction of old practice_logs into rollup tables.
+
+Logs created more than `COMPACTION_RETENTION_DAYS` days ago (from midnight UTC) are folded into
+per-user per-day, per-word and per-(attempt number, difficulty) rollup rows and deleted by
+`compact_practice_logs` (schema.sql), one user per transaction. Every stats mode adds the per-word
+and per-attempt totals (`stats_store.LogRollup`) to its pass over practice_logs, so averages and the
+aggregated `score_count_data` do not change (beyond an average on a rounding tie moving by 0.01, as
+the sums are added in another order) and a dashboard rebuild reads O(words + attempt numbers) rows
+for the compacted part. `score_points=full` needs one point per attempt, which the rollups do not
+keep, so it is refused (`stats_store.FullPointsUnavailable`) for users with compacted history.
+Active and provisional logs, the user's current log and everything after them are kept.
+
+With `COMPACTION_ARCHIVE_DIR` set, a user's raw rows are first written there as a compressed
+NumPy columnar file (`<user_id>-<cutoff date>-<unix time>.npz`, one array per column). The CSV
+export only covers logs that are still in practice_logs.
+
+`COMPACTION_ENABLED=1` runs a pass every `COMPACTION_INTERVAL` seconds and makes the stats read the
+rollups, so it is set on every worker and stays set once a pass has run; nothing is compacted while
+it is 0. Only the holder of the `compaction` lease (`app.services.leases`) runs the periodic passes;
+a pass on another process at the same time is still safe, as each user is compacted under their
+user_state lock. One-off run over every user:
+    python -m app.services.compaction run
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from app.db import repository
+from app.services import leases, stats_store, summary_cache, write_behind
+from app.services.stats_store import WINDOW_DAYS, COMPACTION_ENABLED
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Never shorter than the dashboard's day window, which is always read from practice_logs
+COMPACTION_RETENTION_DAYS = max(WINDOW_DAYS, int(os.environ.get("COMPACTION_RETENTION_DAYS", "90")))
+COMPACTION_INTERVAL = float(os.environ.get("COMPACTION_INTERVAL", "3600"))
+COMPACTION_BATCH_SIZE = int(os.environ.get("COMPACTION_BATCH_SIZE", "100"))
+COMPACTION_ARCHIVE_DIR = os.environ.get("COMPACTION_ARCHIVE_DIR", "")
+
+ARCHIVE_PAGE_SIZE = 1000
+ARCHIVE_COLUMNS = (
+    "id", "user_id", "word", "difficulty", "sentence", "score", "level", "suggestion",
+    "corrected_sentence", "provisional", "status", "created_at", "updated_at",
+)
+
+
+class CompactionDisabled(Exception):
+    """Raised when compaction is asked to run while COMPACTION_ENABLED is off."""
+
+
+class CompactionStats:
+    def __init__(self):
+        self.passes = 0
+        self.users_compacted = 0
+        self.logs_compacted = 0
+        self.logs_archived = 0
+        self.failures = 0
+        self.last_pass_at: Optional[float] = None
+
+    def as_dict(self):
+        return {
+            "enabled": COMPACTION_ENABLED,
+            "running": _task is not None,
+            "lease_held": leases.held(LEASE_NAME),
+            "retention_days": COMPACTION_RETENTION_DAYS,
+            "archive": bool(COMPACTION_ARCHIVE_DIR),
+            "passes": self.passes,
+            "users_compacted": self.users_compacted,
+            "logs_compacted": self.logs_compacted,
+            "logs_archived": self.logs_archived,
+            "failures": self.failures,
+            "seconds_since_last_pass": round(time.time() - self.last_pass_at, 1) if self.last_pass_at else None,
+        }
+
+
+compaction_stats = CompactionStats()
+
+LEASE_NAME = "compaction"
+
+_task: Optional[asyncio.Task] = None
+
+
+def retention_cutoff(now: Optional[datetime] = None) -> str:
+    """Midnight UTC `COMPACTION_RETENTION_DAYS` days ago, as an ISO timestamp."""
+    now = now or datetime.now(timezone.utc)
+    day = (now - timedelta(days=COMPACTION_RETENTION_DAYS)).date()
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc).isoformat()
+
+
+def _column(logs: List[dict], name: str) -> np.ndarray:
+    values = [log.get(name) for log in logs]
+    if name == "score":
+        return np.array([np.nan if value is None else float(value) for value in values], dtype=float)
+    if name == "provisional":
+        return np.array([bool(value) for value in values], dtype=bool)
+    # Fixed-width strings, so the file loads without pickle; NULL becomes ""
+    return np.array(["" if value is None else str(value) for value in values], dtype=str)
+
+
+def write_archive(path: str, logs: List[dict]):
+    np.savez_compressed(path, **{name: _column(logs, name) for name in ARCHIVE_COLUMNS})
+
+
+async def _archive(user_id: str, cutoff: str) -> int:
+    logs = []
+    while True:
+        # Keyset pages, so PostgREST's row limit never cuts the archive short
+        page = await repository.list_logs_page(
+            user_id, ",".join(ARCHIVE_COLUMNS), until=cutoff, desc=False,
+            before=(logs[-1]["created_at"], logs[-1]["id"]) if logs else None, limit=ARCHIVE_PAGE_SIZE,
+        )
+        logs.extend(page)
+        if len(page) < ARCHIVE_PAGE_SIZE:
+            break
+    if logs:
+        os.makedirs(COMPACTION_ARCHIVE_DIR, exist_ok=True)
+        name = f"{user_id}-{cutoff[:10]}-{int(time.time())}.npz"
+        await asyncio.to_thread(write_archive, os.path.join(COMPACTION_ARCHIVE_DIR, name), logs)
+    return len(logs)
+
+
+async def compact_user(user_id: str, before: str) -> int:
+    """Compact one user's logs created before `before` (or their safe cutoff); returns how many."""
+    await write_behind.flush_user(user_id)
+    if COMPACTION_ARCHIVE_DIR:
+        cutoff = await repository.compaction_cutoff(user_id, before)
+        if cutoff is None:
+            return 0
+        # The compaction below re-checks the cutoff, so it never removes a row missing from the archive
+        compaction_stats.logs_archived += await _archive(user_id, cutoff)
+        before = cutoff
+    result = await repository.compact_logs(user_id, before)
+    compacted = (result or {}).get("compacted", 0)
+    if compacted:
+        # The aggregated numbers are unchanged, but cached aggregates and full summaries predate the
+        # rollups and would keep serving the full list
+        stats_store.invalidate(user_id)
+        await summary_cache.invalidate(user_id)
+        compaction_stats.users_compacted += 1
+        compaction_stats.logs_compacted += compacted
+    return compacted
+
+
+async def run_once(now: Optional[datetime] = None) -> int:
+    """Compact one batch of users; returns how many logs were compacted."""
+    if not COMPACTION_ENABLED:
+        # The stats would not read the rollups, so the compacted history would vanish from dashboards
+        raise CompactionDisabled()
+    compaction_stats.passes += 1
+    compaction_stats.last_pass_at = time.time()
+    before = retention_cutoff(now)
+
+    compacted = 0
+    for user_id in await repository.compaction_candidates(before, COMPACTION_BATCH_SIZE):
+        try:
+            compacted += await compact_user(user_id, before)
+        except Exception as e:
+            compaction_stats.failures += 1
+            logger.warning("Compaction of user %s failed: %r", user_id, e)
+    return compacted
+
+
+async def run(now: Optional[datetime] = None) -> int:
+    """Compact every user with logs past the retention window."""
+    total = 0
+    while True:
+        compacted = await run_once(now)
+        if not compacted:
+            return total
+        total += compacted
+
+
+async def _loop():
+    while True:
+        await asyncio.sleep(COMPACTION_INTERVAL)
+        try:
+            if await leases.acquire(LEASE_NAME, 2 * COMPACTION_INTERVAL):
+                await run_once()
+        except Exception as e:
+            logger.warning("Compaction pass failed: %r", e)
+
+
+async def startup():
+    """Start the compaction loop. Called from the FastAPI lifespan."""
+    global _task
+    if COMPACTION_ENABLED and _task is None:
+        _task = asyncio.create_task(_loop())
+
+
+async def shutdown():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+    await leases.release(LEASE_NAME)
+
+
+def stats() -> dict:
+    return compaction_stats.as_dict()
+
+
+async def _main(argv):
+    if argv != ["run"]:
+        print("Usage: python -m app.services.compaction run")
+        return 2
+    if not COMPACTION_ENABLED:
+        print("Compaction is disabled; set COMPACTION_ENABLED=1 (on every worker too)")
+        return 2
+    compacted = await run()
+    print({"compacted": compacted, **stats()})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,118 @@
+"""
+In-process sentence scorer used while the n8n validator is unavailable.
+
+It only checks what can be checked without a language model: whether the practice word (or a
+regular inflection of it) is used, and surface structure such as length, capitalisation, final
+punctuation and repeated words. Scores are deliberately conservative (at most
+`FALLBACK_MAX_SCORE`), and every result is marked `provisional` so it can be re-graded by n8n later.
+"""
+import os
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FALLBACK_MAX_SCORE = float(os.environ.get("FALLBACK_MAX_SCORE", "7"))
+
+PROVISIONAL_NOTE = "Provisional score: full feedback will replace it shortly."
+
+_TOKEN = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+_VOWELS = set("aeiou")
+
+
+def inflections(word: str) -> set:
+    """Regular inflections of `word` (plural / third person, past, -ing, comparative, -ly)."""
+    word = word.lower()
+    forms = {word, word + "s", word + "es", word + "ed", word + "ing", word + "er", word + "est", word + "ly"}
+    if word.endswith("e"):
+        stem = word[:-1]
+        forms |= {word + "d", word + "r", word + "st", stem + "ing"}
+        if word.endswith("le"):
+            forms.add(stem[:-1] + "ly")
+    if word.endswith("y") and len(word) > 1 and word[-2] not in _VOWELS:
+        stem = word[:-1]
+        forms |= {stem + "ies", stem + "ied", stem + "ier", stem + "iest", stem + "ily"}
+    if word.endswith("ie"):
+        forms.add(word[:-2] + "ying")
+    # Consonant doubling for short consonant-vowel-consonant endings (stop -> stopped)
+    if len(word) >= 3 and word[-1] not in _VOWELS | set("wxy") and word[-2] in _VOWELS and word[-3] not in _VOWELS:
+        forms |= {word + word[-1] + suffix for suffix in ("ed", "ing", "er", "est")}
+    return forms
+
+
+def _word_usage(word: str, tokens: list) -> str:
+    """Returns "exact", "inflected" or "missing"."""
+    lowered = [token.lower() for token in tokens]
+    parts = word.lower().split()
+    if len(parts) > 1:
+        # Multi-word entries ("give up"): the last part may be inflected
+        for i in range(len(lowered) - len(parts) + 1):
+            window = lowered[i:i + len(parts)]
+            if window[:-1] == parts[:-1]:
+                if window[-1] == parts[-1]:
+                    return "exact"
+                if window[-1] in inflections(parts[-1]):
+                    return "inflected"
+        return "missing"
+    if word.lower() in lowered:
+        return "exact"
+    forms = inflections(word)
+    if any(token in forms for token in lowered):
+        return "inflected"
+    return "missing"
+
+
+def score(word: str, user_sentence: str) -> dict:
+    """Grade a sentence with heuristics; same shape as the n8n result plus `provisional: True`."""
+    sentence = " ".join(user_sentence.split())
+    tokens = _TOKEN.findall(sentence)
+    usage = _word_usage(word, tokens)
+    hints = []
+
+    if usage == "missing":
+        points = 1.0 if tokens else 0.0
+        hints.append(f"Use the word '{word}' in your sentence.")
+    elif len(tokens) <= len(word.split()):
+        points = 2.0
+        hints.append(f"Write a full sentence around '{word}', not just the word itself.")
+    else:
+        points = 5.0 if usage == "exact" else 4.5
+        if len(tokens) < 5:
+            points += 0.5
+            hints.append("Try a longer sentence that shows what the word means.")
+        elif len(tokens) <= 30:
+            points += 1.5
+        else:
+            points += 0.5
+            hints.append("Try splitting this into shorter sentences.")
+
+        if sentence[:1].isupper():
+            points += 0.5
+        else:
+            hints.append("Start the sentence with a capital letter.")
+        if sentence[-1:] in ".!?":
+            points += 0.5
+        else:
+            hints.append("End the sentence with punctuation.")
+
+        lowered = [token.lower() for token in tokens]
+        repeated = any(a == b for a, b in zip(lowered, lowered[1:]))
+        if repeated:
+            points -= 1.0
+            hints.append("Check for repeated words.")
+        elif len(set(lowered)) >= 0.6 * len(lowered):
+            points += 0.5
+
+    corrected = sentence
+    if corrected:
+        corrected = corrected[0].upper() + corrected[1:]
+        if corrected[-1] not in ".!?":
+            corrected += "."
+
+    return {
+        "score": round(max(0.0, min(points, FALLBACK_MAX_SCORE)), 1),
+        "level": None,
+        "suggestion": " ".join(hints + [PROVISIONAL_NOTE]),
+        "corrected_sentence": corrected,
+        "provisional": True,
+    }
@@ -0,0 +1,53 @@
+"""
+Leases that let one process at a time run a background loop, across workers and hosts.
+
+Every worker runs the re-grading and compaction loops, but a pass only starts after
+`acquire(name, seconds)` took or renewed the lease (`background_leases` in schema.sql). The holder
+renews it each pass; if it dies, another worker takes over once `seconds` have passed, and a
+clean shutdown hands it over right away (`release`).
+"""
+import os
+import uuid
+import socket
+import logging
+from app.db import repository
+
+logger = logging.getLogger(__name__)
+
+_holder = None
+_holder_pid = None
+_held = set()
+
+
+def holder() -> str:
+    """This process's holder id; made on first use, so processes forked after an import differ."""
+    global _holder, _holder_pid
+    if _holder_pid != os.getpid():
+        _holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        _holder_pid = os.getpid()
+        _held.clear()
+    return _holder
+
+
+async def acquire(name: str, seconds: float) -> bool:
+    """Take or renew the lease `name` for `seconds`; False while another process holds it."""
+    if await repository.acquire_lease(name, holder(), seconds):
+        _held.add(name)
+        return True
+    _held.discard(name)
+    return False
+
+
+async def release(name: str):
+    """Give the lease up if this process holds it. Errors are logged, the lease then just expires."""
+    if name not in _held:
+        return
+    _held.discard(name)
+    try:
+        await repository.release_lease(name, holder())
+    except Exception as e:
+        logger.warning("Could not release the %s lease: %r", name, e)
+
+
+def held(name: str) -> bool:
+    return name in _held
@@ -0,0 +1,181 @@
+"""
+In-process metrics in the Prometheus text format, served on `/metrics`.
+
+- Route latency, per-request upstream call counts and upstream call latency are histograms.
+- Upstream calls (Supabase, n8n) are timed with `track`, which also adds them to the current
+  request's breakdown (a contextvar set up by `MetricsMiddleware`). With
+  `METRICS_TIMING_HEADER=1` that breakdown is returned as a `Server-Timing` header.
+- Cache hit ratios, pool and queue gauges are read from the services' own `stats()` when
+  `/metrics` is scraped, so they cost nothing per request.
+
+Each worker process keeps its own registry; scrape every worker (or run one worker per pod).
+"""
+import os
+import time
+import bisect
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+METRICS_TIMING_HEADER = os.environ.get("METRICS_TIMING_HEADER", "0") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21)
+
+
+class Gauge:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: Dict[tuple, float] = {}
+
+    def set(self, *label_values, value: float):
+        self.values[label_values] = value
+
+    def inc(self, *label_values, amount: float = 1.0):
+        self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets)
+        self.values: Dict[tuple, list] = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, *label_values, value: float):
+        entry = self.values.get(label_values)
+        if entry is None:
+            entry = self.values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            entry[index] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, entry in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                labels = _labels(self.labels + ("le",), label_values + (_number(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labels + ("le",), label_values + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {entry[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {entry[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {entry[-1]}")
+        return lines
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+request_latency = Histogram(
+    "hogword_http_request_duration_seconds", "Request latency by route.", ("method", "route", "status")
+)
+requests_in_flight = Gauge("hogword_http_requests_in_flight", "Requests currently being handled.")
+upstream_latency = Histogram(
+    "hogword_upstream_call_duration_seconds", "Latency of calls to Supabase and n8n.", ("upstream", "outcome")
+)
+upstream_calls_per_request = Histogram(
+    "hogword_upstream_calls_per_request", "Upstream calls made while handling one request.",
+    ("route", "upstream"), buckets=CALL_COUNT_BUCKETS,
+)
+
+_registry = [request_latency, requests_in_flight, upstream_latency, upstream_calls_per_request]
+_collectors: List[Tuple[str, Callable[[], dict]]] = []
+
+# upstream -> [calls, seconds] for the request being handled
+_request_calls: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_calls", default=None)
+
+
+def register_collector(prefix: str, collect: Callable[[], dict]):
+    """Export the numeric fields of `collect()` as `hogword_<prefix>_<field>` gauges on each scrape."""
+    _collectors.append((prefix, collect))
+
+
+@contextmanager
+def track(upstream: str):
+    """Time one upstream call and count it against the current request."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        upstream_latency.observe(upstream, outcome, value=elapsed)
+        calls = _request_calls.get()
+        if calls is not None:
+            entry = calls.setdefault(upstream, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+
+def start_request() -> Optional[contextvars.Token]:
+    if not METRICS_ENABLED:
+        return None
+    requests_in_flight.inc(amount=1)
+    return _request_calls.set({})
+
+
+def current_calls() -> dict:
+    return _request_calls.get() or {}
+
+
+def finish_request(token: Optional[contextvars.Token], method: str, route: str, status: int, elapsed: float) -> dict:
+    """Record a finished request; returns its upstream breakdown."""
+    if token is None:
+        return {}
+    calls = _request_calls.get() or {}
+    _request_calls.reset(token)
+    requests_in_flight.inc(amount=-1)
+    request_latency.observe(method, route, str(status), value=elapsed)
+    for upstream in ("supabase", "supabase_auth", "n8n"):
+        upstream_calls_per_request.observe(route, upstream, value=calls.get(upstream, [0])[0])
+    return calls
+
+
+def server_timing(calls: dict, elapsed: float) -> str:
+    parts = [f'{name};dur={seconds * 1000:.1f};desc="{count} calls"' for name, (count, seconds) in calls.items()]
+    parts.append(f"total;dur={elapsed * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for prefix, collect in _collectors:
+        for field, value in collect().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"hogword_{prefix}_{field}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
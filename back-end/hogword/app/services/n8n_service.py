@@ -1,13 +1,137 @@
 import httpx
 import os
+import time
+import random
+import asyncio
+import logging
+import importlib.util
+from typing import Optional
 from dotenv import load_dotenv
+from app.services import validation_cache, metrics, admission, fallback_scorer
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpen
 
 load_dotenv()
 N8N_WEBHOOK_URL = os.environ.get("N8N_WEBHOOK_URL")
 
+logger = logging.getLogger(__name__)
+
+# Connection pool / timeout tuning for the shared webhook client
+N8N_MAX_CONNECTIONS = int(os.environ.get("N8N_MAX_CONNECTIONS", "20"))
+N8N_MAX_KEEPALIVE = int(os.environ.get("N8N_MAX_KEEPALIVE", "10"))
+N8N_KEEPALIVE_EXPIRY = float(os.environ.get("N8N_KEEPALIVE_EXPIRY", "30"))
+N8N_CONNECT_TIMEOUT = float(os.environ.get("N8N_CONNECT_TIMEOUT", "5"))
+N8N_READ_TIMEOUT = float(os.environ.get("N8N_READ_TIMEOUT", "30"))
+N8N_POOL_TIMEOUT = float(os.environ.get("N8N_POOL_TIMEOUT", "5"))
+N8N_HTTP2 = os.environ.get("N8N_HTTP2", "1") == "1"
+
+# Retries only cover failures where the webhook never produced a result
+N8N_MAX_RETRIES = int(os.environ.get("N8N_MAX_RETRIES", "2"))
+N8N_RETRY_BACKOFF = float(os.environ.get("N8N_RETRY_BACKOFF", "0.2"))
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Answer with the local scorer (a provisional result) while the breaker is open or the webhook fails
+N8N_FALLBACK_ENABLED = os.environ.get("N8N_FALLBACK_ENABLED", "1") == "1"
+
+_client: Optional[httpx.AsyncClient] = None
+_pool_slots: Optional[asyncio.Semaphore] = None
+_http2_enabled = N8N_HTTP2 and importlib.util.find_spec("h2") is not None
+
+# Identical validations currently waiting on the webhook: key -> {"task", "waiters"}
+_in_flight = {}
+
+
+class PoolStats:
+    """Counters describing how busy the webhook connection pool is."""
+
+    def __init__(self):
+        self.in_use = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def as_dict(self):
+        return {
+            "max_connections": N8N_MAX_CONNECTIONS,
+            "http2": _http2_enabled,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "retries": self.retries,
+            "coalesced": self.coalesced,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.acquired, 6) if self.acquired else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
+pool_stats = PoolStats()
+breaker = CircuitBreaker("n8n")
+
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_http2_enabled,
+        limits=httpx.Limits(
+            max_connections=N8N_MAX_CONNECTIONS,
+            max_keepalive_connections=N8N_MAX_KEEPALIVE,
+            keepalive_expiry=N8N_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=N8N_CONNECT_TIMEOUT,
+            read=N8N_READ_TIMEOUT,
+            write=N8N_CONNECT_TIMEOUT,
+            pool=N8N_POOL_TIMEOUT,
+        ),
+    )
+
+
+async def startup():
+    """Create the process-wide webhook client. Called from the FastAPI lifespan."""
+    global _client, _pool_slots
+    if _client is None:
+        _client = _create_client()
+        _pool_slots = asyncio.Semaphore(N8N_MAX_CONNECTIONS)
+
+
+async def shutdown():
+    global _client, _pool_slots
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _pool_slots = None
+
+
+async def _post(payload: dict) -> httpx.Response:
+    if _client is None:
+        await startup()
+
+    pool_stats.waiting += 1
+    wait_start = time.perf_counter()
+    async with _pool_slots:
+        waited = time.perf_counter() - wait_start
+        pool_stats.waiting -= 1
+        pool_stats.in_use += 1
+        pool_stats.acquired += 1
+        pool_stats.wait_seconds_total += waited
+        pool_stats.wait_seconds_max = max(pool_stats.wait_seconds_max, waited)
+        try:
+            with metrics.track("n8n"):
+                return await _client.post(N8N_WEBHOOK_URL, json=payload)
+        finally:
+            pool_stats.in_use -= 1
+
+
 async def validate_sentence(word: str, user_sentence: str):
     """
     Sends the word and sentence to n8n webhook for scoring and correction.
+    Results are cached per (word, normalized sentence), so repeated sentences skip the webhook,
+    and concurrent identical requests share a single in-flight webhook call.
+    While the circuit breaker is open, or when the webhook call fails, the local fallback scorer
+    answers instead; its results carry `provisional: True` and are not cached.
     """
     if not N8N_WEBHOOK_URL:
         return {
@@ -17,19 +141,82 @@ async def validate_sentence(word: str, user_sentence: str):
             "corrected_sentence": user_sentence
         }
 
+    cached = await validation_cache.lookup(word, user_sentence)
+    if cached is not None:
+        return cached
+
+    if N8N_FALLBACK_ENABLED and not breaker.allows_calls():
+        breaker.rejected += 1
+        return fallback_scorer.score(word, user_sentence)
+
+    key = validation_cache.make_key(word, user_sentence)
+    try:
+        return await _single_flight(key, lambda: _validate_and_cache(word, user_sentence))
+    except admission.AdmissionRejected:
+        raise
+    except Exception as e:
+        if not N8N_FALLBACK_ENABLED:
+            raise
+        if not isinstance(e, CircuitOpen):
+            logger.warning("n8n validation failed, using the fallback scorer: %r", e)
+        return fallback_scorer.score(word, user_sentence)
+
+
+async def _validate_and_cache(word: str, user_sentence: str):
+    async with admission.upstream_slot():
+        with breaker.guard():
+            result = await _call_webhook(word, user_sentence)
+    if isinstance(result, dict) and result.get("score") is not None:
+        await validation_cache.store(word, user_sentence, result)
+    return result
+
+
+async def _single_flight(key: str, call):
+    """
+    Run `call()` once per key among concurrent callers and share its result or exception.
+    A cancelled caller only stops waiting; the upstream call is cancelled once nobody waits for it.
+    """
+    entry = _in_flight.get(key)
+    if entry is None:
+        entry = {"task": asyncio.ensure_future(call()), "waiters": 0}
+        _in_flight[key] = entry
+        entry["task"].add_done_callback(
+            lambda _: _in_flight.pop(key, None) if _in_flight.get(key) is entry else None
+        )
+    else:
+        pool_stats.coalesced += 1
+
+    entry["waiters"] += 1
+    try:
+        return await asyncio.shield(entry["task"])
+    finally:
+        entry["waiters"] -= 1
+        if entry["waiters"] == 0 and not entry["task"].done():
+            if _in_flight.get(key) is entry:
+                del _in_flight[key]
+            entry["task"].cancel()
+
+
+async def _call_webhook(word: str, user_sentence: str):
+    """
+    POST to the webhook. Connection failures and 502/503/504 responses are retried
+    with jittered exponential backoff.
+    """
     payload = {
         "word": word,
         "user": user_sentence
     }
 
-    async with httpx.AsyncClient() as client:
+    for attempt in range(N8N_MAX_RETRIES + 1):
         try:
-            response = await client.post(N8N_WEBHOOK_URL, json=payload, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
-        except httpx.RequestError as e:
-            # Log error and re-raise for proper error handling
-            raise e
-        except httpx.HTTPStatusError as e:
-            # Log error and re-raise for proper error handling
-            raise e
+            response = await _post(payload)
+        except RETRYABLE_ERRORS:
+            if attempt == N8N_MAX_RETRIES:
+                raise
+        else:
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == N8N_MAX_RETRIES:
+                # Non-2xx responses raise httpx.HTTPStatusError for the router to handle
+                response.raise_for_status()
+                return response.json()
+        pool_stats.retries += 1
+        await asyncio.sleep(random.uniform(0, N8N_RETRY_BACKOFF * (2 ** attempt)))
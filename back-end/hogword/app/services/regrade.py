@@ -0,0 +1,123 @@
+"""
+Background re-grading of provisional practice logs.
+
+Logs graded by the fallback scorer while n8n was unavailable have `provisional = true`. Every
+`REGRADE_INTERVAL` seconds, while the n8n circuit breaker is closed, the oldest
+`REGRADE_BATCH_SIZE` of them are sent through `n8n_service.validate_sentence` and their grade is
+replaced. A pass stops as soon as n8n degrades again, so re-grading never competes with live
+requests for a struggling upstream.
+
+Every worker runs the loop, but only the holder of the `regrade` lease (`app.services.leases`,
+renewed for two intervals each pass) runs a pass. The update only applies while the log is still
+provisional, so a pass that outlasts the lease and overlaps another one still writes each grade once.
+Opt-in (`REGRADE_ENABLED=1`) because the lease needs migrations/003_background_leases.sql; until
+then provisional grades stay as they are unless re-graded through `POST /ops/regrade/run`.
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Optional
+from dotenv import load_dotenv
+from app.db import repository
+from app.services import n8n_service, stats_store, summary_cache, active_log_cache, admission, leases
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REGRADE_ENABLED = os.environ.get("REGRADE_ENABLED", "0") == "1"
+REGRADE_INTERVAL = float(os.environ.get("REGRADE_INTERVAL", "30"))
+REGRADE_BATCH_SIZE = int(os.environ.get("REGRADE_BATCH_SIZE", "20"))
+
+
+class RegradeStats:
+    def __init__(self):
+        self.passes = 0
+        self.regraded = 0
+        self.deferred = 0
+        self.last_pass_at: Optional[float] = None
+
+    def as_dict(self):
+        return {
+            "enabled": REGRADE_ENABLED,
+            "running": _task is not None,
+            "lease_held": leases.held(LEASE_NAME),
+            "passes": self.passes,
+            "regraded": self.regraded,
+            "deferred": self.deferred,
+            "seconds_since_last_pass": round(time.time() - self.last_pass_at, 1) if self.last_pass_at else None,
+        }
+
+
+regrade_stats = RegradeStats()
+
+LEASE_NAME = "regrade"
+
+_task: Optional[asyncio.Task] = None
+
+
+async def run_once() -> int:
+    """Re-grade one batch of provisional logs; returns how many were re-graded."""
+    if not n8n_service.N8N_WEBHOOK_URL or n8n_service.breaker.state != "closed":
+        return 0
+    regrade_stats.passes += 1
+    regrade_stats.last_pass_at = time.time()
+
+    regraded = 0
+    for log in await repository.list_provisional_logs(REGRADE_BATCH_SIZE):
+        try:
+            result = await n8n_service.validate_sentence(log["word"], log["sentence"] or "")
+        except admission.AdmissionRejected:
+            regrade_stats.deferred += 1
+            break
+        if result.get("provisional"):
+            # n8n failed again; leave the rest for a later pass
+            regrade_stats.deferred += 1
+            break
+        payload = {
+            "score": result.get("score"),
+            "level": result.get("level"),
+            "suggestion": result.get("suggestion"),
+            "corrected_sentence": result.get("corrected_sentence"),
+            "provisional": False,
+            "updated_at": "now()",
+        }
+        if await repository.regrade_log(log["id"], payload):
+            regraded += 1
+            user_id = log["user_id"]
+            stats_store.invalidate(user_id)
+            await summary_cache.invalidate(user_id)
+            await active_log_cache.invalidate(user_id)
+    regrade_stats.regraded += regraded
+    return regraded
+
+
+async def _loop():
+    while True:
+        await asyncio.sleep(REGRADE_INTERVAL)
+        try:
+            if await leases.acquire(LEASE_NAME, 2 * REGRADE_INTERVAL):
+                await run_once()
+        except Exception as e:
+            logger.warning("Re-grading pass failed: %r", e)
+
+
+async def startup():
+    """Start the re-grading loop. Called from the FastAPI lifespan."""
+    global _task
+    if REGRADE_ENABLED and _task is None:
+        _task = asyncio.create_task(_loop())
+
+
+async def shutdown():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+    await leases.release(LEASE_NAME)
+
+
+def stats() -> dict:
+    return regrade_stats.as_dict()
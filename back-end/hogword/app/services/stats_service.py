@@ -1,19 +1,74 @@
-from app.db.supabase import supabase
+import os
+from app.db import repository
+from app.services import stats_store, summary_cache, columnar_stats
+from app.services.stats_store import DIFFICULTY_LEVEL_MAP, DIFFICULTY_ORDER
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional
 from collections import defaultdict
+from dotenv import load_dotenv
 
+load_dotenv()
 
-DIFFICULTY_LEVEL_MAP = {
-    "beginner": "beginner",
-    "advanced": "advanced",
-    "intermediate": "intermediate"
-}
+# "incremental" serves summaries from the running aggregates in stats_store,
+# "columnar" re-aggregates the user's full history with the vectorized engine in columnar_stats,
+# "scan" re-aggregates the user's full history row by row.
+# Every mode adds the totals of the compacted history (rollup tables) to a pass over practice_logs.
+STATS_MODE = os.environ.get("STATS_MODE", "incremental").lower()
 
 
-DIFFICULTY_ORDER = ["beginner", "intermediate", "advanced"]
+async def get_user_dashboard_stats(user_id: str, score_points: str = "aggregated", max_points: Optional[int] = None):
+    """
+    Compute the dashboard statistics for a user, served from the summary cache when possible.
+    See `get_user_dashboard_stats_full_scan` for the meaning of each field.
 
-async def get_user_dashboard_stats(user_id: str):
+    `score_points="aggregated"` downsamples `score_count_data` to at most `max_points` entries
+    (default `SUMMARY_MAX_SCORE_POINTS`); `"full"` returns one point per completed attempt still in
+    practice_logs, and raises `stats_store.FullPointsUnavailable` once part of the history was
+    compacted (compacted attempts only appear in the aggregated form).
+    """
+    max_points = max_points or stats_store.SUMMARY_MAX_SCORE_POINTS
+    variant = "full" if score_points == "full" else f"aggregated:{max_points}"
+    generation = await summary_cache.generation(user_id)
+    cached = await summary_cache.lookup(user_id, generation, variant)
+    if cached is not None:
+        return cached
+
+    if STATS_MODE == "scan":
+        stats = await get_user_dashboard_stats_full_scan(user_id, score_points=score_points, max_points=max_points)
+    elif STATS_MODE == "columnar":
+        rollup, logs = await stats_store.load_history(user_id, ",".join(columnar_stats.LOG_COLUMNS))
+        if score_points == "full":
+            rollup.require_full_points()
+        stats = columnar_stats.aggregate(
+            columnar_stats.to_columns(logs), score_points=score_points, max_points=max_points, user_ids=[user_id],
+            rollups={user_id: rollup},
+        )[user_id]
+    else:
+        stats = await stats_store.get_summary(
+            user_id, score_points=score_points, max_points=max_points, generation=generation
+        )
+    await summary_cache.store(user_id, stats, generation, variant)
+    return stats
+
+
+async def get_cohort_dashboard_stats(user_ids: List[str], score_points: str = "aggregated", max_points: Optional[int] = None):
+    """
+    Dashboard statistics for a group of users (e.g. a class) in one query and one vectorized pass.
+    Returns {user_id: stats}.
+    """
+    rollups, logs = await stats_store.load_history_for_users(user_ids, ",".join(columnar_stats.LOG_COLUMNS))
+    if score_points == "full":
+        for rollup in rollups.values():
+            rollup.require_full_points()
+    return columnar_stats.aggregate(
+        columnar_stats.to_columns(logs), score_points=score_points, max_points=max_points, user_ids=user_ids,
+        rollups=rollups,
+    )
+
+
+async def get_user_dashboard_stats_full_scan(
+    user_id: str, now: Optional[datetime] = None, score_points: str = "full", max_points: Optional[int] = None
+):
     """
     Fetch raw logs and compute comprehensive statistics in Python.
     
@@ -27,27 +82,30 @@ async def get_user_dashboard_stats(user_id: str):
     - score_count_data: [count, score, difficulty] data points with attempt sequences
     """
     
-    all_logs_response = supabase.table("practice_logs")\
-        .select("id,created_at,word,score,difficulty,status")\
-        .eq("user_id", user_id)\
-        .order("created_at", desc=False)\
-        .execute()
-    
-    all_logs = all_logs_response.data
+    rollup, all_logs = await stats_store.load_history(user_id, "id,created_at,word,score,difficulty,status")
+    if score_points == "full":
+        rollup.require_full_points()
     
-    today_start = datetime.utcnow().date().isoformat()
-    skipped_response = supabase.table("practice_logs")\
-        .select("id")\
-        .eq("user_id", user_id)\
-        .eq("status", "resigned")\
-        .gte("created_at", today_start)\
-        .execute()
+    now = now or datetime.utcnow()
+    today_start = now.date().isoformat()
+    skipped_logs = await repository.list_logs(user_id, "id", status="resigned", since=today_start)
     
-    today_skip = len(skipped_response.data)
+    return compute_dashboard_stats(all_logs, len(skipped_logs), now, rollup, score_points, max_points)
+
+
+def compute_dashboard_stats(
+    all_logs: List[Dict],
+    today_skip: int,
+    now: datetime,
+    rollup: Optional[stats_store.LogRollup] = None,
+    score_points: str = "full",
+    max_points: Optional[int] = None,
+):
+    """Aggregate one user's logs, ordered by `created_at`, row by row, on top of their compacted totals."""
+    rollup = rollup or stats_store.LogRollup()
 
     # --- Aggregation Logic ---
     
-    now = datetime.utcnow()
     last_7_days_date = (now - timedelta(days=6)).date()  # 7 days inclusive
     
     # Init counters
@@ -59,8 +117,8 @@ async def get_user_dashboard_stats(user_id: str):
     today_scores = []
     all_scores = []
     
-    # Track word attempt sequences: {word: current_count}
-    word_attempt_count = defaultdict(int)
+    # Track word attempt sequences: {word: current_count}, continuing from the compacted history
+    word_attempt_count = defaultdict(int, rollup.word_attempts)
 
     for log in all_logs:
         # Parse timestamp
@@ -132,12 +190,14 @@ async def get_user_dashboard_stats(user_id: str):
 
     # Averages
     avg_score_today = sum(today_scores) / len(today_scores) if today_scores else 0
-    avg_score_all = sum(all_scores) / len(all_scores) if all_scores else 0
+    total_count = len(all_scores) + rollup.total_count
+    avg_score_all = (sum(all_scores) + rollup.total_sum) / total_count if total_count else 0
     
     # Avg score by level with label mapping and ordering
+    level_totals = {lvl: [sum(scores), len(scores)] for lvl, scores in level_scores_map.items()}
     avg_score_level = []
-    for lvl, scores in level_scores_map.items():
-        avg = sum(scores) / len(scores)
+    for lvl, (score_sum, count) in stats_store.with_rollup(level_totals, rollup.level_totals).items():
+        avg = score_sum / count
         # Map the level name
         display_name = DIFFICULTY_LEVEL_MAP.get(lvl, lvl)
         avg_score_level.append({"level": display_name, "score": round(avg, 2)})
@@ -145,6 +205,12 @@ async def get_user_dashboard_stats(user_id: str):
     # Sort by the defined order
     avg_score_level.sort(key=lambda x: DIFFICULTY_ORDER.index(x["level"]) if x["level"] in DIFFICULTY_ORDER else 999)
 
+    if score_points != "full":
+        point_totals = stats_store.with_rollup(stats_store.group_score_points(score_count_data), rollup.point_totals)
+        score_count_data = stats_store.aggregate_score_points(
+            point_totals, max_points or stats_store.SUMMARY_MAX_SCORE_POINTS
+        )
+
     return {
         "avg_score_today": round(avg_score_today, 2),
         "avg_score_all": round(avg_score_all, 2),
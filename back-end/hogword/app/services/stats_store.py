@@ -0,0 +1,473 @@
+"""
+Incrementally maintained per-user dashboard statistics.
+
+Each user's aggregate is backfilled once from their history (totals of the compacted part, then
+practice_logs; see `load_history`), then kept current by the write paths (`record_completed` /
+`record_resigned`), so building a summary costs O(days + levels) instead of a scan of the
+user's full history.
+
+An aggregate remembers the user's summary cache generation (`summary_cache.generation`, shared
+between workers with CACHE_BACKEND=redis) it is current for. Writes made on this worker move it
+along; a write made on another worker leaves it behind, and the next summary rebuilds it.
+
+Consistency check against the full-scan implementation:
+    python -m app.services.stats_store check <user_id> [<user_id> ...]
+"""
+import os
+import sys
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from dotenv import load_dotenv
+from app.db import repository
+from app.services import summary_cache, write_behind
+from app.services.cache import TTLCache
+
+load_dotenv()
+
+DIFFICULTY_LEVEL_MAP = {
+    "beginner": "beginner",
+    "advanced": "advanced",
+    "intermediate": "intermediate"
+}
+
+DIFFICULTY_ORDER = ["beginner", "intermediate", "advanced"]
+
+WINDOW_DAYS = 7
+
+# Upper bound on `score_count_data` points when the aggregated form is requested
+SUMMARY_MAX_SCORE_POINTS = int(os.environ.get("SUMMARY_MAX_SCORE_POINTS", "300"))
+
+STATS_STORE_SIZE = int(os.environ.get("STATS_STORE_SIZE", "10000"))
+# Aggregates are rebuilt after this many seconds, which bounds staleness from writes that
+# bypass this service.
+STATS_STORE_TTL = float(os.environ.get("STATS_STORE_TTL", "900"))
+
+LOG_COLUMNS = "id,created_at,word,score,difficulty,status"
+
+# Compacted history is only looked up while compaction is enabled (app/services/compaction.py), so
+# deployments that never compact skip that round trip and need none of its schema. Keep it enabled
+# once a compaction has run, or the compacted part of every history goes missing from dashboards.
+COMPACTION_ENABLED = os.environ.get("COMPACTION_ENABLED", "0") == "1"
+
+
+def group_score_points(points) -> dict:
+    """Fold `score_count_data` points into {(count, difficulty): [score_sum, samples]}."""
+    totals = {}
+    for point in points:
+        group = totals.setdefault((point["count"], point["difficulty"]), [0, 0])
+        group[0] += point["score"]
+        group[1] += 1
+    return totals
+
+
+def with_rollup(totals: dict, rollup_totals: dict) -> dict:
+    """
+    Add compacted-history totals to {key: [score_sum, count]} totals from practice_logs. Keys of the
+    compacted history come first; sums start from the practice_logs part, the same in every stats mode.
+    """
+    combined = {key: [0, 0] for key in rollup_totals}
+    for source in (totals, rollup_totals):
+        for key, (score_sum, count) in source.items():
+            entry = combined.setdefault(key, [0, 0])
+            entry[0] += score_sum
+            entry[1] += count
+    return combined
+
+
+def aggregate_score_points(point_totals: dict, max_points: int) -> list:
+    """
+    Downsample score/count data to at most `max_points` entries while keeping its shape.
+    Each entry is the mean score of all attempts with that attempt number and difficulty;
+    when there are still too many, neighbouring attempt numbers are merged into equal-width bins
+    and `count` becomes the sample-weighted mean attempt number of the bin.
+    """
+    if not point_totals:
+        return []
+    difficulties = {difficulty for _, difficulty in point_totals}
+    max_count = max(count for count, _ in point_totals)
+    bins_per_difficulty = max(1, max_points // len(difficulties))
+    width = -(-max_count // bins_per_difficulty)
+
+    bins = {}  # (bin, difficulty) -> [count_sum, score_sum, samples]
+    for (count, difficulty), (score_sum, samples) in point_totals.items():
+        entry = bins.setdefault(((count - 1) // width, difficulty), [0, 0, 0])
+        entry[0] += count * samples
+        entry[1] += score_sum
+        entry[2] += samples
+
+    def order(key):
+        bin_index, difficulty = key
+        rank = DIFFICULTY_ORDER.index(difficulty) if difficulty in DIFFICULTY_ORDER else len(DIFFICULTY_ORDER)
+        return bin_index, rank, difficulty
+
+    return [
+        {
+            "count": round(count_sum / samples),
+            "score": round(score_sum / samples, 2),
+            "difficulty": difficulty,
+            "samples": samples,
+        }
+        for (bin_index, difficulty), (count_sum, score_sum, samples) in sorted(bins.items(), key=lambda item: order(item[0]))
+    ]
+
+
+def _parse_date_key(created_at) -> Optional[str]:
+    try:
+        return datetime.fromisoformat(created_at.replace('Z', '+00:00')).date().isoformat()
+    except (ValueError, AttributeError):
+        return None
+
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class FullPointsUnavailable(Exception):
+    """
+    Raised for `score_points="full"` once part of the user's history is compacted: the rollups keep
+    per-(attempt number, difficulty) totals, not one point per attempt.
+    """
+
+
+class LogRollup:
+    """
+    Totals over a user's compacted history (one entry of `repository.fetch_log_rollups`), or empty
+    when nothing was compacted. Compacted logs are all older than the dashboard's day window, so
+    these totals are all the dashboard needs from them.
+    """
+
+    def __init__(self, rollup: Optional[dict] = None):
+        rollup = rollup or {}
+        compacted_before = rollup.get("compacted_before")
+        self.compacted_before = _parse_timestamp(compacted_before) if compacted_before else None
+        self.total_sum = 0.0
+        self.total_count = 0
+        self.word_attempts = {}   # word -> completed attempts
+        self.level_totals = {}    # difficulty -> [score_sum, count]
+        self.point_totals = {}    # (attempt number, display difficulty) -> [score_sum, samples]
+        for row in rollup.get("words", []):
+            if not row["completed"]:
+                continue
+            score_sum = float(row["score_sum"])
+            self.word_attempts[row["word"]] = self.word_attempts.get(row["word"], 0) + row["completed"]
+            level = self.level_totals.setdefault(row["difficulty"], [0, 0])
+            level[0] += score_sum
+            level[1] += row["completed"]
+            self.total_sum += score_sum
+            self.total_count += row["completed"]
+        for row in rollup.get("attempts", []):
+            display_difficulty = DIFFICULTY_LEVEL_MAP.get(row["difficulty"], row["difficulty"])
+            point = self.point_totals.setdefault((row["attempt"], display_difficulty), [0, 0])
+            point[0] += float(row["score_sum"])
+            point[1] += row["samples"]
+
+    def require_full_points(self):
+        if self.compacted_before is not None:
+            raise FullPointsUnavailable()
+
+    def recent(self, logs: list) -> list:
+        """Drop logs that are already in these totals."""
+        if self.compacted_before is None:
+            return logs
+        # Logs read before a compaction that finished before the rollups were read are already in them
+        return [log for log in logs if _parse_timestamp(log["created_at"]) >= self.compacted_before]
+
+
+class UserStats:
+    """Running totals for one user's dashboard, on top of the totals of their compacted history."""
+
+    def __init__(self, rollup: Optional[LogRollup] = None):
+        self.rollup = rollup or LogRollup()
+        self.total_sum = 0.0
+        self.total_count = 0
+        self.level_totals = {}    # difficulty -> [score_sum, count], in first-seen order
+        self.days = {}            # "YYYY-MM-DD" -> {"sum", "count", "words", "skips"}
+        self.word_attempts = dict(self.rollup.word_attempts)  # word -> completed attempts so far
+        self.point_totals = {}    # (count, difficulty) -> [score_sum, samples]
+        self.generation: Optional[int] = None  # summary cache generation the totals are current for
+
+    def _day(self, date_key: str) -> dict:
+        day = self.days.get(date_key)
+        if day is None:
+            day = self.days[date_key] = {"sum": 0, "count": 0, "words": {}, "skips": 0}
+        return day
+
+    def add_completed(self, created_at, word: str, difficulty: str, score) -> bool:
+        date_key = _parse_date_key(created_at)
+        if date_key is None:
+            return False
+        try:
+            score = float(score)
+        except (ValueError, TypeError):
+            return False
+
+        attempt_number = self.word_attempts.get(word, 0) + 1
+        self.word_attempts[word] = attempt_number
+
+        self.total_sum += score
+        self.total_count += 1
+        level = self.level_totals.setdefault(difficulty, [0, 0])
+        level[0] += score
+        level[1] += 1
+
+        display_difficulty = DIFFICULTY_LEVEL_MAP.get(difficulty, difficulty)
+        group = self.point_totals.setdefault((attempt_number, display_difficulty), [0, 0])
+        group[0] += score
+        group[1] += 1
+
+        day = self._day(date_key)
+        day["sum"] += score
+        day["count"] += 1
+        day["words"][word] = day["words"].get(word, 0) + 1
+        return True
+
+    def add_resigned(self, created_at) -> bool:
+        date_key = _parse_date_key(created_at)
+        if date_key is None:
+            return False
+        self._day(date_key)["skips"] += 1
+        return True
+
+    def add_log(self, log: dict):
+        status = log.get("status", "")
+        if status == "completed":
+            self.add_completed(log.get("created_at"), log.get("word", ""), log.get("difficulty", ""), log.get("score"))
+        elif status == "resigned":
+            self.add_resigned(log.get("created_at"))
+
+    def summary(self, now: datetime, max_points: Optional[int] = None, score_count_data: Optional[list] = None) -> dict:
+        """
+        Build the `SummaryResponse` payload. Day buckets outside the window are dropped.
+        `score_count_data` is aggregated to at most `max_points` entries unless the caller passes the
+        full list (`full_score_points`); the aggregate itself keeps no per-attempt data.
+        """
+        window_start = (now - timedelta(days=WINDOW_DAYS - 1)).date().isoformat()
+        for date_key in [d for d in self.days if d < window_start]:
+            del self.days[date_key]
+
+        word_per_day = []
+        score_per_day = []
+        for i in range(WINDOW_DAYS):
+            d = (now - timedelta(days=WINDOW_DAYS - 1 - i)).date().isoformat()
+            day = self.days.get(d)
+            word_per_day.append({"date": d, "words": dict(day["words"]) if day else {}})
+            avg_s = day["sum"] / day["count"] if day and day["count"] else 0
+            score_per_day.append({"date": d, "score": round(avg_s, 2)})
+
+        today = self.days.get(now.date().isoformat())
+        avg_score_today = today["sum"] / today["count"] if today and today["count"] else 0
+        total_count = self.total_count + self.rollup.total_count
+        avg_score_all = (self.total_sum + self.rollup.total_sum) / total_count if total_count else 0
+
+        avg_score_level = []
+        for lvl, (score_sum, count) in with_rollup(self.level_totals, self.rollup.level_totals).items():
+            display_name = DIFFICULTY_LEVEL_MAP.get(lvl, lvl)
+            avg_score_level.append({"level": display_name, "score": round(score_sum / count, 2)})
+        avg_score_level.sort(key=lambda x: DIFFICULTY_ORDER.index(x["level"]) if x["level"] in DIFFICULTY_ORDER else 999)
+
+        return {
+            "avg_score_today": round(avg_score_today, 2),
+            "avg_score_all": round(avg_score_all, 2),
+            "today_skip": today["skips"] if today else 0,
+            "word_per_day": word_per_day,
+            "score_per_day": score_per_day,
+            "avg_score_level": avg_score_level,
+            "score_count_data": (
+                score_count_data if score_count_data is not None
+                else aggregate_score_points(
+                    with_rollup(self.point_totals, self.rollup.point_totals), max_points or SUMMARY_MAX_SCORE_POINTS
+                )
+            )
+        }
+
+
+_store = TTLCache(STATS_STORE_SIZE, STATS_STORE_TTL)
+
+
+async def load_history(user_id: str, columns: str) -> tuple:
+    """
+    A user's history as (`LogRollup` of the compacted part, practice_logs after it ordered by
+    `created_at`). `columns` must include `created_at`.
+    """
+    await write_behind.flush_user(user_id)
+    # Logs first: a compaction in between then shows up in the rollups, and `recent` drops its logs
+    logs = await repository.list_logs(user_id, columns)
+    if not COMPACTION_ENABLED:
+        return LogRollup(), logs
+    rollup = LogRollup((await repository.fetch_log_rollups([user_id])).get(user_id))
+    return rollup, rollup.recent(logs)
+
+
+async def load_history_for_users(user_ids: list, columns: str) -> tuple:
+    """
+    Like `load_history` for several users: ({user_id: LogRollup} for users with compacted history,
+    practice_logs ordered by `created_at` within each user).
+    """
+    await write_behind.flush_users(user_ids)
+    logs = await repository.list_logs_for_users(user_ids, columns)
+    if not COMPACTION_ENABLED:
+        return {}, logs
+    rollups = {user_id: LogRollup(rollup) for user_id, rollup in (await repository.fetch_log_rollups(user_ids)).items()}
+    if not rollups:
+        return rollups, logs
+    cutoffs = {user_id: rollup.compacted_before for user_id, rollup in rollups.items()}
+    return rollups, [
+        log for log in logs
+        if log["user_id"] not in cutoffs or _parse_timestamp(log["created_at"]) >= cutoffs[log["user_id"]]
+    ]
+
+
+def score_points_from_logs(logs, rollup: Optional[LogRollup] = None) -> list:
+    """
+    `score_count_data` with one point per completed log, numbering attempts like
+    `UserStats.add_completed` (after the compacted ones in `rollup`).
+    """
+    word_attempts = dict((rollup or LogRollup()).word_attempts)
+    points = []
+    for log in logs:
+        if _parse_date_key(log.get("created_at")) is None:
+            continue
+        try:
+            score = float(log.get("score"))
+        except (ValueError, TypeError):
+            continue
+        word = log.get("word", "")
+        word_attempts[word] = word_attempts.get(word, 0) + 1
+        difficulty = log.get("difficulty", "")
+        points.append({
+            "count": word_attempts[word],
+            "score": score,
+            "difficulty": DIFFICULTY_LEVEL_MAP.get(difficulty, difficulty),
+        })
+    return points
+
+
+async def full_score_points(user_id: str, rollup: LogRollup) -> list:
+    """The unbounded `score_points="full"` list, read from practice_logs on request."""
+    rollup.require_full_points()
+    await write_behind.flush_user(user_id)
+    logs = await repository.list_logs(user_id, "created_at,word,score,difficulty", status="completed")
+    return score_points_from_logs(rollup.recent(logs), rollup)
+
+
+def build_from_logs(logs, rollup: Optional[LogRollup] = None) -> UserStats:
+    """Backfill an aggregate from the compacted totals and logs ordered by `created_at`."""
+    aggregate = UserStats(rollup)
+    for log in logs:
+        aggregate.add_log(log)
+    return aggregate
+
+
+async def rebuild(user_id: str, generation: Optional[int] = None) -> UserStats:
+    """
+    Backfill a user's aggregate from their history (rollups and practice_logs) and cache it.
+    `generation` must have been read before the call; by default it is read here. A write that
+    lands during the backfill moves the user past `generation`, so the next read rebuilds again.
+    """
+    if generation is None:
+        generation = await summary_cache.generation(user_id)
+    rollup, logs = await load_history(user_id, LOG_COLUMNS)
+    aggregate = build_from_logs(logs, rollup)
+    aggregate.generation = generation
+    _store.set(user_id, aggregate)
+    return aggregate
+
+
+async def get_summary(
+    user_id: str,
+    now: Optional[datetime] = None,
+    score_points: str = "full",
+    max_points: Optional[int] = None,
+    generation: Optional[int] = None,
+) -> dict:
+    """
+    The user's summary from their aggregate, rebuilt first if it is missing or behind `generation`
+    (the user's current `summary_cache.generation`, read here by default).
+    """
+    now = now or datetime.utcnow()
+    if generation is None:
+        generation = await summary_cache.generation(user_id)
+    aggregate = _store.get(user_id)
+    if aggregate is None or aggregate.generation != generation:
+        aggregate = await rebuild(user_id, generation)
+    if score_points == "full":
+        return aggregate.summary(now, score_count_data=await full_score_points(user_id, aggregate.rollup))
+    return aggregate.summary(now, max_points)
+
+
+def level_averages(user_id: str) -> Optional[dict]:
+    """
+    Average score per difficulty from the user's loaded aggregate, without touching the database
+    (so writes made on other workers since it was loaded are missing).
+    """
+    aggregate = _store.get(user_id)
+    if aggregate is None:
+        return None
+    level_totals = with_rollup(aggregate.level_totals, aggregate.rollup.level_totals)
+    return {level: score_sum / count for level, (score_sum, count) in level_totals.items() if count}
+
+
+def record_completed(user_id: str, log: dict):
+    """Apply a completed log to the user's aggregate, if one is loaded."""
+    aggregate = _store.get(user_id)
+    if aggregate is not None:
+        aggregate.add_completed(log.get("created_at"), log.get("word", ""), log.get("difficulty", ""), log.get("score"))
+
+
+def record_resigned(user_id: str, log: dict):
+    """Apply a resigned log to the user's aggregate, if one is loaded."""
+    aggregate = _store.get(user_id)
+    if aggregate is not None:
+        aggregate.add_resigned(log.get("created_at"))
+
+
+def invalidate(user_id: str):
+    _store.delete(user_id)
+
+
+def _advance(user_id: str, new_generation: int):
+    # Every write path applies its logs here (record_*) before invalidating the summary cache, so
+    # an aggregate one generation behind has already seen this write. Further behind, a write from
+    # another worker came in between and the aggregate is left to be rebuilt.
+    aggregate = _store.get(user_id)
+    if aggregate is not None and aggregate.generation == new_generation - 1:
+        aggregate.generation = new_generation
+
+
+summary_cache.on_invalidate(_advance)
+
+
+async def check(user_id: str) -> dict:
+    """
+    Compare the incremental summary against the full-scan implementation.
+    Returns the names of the fields that differ (empty when consistent).
+    """
+    from app.services import stats_service
+
+    now = datetime.utcnow()
+    expected = await stats_service.get_user_dashboard_stats_full_scan(user_id, now=now, score_points="aggregated")
+    aggregate = _store.get(user_id) or await rebuild(user_id)
+    actual = aggregate.summary(now)
+    mismatched = [field for field in expected if expected[field] != actual.get(field)]
+    return {"user_id": user_id, "consistent": not mismatched, "mismatched_fields": mismatched}
+
+
+def stats() -> dict:
+    return _store.stats()
+
+
+async def _main(argv):
+    if len(argv) < 2 or argv[0] != "check":
+        print("Usage: python -m app.services.stats_store check <user_id> [<user_id> ...]")
+        return 2
+    failed = 0
+    for user_id in argv[1:]:
+        result = await check(user_id)
+        failed += not result["consistent"]
+        print(result)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
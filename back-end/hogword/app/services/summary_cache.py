@@ -0,0 +1,98 @@
+import os
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+from dotenv import load_dotenv
+from app.services.cache import make_backend
+
+load_dotenv()
+
+SUMMARY_CACHE_ENABLED = os.environ.get("SUMMARY_CACHE_ENABLED", "1") == "1"
+SUMMARY_CACHE_SIZE = int(os.environ.get("SUMMARY_CACHE_SIZE", "10000"))
+# Upper bound on staleness if an invalidation is ever missed (e.g. a write made by another service)
+SUMMARY_CACHE_TTL = float(os.environ.get("SUMMARY_CACHE_TTL", "300"))
+
+_backend = make_backend("summary", SUMMARY_CACHE_SIZE, SUMMARY_CACHE_TTL)
+# Entries are keyed by the user's generation, a counter in the backend (shared by every worker with
+# Redis) that each invalidation increments. A summary computed across a write is stored under the
+# generation it started from, which nothing reads any more. Redis counters have no TTL, so a
+# maxmemory policy of noeviction or volatile-* never drops them. They are kept even while the cache
+# is disabled, since `stats_store` checks its aggregates against them.
+_listeners: List[Callable[[str, int], None]] = []
+
+
+class SummaryCacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.served_age_total = 0.0
+        self.served_age_max = 0.0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": SUMMARY_CACHE_ENABLED,
+            "backend": type(_backend).__name__,
+            "size": _backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "served_age_avg_seconds": round(self.served_age_total / self.hits, 3) if self.hits else 0.0,
+            "served_age_max_seconds": round(self.served_age_max, 3),
+        }
+
+
+cache_stats = SummaryCacheStats()
+
+
+def _key(user_id: str, generation_seen: int, variant: str) -> str:
+    # The UTC date is part of the key, so the 7-day windows roll over at midnight on their own
+    return f"{user_id}:{datetime.utcnow().date().isoformat()}:{generation_seen}:{variant}"
+
+
+async def generation(user_id: str) -> int:
+    """The user's current generation, to pass to `lookup` and `store`; taken before computing a summary."""
+    return await _backend.counter(user_id)
+
+
+async def lookup(user_id: str, generation_seen: int, variant: str = "default") -> Optional[dict]:
+    if not SUMMARY_CACHE_ENABLED:
+        return None
+    cached = await _backend.get(_key(user_id, generation_seen, variant))
+    if cached is None:
+        cache_stats.misses += 1
+        return None
+    age = time.time() - cached["stored_at"]
+    cache_stats.hits += 1
+    cache_stats.served_age_total += age
+    cache_stats.served_age_max = max(cache_stats.served_age_max, age)
+    return cached["summary"]
+
+
+async def store(user_id: str, summary: dict, generation_seen: int, variant: str = "default"):
+    """Cache one response variant under the generation its computation started from."""
+    if not SUMMARY_CACHE_ENABLED:
+        return
+    await _backend.set(_key(user_id, generation_seen, variant), {"stored_at": time.time(), "summary": summary})
+
+
+async def invalidate(user_id: str):
+    """
+    Drop all of a user's cached summaries, by moving them to a new generation. Called by every
+    write path that changes their logs; old entries expire on their own.
+    """
+    cache_stats.invalidations += 1
+    new_generation = await _backend.incr(user_id)
+    for listener in _listeners:
+        listener(user_id, new_generation)
+
+
+def on_invalidate(listener: Callable[[str, int], None]):
+    """Call `listener(user_id, new_generation)` after each invalidation made by this worker."""
+    _listeners.append(listener)
+
+
+def stats() -> dict:
+    return cache_stats.as_dict()
@@ -0,0 +1,146 @@
+import os
+import time
+import logging
+import threading
+import httpx
+import jwt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "local" verifies access tokens in-process and only calls the auth server when it must,
+# "remote" keeps the old behaviour of asking Supabase on every request.
+AUTH_VERIFY_MODE = os.environ.get("AUTH_VERIFY_MODE", "local").lower()
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.environ.get("SUPABASE_JWT_AUDIENCE", "authenticated")
+SUPABASE_JWKS_URL = os.environ.get("SUPABASE_JWKS_URL") or (
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None
+)
+JWKS_REFRESH_SECONDS = float(os.environ.get("JWKS_REFRESH_SECONDS", "600"))
+JWKS_MIN_REFETCH_SECONDS = float(os.environ.get("JWKS_MIN_REFETCH_SECONDS", "30"))
+JWT_LEEWAY_SECONDS = float(os.environ.get("JWT_LEEWAY_SECONDS", "10"))
+# Static admin credential for /ops/* and /metrics; unset disables those endpoints
+OPS_TOKEN = os.environ.get("OPS_TOKEN", "")
+
+ASYMMETRIC_ALGORITHMS = {"RS256", "RS384", "RS512", "ES256", "ES384", "ES512", "EdDSA"}
+
+
+class LocalVerificationUnavailable(Exception):
+    """Raised when a token cannot be checked in-process and the auth server must decide."""
+
+
+class VerifiedUser:
+    """Subset of the Supabase `User` object that the routers rely on."""
+
+    def __init__(self, claims: dict):
+        self.id = claims["sub"]
+        self.email = claims.get("email")
+        self.phone = claims.get("phone")
+        self.role = claims.get("role")
+        self.aud = claims.get("aud")
+        self.app_metadata = claims.get("app_metadata") or {}
+        self.user_metadata = claims.get("user_metadata") or {}
+        self.claims = claims
+
+
+class VerifiedUserResponse:
+    """Mirrors `supabase.auth.get_user()` so `user.user.id` keeps working for callers."""
+
+    def __init__(self, claims: dict):
+        self.user = VerifiedUser(claims)
+
+
+class JWKSCache:
+    """
+    Caches the project's JSON Web Key Set.
+    Stale key sets are refreshed on a background thread while the old keys keep serving,
+    unknown `kid`s trigger a rate-limited synchronous refetch to pick up key rotation.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _fetch(self):
+        headers = {"apikey": SUPABASE_KEY} if SUPABASE_KEY else {}
+        self._last_attempt = time.monotonic()
+        response = httpx.get(self.url, headers=headers, timeout=5.0)
+        response.raise_for_status()
+        key_set = jwt.PyJWKSet.from_dict(response.json())
+        keys = {key.key_id: key.key for key in key_set.keys}
+        with self._lock:
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    def _refresh_in_background(self):
+        try:
+            self._fetch()
+        except Exception as e:
+            logger.warning("JWKS background refresh failed: %s", e)
+        finally:
+            self._refreshing = False
+
+    def get_key(self, kid: str):
+        age = time.monotonic() - self._fetched_at
+        if self._keys and age > JWKS_REFRESH_SECONDS and not self._refreshing:
+            with self._lock:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        if time.monotonic() - self._last_attempt < JWKS_MIN_REFETCH_SECONDS:
+            return None
+        try:
+            self._fetch()
+        except Exception as e:
+            logger.warning("JWKS fetch failed: %s", e)
+            return None
+        return self._keys.get(kid)
+
+
+jwks_cache = JWKSCache(SUPABASE_JWKS_URL) if SUPABASE_JWKS_URL else None
+
+
+def verify_token(token: str) -> VerifiedUserResponse:
+    """
+    Verify signature, expiry and audience of a Supabase access token without a network call.
+
+    Raises `jwt.InvalidTokenError` for tokens that are definitely invalid and
+    `LocalVerificationUnavailable` when no usable key is available locally.
+    """
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+
+    if algorithm == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            raise LocalVerificationUnavailable("SUPABASE_JWT_SECRET not configured")
+        key = SUPABASE_JWT_SECRET
+    elif algorithm in ASYMMETRIC_ALGORITHMS:
+        key = jwks_cache.get_key(header.get("kid")) if jwks_cache else None
+        if key is None:
+            raise LocalVerificationUnavailable(f"No signing key for kid {header.get('kid')!r}")
+    else:
+        raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm {algorithm!r}")
+
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=SUPABASE_JWT_AUDIENCE,
+        leeway=JWT_LEEWAY_SECONDS,
+        options={"require": ["exp", "sub"]},
+    )
+    return VerifiedUserResponse(claims)
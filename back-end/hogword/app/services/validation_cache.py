@@ -0,0 +1,138 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from typing import Optional
+from dotenv import load_dotenv
+from app.services.cache import TTLCache
+
+load_dotenv()
+
+VALIDATION_CACHE_ENABLED = os.environ.get("VALIDATION_CACHE_ENABLED", "1") == "1"
+VALIDATION_CACHE_SIZE = int(os.environ.get("VALIDATION_CACHE_SIZE", "10000"))
+VALIDATION_CACHE_TTL = float(os.environ.get("VALIDATION_CACHE_TTL", "86400"))
+# Optional SQLite file so cached results survive restarts; unset keeps the cache in memory only
+VALIDATION_CACHE_DB = os.environ.get("VALIDATION_CACHE_DB")
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!?,;:…]+$")
+
+
+def normalize_sentence(sentence: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    sentence = _WHITESPACE.sub(" ", sentence.strip().lower())
+    return _TRAILING_PUNCTUATION.sub("", sentence)
+
+
+def make_key(word: str, sentence: str) -> str:
+    return f"{word.strip().lower()}\x1f{normalize_sentence(sentence)}"
+
+
+class SQLiteTier:
+    """Persistent second tier. Queries are tiny, but still run off the event loop."""
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS validation_cache "
+            "(key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM validation_cache WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set(self, key: str, result: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO validation_cache (key, result, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time()),
+            )
+            self._conn.commit()
+
+    async def get(self, key: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, result: dict):
+        await asyncio.to_thread(self._set, key, result)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+memory_tier = TTLCache(VALIDATION_CACHE_SIZE, VALIDATION_CACHE_TTL)
+# Opened by `startup` in each worker: a SQLite connection must not cross a fork
+persistent_tier: Optional[SQLiteTier] = None
+persistent_hits = 0
+
+
+async def startup():
+    """Open the SQLite tier, if configured. Called from the FastAPI lifespan."""
+    global persistent_tier
+    if VALIDATION_CACHE_DB and persistent_tier is None:
+        persistent_tier = await asyncio.to_thread(SQLiteTier, VALIDATION_CACHE_DB, VALIDATION_CACHE_TTL)
+
+
+async def shutdown():
+    global persistent_tier
+    if persistent_tier is not None:
+        persistent_tier.close()
+        persistent_tier = None
+
+
+async def lookup(word: str, sentence: str) -> Optional[dict]:
+    """Return a cached validation result, promoting persistent hits into memory."""
+    global persistent_hits
+    if not VALIDATION_CACHE_ENABLED:
+        return None
+
+    key = make_key(word, sentence)
+    result = memory_tier.get(key)
+    if result is not None:
+        return result
+
+    if persistent_tier is not None:
+        result = await persistent_tier.get(key)
+        if result is not None:
+            persistent_hits += 1
+            memory_tier.set(key, result)
+            return result
+    return None
+
+
+async def store(word: str, sentence: str, result: dict):
+    if not VALIDATION_CACHE_ENABLED:
+        return
+
+    key = make_key(word, sentence)
+    memory_tier.set(key, result)
+    if persistent_tier is not None:
+        await persistent_tier.set(key, result)
+
+
+def stats() -> dict:
+    memory = memory_tier.stats()
+    # A memory miss that was answered by SQLite is still a cache hit overall
+    hits = memory["hits"] + persistent_hits
+    misses = memory["misses"] - persistent_hits
+    lookups = hits + misses
+    return {
+        "enabled": VALIDATION_CACHE_ENABLED,
+        "persistent": persistent_tier is not None,
+        "memory": memory,
+        "persistent_hits": persistent_hits,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,193 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from typing import Optional, List
+from dotenv import load_dotenv
+from app.services import n8n_service, word_service
+from app.services.cache import make_backend
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_WORKERS = int(os.environ.get("VALIDATION_WORKERS", "8"))
+# Submissions beyond this many queued jobs are rejected instead of waiting
+VALIDATION_QUEUE_SIZE = int(os.environ.get("VALIDATION_QUEUE_SIZE", "200"))
+VALIDATION_JOB_TTL = float(os.environ.get("VALIDATION_JOB_TTL", "600"))
+VALIDATION_JOB_STORE_SIZE = int(os.environ.get("VALIDATION_JOB_STORE_SIZE", "10000"))
+# How often a job that runs on another worker is re-read while a client waits for it
+VALIDATION_JOB_POLL_INTERVAL = float(os.environ.get("VALIDATION_JOB_POLL_INTERVAL", "0.5"))
+# Seconds shutdown waits for queued and running jobs before failing the rest; keep it below
+# gunicorn's graceful timeout
+VALIDATION_DRAIN_TIMEOUT = float(os.environ.get("VALIDATION_DRAIN_TIMEOUT", "20"))
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+class QueueUnavailable(Exception):
+    """Raised when no workers are running (startup not done or shutting down)."""
+
+
+class ValidationJob:
+    def __init__(self, user_id: str, active_log: dict, word: str, user_sentence: str):
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.active_log = active_log
+        self.word = word
+        self.user_sentence = user_sentence
+        self.status = "queued"
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.done = asyncio.Event()
+
+    def as_dict(self) -> dict:
+        result = None
+        if self.result is not None:
+            result = {
+                "score": self.result.get("score", 0),
+                "suggestion": self.result.get("suggestion"),
+                "corrected_sentence": self.result.get("corrected_sentence"),
+                "provisional": bool(self.result.get("provisional")),
+            }
+        return {"job_id": self.id, "status": self.status, "result": result, "error": self.error}
+
+
+FINISHED = ("completed", "failed")
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_jobs = {}  # job_id -> ValidationJob, while queued or running on this worker
+# Every job's latest state, kept VALIDATION_JOB_TTL seconds. With CACHE_BACKEND=redis any worker
+# can answer a poll for a job submitted to another one.
+_store = make_backend("validation_job", VALIDATION_JOB_STORE_SIZE, VALIDATION_JOB_TTL)
+
+
+async def _publish(job: ValidationJob):
+    try:
+        await _store.set(job.id, {**job.as_dict(), "user_id": job.user_id})
+    except Exception as e:
+        # The job itself goes on; only pollers on other workers miss this update
+        logger.warning("Could not store validation job %s: %s", job.id, e)
+
+
+async def _finish(job: ValidationJob):
+    await _publish(job)
+    _jobs.pop(job.id, None)
+    job.done.set()
+
+
+async def _run(job: ValidationJob):
+    job.status = "running"
+    await _publish(job)
+    try:
+        job.result = await n8n_service.validate_sentence(job.word, job.user_sentence)
+        await word_service.record_attempt(job.user_id, job.active_log, job.user_sentence, job.result)
+        job.status = "completed"
+    except word_service.LogNotFound as e:
+        logger.info("Validation job %s: %s", job.id, e)
+        job.status = "failed"
+        job.error = word_service.LogNotFound.detail
+    except Exception as e:
+        logger.warning("Validation job %s failed: %s", job.id, e)
+        job.status = "failed"
+        job.error = "Error communicating with validation service."
+    await _finish(job)
+
+
+async def _worker(queue: asyncio.Queue):
+    while True:
+        job = await queue.get()
+        try:
+            await _run(job)
+        finally:
+            queue.task_done()
+
+
+async def startup():
+    """Start the worker pool. Called from the FastAPI lifespan."""
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=VALIDATION_QUEUE_SIZE)
+        _workers.extend(asyncio.create_task(_worker(_queue)) for _ in range(VALIDATION_WORKERS))
+
+
+async def shutdown():
+    """Stop accepting jobs, drain the queue and fail jobs that did not finish in time."""
+    global _queue
+    queue, _queue = _queue, None
+    if queue is not None:
+        try:
+            await asyncio.wait_for(queue.join(), VALIDATION_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Validation jobs still pending after %ss, failing them", VALIDATION_DRAIN_TIMEOUT)
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    # A cancelled job skips the rest of _run, so it would otherwise stay "running"
+    for job in list(_jobs.values()):
+        job.status = "failed"
+        job.error = "Validation was interrupted by a server shutdown."
+        await _finish(job)
+
+
+async def submit(user_id: str, active_log: dict, word: str, user_sentence: str) -> ValidationJob:
+    if _queue is None:
+        raise QueueUnavailable()
+
+    job = ValidationJob(user_id, active_log, word, user_sentence)
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        raise QueueFull()
+    _jobs[job.id] = job
+    await _publish(job)
+    return job
+
+
+async def get_job(job_id: str, user_id: str) -> Optional[dict]:
+    """The job's state as `ValidationJob.as_dict()`, from any worker; jobs of other users are hidden."""
+    job = _jobs.get(job_id)
+    if job is not None:
+        state = job.as_dict() if job.user_id == user_id else None
+    else:
+        state = await _store.get(job_id)
+        if state is not None and state.pop("user_id") != user_id:
+            state = None
+    return state
+
+
+async def wait_finished(job_id: str, user_id: str, timeout: float) -> Optional[dict]:
+    """
+    Wait up to `timeout` seconds for the job to finish and return its state, which is still
+    queued or running if the time ran out. A job running on this worker is awaited directly, one
+    on another worker is re-read every VALIDATION_JOB_POLL_INTERVAL seconds.
+    """
+    job = _jobs.get(job_id)
+    if job is not None and job.user_id == user_id:
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job.as_dict()
+
+    deadline = time.monotonic() + timeout
+    while True:
+        state = await get_job(job_id, user_id)
+        if state is None or state["status"] in FINISHED or time.monotonic() >= deadline:
+            return state
+        await asyncio.sleep(min(VALIDATION_JOB_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+
+def stats() -> dict:
+    return {
+        "workers": len(_workers),
+        "queue_depth": _queue.qsize() if _queue is not None else 0,
+        "queue_size": VALIDATION_QUEUE_SIZE,
+        "jobs_in_progress": len(_jobs),
+        "jobs_stored": _store.size(),
+    }
@@ -0,0 +1,288 @@
+"""
+Vocabulary engine behind `word_service`.
+
+All words live in one string grouped by difficulty, cut by an offsets array, so a difficulty is
+a (start, end) range of positions and picking a word is a random index. A hash table of
+positions in an array gives O(1) lookups without a string object per word. Each user
+keeps a small ring buffer of recently served words that selection avoids, and the difficulty
+is drawn with weights adapted from the user's per-level averages in `stats_store`.
+
+The words file is re-read when its mtime changes (checked at most every
+`VOCABULARY_RELOAD_SECONDS`, in a thread so the event loop keeps serving) or via `reload()`. A
+new `Vocabulary` is fully built before it replaces the current one, so readers never see a
+half-loaded list. Replace the file atomically
+(write a temporary file, then rename it over `words.json`).
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from array import array
+from itertools import accumulate
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from app.services.cache import TTLCache
+from app.services import stats_store
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WORDS_FILE_PATH = os.environ.get("VOCABULARY_FILE") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "words.json"
+)
+VOCABULARY_RELOAD_SECONDS = float(os.environ.get("VOCABULARY_RELOAD_SECONDS", "30"))
+# Number of recently served words each user is not offered again
+VOCABULARY_RECENT_WINDOW = int(os.environ.get("VOCABULARY_RECENT_WINDOW", "20"))
+VOCABULARY_RECENT_USERS = int(os.environ.get("VOCABULARY_RECENT_USERS", "10000"))
+VOCABULARY_RECENT_TTL = float(os.environ.get("VOCABULARY_RECENT_TTL", "86400"))
+# Average scores (0-10) at which a level is treated as mastered / too hard
+VOCABULARY_MASTERY_SCORE = float(os.environ.get("VOCABULARY_MASTERY_SCORE", "8"))
+VOCABULARY_STRUGGLE_SCORE = float(os.environ.get("VOCABULARY_STRUGGLE_SCORE", "5"))
+
+# Random draws before selection settles for a recently served word
+_MAX_DRAWS = 8
+
+
+class Vocabulary:
+    """
+    Immutable, indexed word list. The words are one string (`text`) cut at `offsets`, with a
+    difficulty code per word in `levels`; `slots` is an open-addressing hash table of word
+    positions keyed by the lowercased word. A few bytes per word on top of the text itself.
+    """
+
+    def __init__(self, data: Dict[str, List[str]]):
+        self.difficulties = list(data)
+        self.levels = array("B")          # difficulty code per word
+        self.ranges = {}                  # difficulty -> (start, end) positions
+        positions = {}                    # lowercased word -> position, only while building
+        parts: List[str] = []
+        for code, difficulty in enumerate(self.difficulties):
+            start = len(parts)
+            for word in data[difficulty]:
+                key = word.lower()
+                if key not in positions:
+                    positions[key] = len(parts)
+                    parts.append(word)
+            self.levels.extend(array("B", [code]) * (len(parts) - start))
+            self.ranges[difficulty] = (start, len(parts))
+        self.text = "".join(parts)
+        self.offsets = array("I", [0])    # word i is text[offsets[i]:offsets[i + 1]]
+        self.offsets.extend(accumulate(map(len, parts)))
+        capacity = 8
+        while capacity < 2 * len(parts):
+            capacity *= 2
+        self.slots = array("i", [-1]) * capacity  # position of the word hashed there, or -1
+        mask = capacity - 1
+        for key, position in positions.items():
+            slot = hash(key) & mask
+            while self.slots[slot] >= 0:
+                slot = (slot + 1) & mask
+            self.slots[slot] = position
+        self.available = [d for d, (start, end) in self.ranges.items() if end > start]
+
+    def _position(self, key: str) -> int:
+        """Position of the lowercased word `key`, or -1 (linear probing, load <= 1/2)."""
+        mask = len(self.slots) - 1
+        slot = hash(key) & mask
+        while True:
+            position = self.slots[slot]
+            if position < 0 or self.word(position).lower() == key:
+                return position
+            slot = (slot + 1) & mask
+
+    def __len__(self):
+        return len(self.levels)
+
+    def word(self, position: int) -> str:
+        return self.text[self.offsets[position]:self.offsets[position + 1]]
+
+    def difficulty_of(self, word: str) -> Optional[str]:
+        position = self._position(word.strip().lower())
+        return None if position < 0 else self.difficulties[self.levels[position]]
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        return {
+            difficulty: [self.word(i) for i in range(start, end)]
+            for difficulty, (start, end) in self.ranges.items()
+        }
+
+    def pick(self, difficulty: str, exclude=()) -> str:
+        """Random word of `difficulty` that is not in `exclude`, if one turns up within a few draws."""
+        start, end = self.ranges.get(difficulty) or self.ranges.get("beginner") or next(iter(self.ranges.values()))
+        if end - start <= 0:
+            raise ValueError(f"No words for difficulty '{difficulty}'.")
+        word = self.word(random.randrange(start, end))
+        draws = 1
+        while word.lower() in exclude and draws < _MAX_DRAWS:
+            word = self.word(random.randrange(start, end))
+            draws += 1
+        if word.lower() in exclude and end - start <= 2 * len(exclude):
+            # Small level: most of it is excluded, so list what is left
+            remaining = [w for w in map(self.word, range(start, end)) if w.lower() not in exclude]
+            if remaining:
+                word = random.choice(remaining)
+        return word
+
+
+class RecentWords:
+    """Fixed-size ring buffer of a user's last served words, with O(1) membership."""
+
+    __slots__ = ("slots", "head", "members")
+
+    def __init__(self, size: int):
+        self.slots: List[Optional[str]] = [None] * size
+        self.head = 0
+        self.members = set()
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.members
+
+    def __len__(self):
+        return len(self.members)
+
+    def add(self, word: str):
+        word = word.lower()
+        if not self.slots or word in self.members:
+            return
+        evicted = self.slots[self.head]
+        if evicted is not None:
+            self.members.discard(evicted)
+        self.slots[self.head] = word
+        self.members.add(word)
+        self.head = (self.head + 1) % len(self.slots)
+
+
+def load(path: str = WORDS_FILE_PATH) -> Vocabulary:
+    with open(path, "r") as f:
+        return Vocabulary(json.load(f))
+
+
+# Loaded on first use: by `startup` in each worker, or once in a preloading gunicorn master
+# (gunicorn.conf.py) so that workers share it copy-on-write
+_current: Optional[Vocabulary] = None
+_mtime = 0.0
+_checked_at = time.monotonic()
+_reload_lock = threading.Lock()
+_reload_task: Optional[asyncio.Task] = None
+_recent = TTLCache(VOCABULARY_RECENT_USERS, VOCABULARY_RECENT_TTL)
+
+
+def _ensure_loaded() -> Vocabulary:
+    global _current, _mtime
+    if _current is None:
+        with _reload_lock:
+            if _current is None:
+                mtime = os.path.getmtime(WORDS_FILE_PATH)
+                _current, _mtime = load(), mtime
+    return _current
+
+
+def is_loaded() -> bool:
+    return _current is not None
+
+
+async def startup():
+    """Load the words file if this process has not yet. Called from the FastAPI lifespan."""
+    await asyncio.to_thread(_ensure_loaded)
+
+
+def reload(force: bool = True) -> bool:
+    """Re-read the words file; returns whether a new vocabulary was swapped in."""
+    global _current, _mtime
+    with _reload_lock:
+        try:
+            mtime = os.path.getmtime(WORDS_FILE_PATH)
+            if not force and mtime == _mtime:
+                return False
+            vocabulary = load()
+        except (OSError, ValueError) as e:
+            logger.warning("Keeping the current vocabulary, reload of %s failed: %s", WORDS_FILE_PATH, e)
+            return False
+        if not len(vocabulary):
+            logger.warning("Keeping the current vocabulary, %s has no words", WORDS_FILE_PATH)
+            return False
+        _current, _mtime = vocabulary, mtime
+        return True
+
+
+def _reload_in_background():
+    """Check the words file in a thread when called on the event loop, inline otherwise."""
+    global _reload_task
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        reload(force=False)
+        return
+    if _reload_task is None or _reload_task.done():
+        _reload_task = loop.create_task(asyncio.to_thread(reload, False))
+
+
+def current() -> Vocabulary:
+    """
+    The live vocabulary. At most every `VOCABULARY_RELOAD_SECONDS` a changed words file is
+    rebuilt in the background; callers keep getting the previous one until it is swapped in.
+    """
+    global _checked_at
+    if VOCABULARY_RELOAD_SECONDS > 0 and time.monotonic() - _checked_at >= VOCABULARY_RELOAD_SECONDS:
+        _checked_at = time.monotonic()
+        _reload_in_background()
+    return _current if _current is not None else _ensure_loaded()
+
+
+def difficulty_weights(level_averages: Dict[str, float], difficulties: List[str]) -> List[float]:
+    """
+    Start every difficulty at weight 1. A mastered level hands half its weight to the next
+    harder one; a level the user struggles with hands half its weight to the next easier one.
+    """
+    order = [d for d in stats_store.DIFFICULTY_ORDER if d in difficulties]
+    order += [d for d in difficulties if d not in order]
+    weights = {difficulty: 1.0 for difficulty in order}
+    for i, difficulty in enumerate(order):
+        average = level_averages.get(difficulty)
+        if average is None:
+            continue
+        if average >= VOCABULARY_MASTERY_SCORE and i + 1 < len(order):
+            weights[difficulty] -= 0.5
+            weights[order[i + 1]] += 0.5
+        elif average < VOCABULARY_STRUGGLE_SCORE and i > 0:
+            weights[difficulty] -= 0.5
+            weights[order[i - 1]] += 0.5
+    return [weights[difficulty] for difficulty in difficulties]
+
+
+def choose_difficulty(user_id: Optional[str] = None) -> str:
+    vocabulary = current()
+    level_averages = stats_store.level_averages(user_id) if user_id else None
+    if not level_averages:
+        return random.choice(vocabulary.available)
+    weights = difficulty_weights(level_averages, vocabulary.available)
+    return random.choices(vocabulary.available, weights=weights)[0]
+
+
+def pick_word(difficulty: str, user_id: Optional[str] = None) -> str:
+    """Random word of `difficulty`, avoiding the user's recently served words."""
+    vocabulary = current()
+    if user_id is None:
+        return vocabulary.pick(difficulty)
+    recent = _recent.get(user_id)
+    if recent is None:
+        recent = RecentWords(VOCABULARY_RECENT_WINDOW)
+        _recent.set(user_id, recent)
+    word = vocabulary.pick(difficulty, recent)
+    recent.add(word)
+    return word
+
+
+def stats() -> dict:
+    vocabulary = _ensure_loaded()
+    return {
+        "file": WORDS_FILE_PATH,
+        "words": len(vocabulary),
+        "per_difficulty": {d: end - start for d, (start, end) in vocabulary.ranges.items()},
+        "recent_users": len(_recent),
+        "recent_window": VOCABULARY_RECENT_WINDOW,
+    }
@@ -1,40 +1,54 @@
-import json
-import random
 import os
-from app.db.supabase import supabase
+from dotenv import load_dotenv
+from app.db import repository
+from app.services import stats_store, summary_cache, active_log_cache, vocabulary, write_behind
 
-WORDS_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "words.json")
+load_dotenv()
 
-def load_words():
-    """Lengths are cached in memory for simple random selection"""
-    with open(WORDS_FILE_PATH, "r") as f:
-        return json.load(f)
+# "rpc" runs each session transition as one call to the procedures in schema.sql;
+# "rest" issues the individual PostgREST reads and writes (buffered when WRITE_BEHIND_ENABLED=1).
+WORD_SESSION_MODE = os.environ.get("WORD_SESSION_MODE", "rest")
 
-vocab_data = load_words()
 
-def get_random_word(difficulty: str = "beginner"):
-    """Select a random word from the specified difficulty"""
-    words_list = vocab_data.get(difficulty, vocab_data["beginner"])
-    return random.choice(words_list)
+class LogNotFound(Exception):
+    """Raised when the log a sentence was graded against is no longer one of the user's logs."""
+
+    detail = "The active practice word changed while the sentence was graded. Please fetch the word again."
+
+
+def get_random_word(difficulty: str = "beginner", user_id: str = None):
+    """Select a random word from the specified difficulty, avoiding the user's recent words"""
+    return vocabulary.pick_word(difficulty, user_id)
+
+def get_word_difficulty(word: str):
+    """Difficulty of a vocabulary word, or None if the word is not in the vocabulary"""
+    return vocabulary.current().difficulty_of(word)
 
 async def fetch_current_word(user_id: str):
     """
-    Check if the user has an active word in user_state -> practice_logs
+    Check if the user has an active word in user_state -> practice_logs.
+    Served from the write-through cache when possible.
     """
-    state_response = supabase.table("user_state").select("current_log_id").eq("user_id", user_id).execute()
-    
-    if not state_response.data or not state_response.data[0]["current_log_id"]:
-        return None
+    cached = await active_log_cache.lookup(user_id)
+    if cached is not None:
+        return cached
+
+    generation = await active_log_cache.generation(user_id)
+    log = await _read_current_log(user_id)
+    if log:
+        await active_log_cache.fill(user_id, log, generation)
+    return log
 
-    log_id = state_response.data[0]["current_log_id"]
+async def _read_current_log(user_id: str):
+    if WORD_SESSION_MODE == "rpc":
+        return await repository.fetch_word_session(user_id)
 
-    log_response = supabase.table("practice_logs").select("*").eq("id", log_id).execute()
-    
-    if log_response.data:
-        log = log_response.data[0]
-        return log
-    
-    return None
+    log_id = await write_behind.get_current_log_id(user_id)
+
+    if not log_id:
+        return None
+
+    return await write_behind.get_log(log_id)
 
 async def generate_new_word(user_id: str):
     """
@@ -43,30 +57,97 @@ async def generate_new_word(user_id: str):
     3. Create new log entry
     4. Update user_state
     """
+    if WORD_SESSION_MODE == "rpc":
+        return await _generate_new_word_rpc(user_id)
+
     current_log = await fetch_current_word(user_id)
     if current_log and current_log["status"] == "active":
-        supabase.table("practice_logs").update({"status": "resigned"}).eq("id", current_log["id"]).execute()
+        await write_behind.update_log(current_log["id"], {"status": "resigned"}, current_log)
+        stats_store.record_resigned(user_id, current_log)
+        await summary_cache.invalidate(user_id)
 
-    difficulty = random.choice(["beginner", "intermediate", "advanced"])
-    new_word = get_random_word(difficulty)
+    difficulty = vocabulary.choose_difficulty(user_id)
+    new_word = get_random_word(difficulty, user_id)
     new_log = {
         "user_id": user_id,
         "word": new_word,
         "difficulty": difficulty,
         "status": "active"
     }
-    insert_response = supabase.table("practice_logs").insert(new_log).execute()
-    new_log_id = insert_response.data[0]["id"]
+    inserted_log = await write_behind.insert_log(new_log)
+    new_log_id = inserted_log["id"]
 
-    state_check = supabase.table("user_state").select("user_id").eq("user_id", user_id).execute()
-    
-    if state_check.data:
-        supabase.table("user_state").update({"current_log_id": new_log_id}).eq("user_id", user_id).execute()
-    else:
-        supabase.table("user_state").insert({"user_id": user_id, "current_log_id": new_log_id}).execute()
+    await write_behind.set_current_log(user_id, new_log_id)
+    await active_log_cache.put(user_id, inserted_log)
 
     return {
         "word": new_word,
         "difficulty": difficulty,
         "log_id": new_log_id
     }
+
+async def _generate_new_word_rpc(user_id: str):
+    difficulty = vocabulary.choose_difficulty(user_id)
+    new_word = get_random_word(difficulty, user_id)
+    session = await repository.generate_word_session(user_id, new_word, difficulty)
+    if session["resigned"]:
+        stats_store.record_resigned(user_id, session["resigned"])
+        await summary_cache.invalidate(user_id)
+    await active_log_cache.put(user_id, session["log"])
+
+    return {
+        "word": new_word,
+        "difficulty": difficulty,
+        "log_id": session["log"]["id"]
+    }
+
+async def record_attempt(user_id: str, active_log: dict, user_sentence: str, n8n_result: dict):
+    """
+    Store a graded sentence against the user's current word.
+    The active log is completed in place; a retry on an already completed word gets its own log
+    so the history of attempts is kept.
+    """
+    update_payload = {
+        "sentence": user_sentence,
+        "score": n8n_result.get("score"),
+        "level": n8n_result.get("level"),
+        "suggestion": n8n_result.get("suggestion"),
+        "corrected_sentence": n8n_result.get("corrected_sentence"),
+        "provisional": bool(n8n_result.get("provisional")),
+        "status": "completed",
+        "updated_at": "now()"
+    }
+
+    if WORD_SESSION_MODE == "rpc":
+        result = {key: value for key, value in update_payload.items() if key not in ("status", "updated_at")}
+        session = await repository.complete_word_session(user_id, active_log["id"], result)
+        if session is None:
+            raise LogNotFound(f"Practice log {active_log['id']} not found for this user.")
+        stats_store.record_completed(user_id, session["log"])
+        if session["current"]:
+            await active_log_cache.put(user_id, session["log"])
+        else:
+            await active_log_cache.invalidate(user_id)
+    elif active_log["status"] == "active":
+        await write_behind.update_log(active_log["id"], update_payload, active_log)
+        completed_log = {**active_log, **update_payload}
+        stats_store.record_completed(user_id, completed_log)
+        completed_log.pop("updated_at")
+        # A queued job may complete a log the user has already moved on from
+        cached = await active_log_cache.lookup(user_id)
+        if cached is not None and cached["id"] == active_log["id"]:
+            await active_log_cache.put(user_id, completed_log)
+        else:
+            await active_log_cache.invalidate(user_id)
+    else:
+        new_log = {
+            "user_id": user_id,
+            "word": active_log["word"],
+            "difficulty": active_log["difficulty"],
+            **update_payload
+        }
+        inserted_log = await write_behind.insert_log(new_log)
+        await write_behind.set_current_log(user_id, inserted_log["id"])
+        stats_store.record_completed(user_id, inserted_log)
+        await active_log_cache.put(user_id, inserted_log)
+    await summary_cache.invalidate(user_id)
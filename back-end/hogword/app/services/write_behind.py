@@ -0,0 +1,318 @@
+"""
+Optional write-behind buffer for practice_logs and user_state (`WRITE_BEHIND_ENABLED=1`).
+
+Session writes (new log, resigned / completed log, current-log pointer) are kept in memory and
+written in bulk: every `WRITE_BEHIND_FLUSH_INTERVAL` seconds, or as soon as
+`WRITE_BEHIND_BATCH_SIZE` logs are pending, one upsert of the pending practice_logs rows per set of
+columns written and one upsert of all pending user_state pointers. Writes coalesce: a log that is
+inserted and then completed before a flush is written once, and only the latest pointer per user
+is kept.
+
+- New logs get a client-side UUID and `created_at`, so callers get their row back immediately.
+- An update of a log that is not pending only buffers the columns it changes, plus the immutable
+  columns the upsert needs, taken from the caller's copy of the row (`current`). Columns
+  written by others meanwhile (e.g. a re-grade) are never overwritten with a stale copy.
+- `get_log` / `get_current_log_id` see pending writes. Range reads (history, stats, export)
+  call `flush_user` first, which writes the buffer if that user has anything pending.
+- `shutdown` drains the buffer from the FastAPI lifespan. Writes pending when a worker is
+  killed are lost, and other workers see them only after the flush, so keep the interval short.
+- A failed flush puts the rows back (unless newer writes replaced them) and is retried; once
+  `WRITE_BEHIND_MAX_PENDING` logs are pending, writers wait for a flush instead of buffering more.
+
+With `WRITE_BEHIND_ENABLED=0` every function writes straight through to `repository`.
+"""
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from app.db import repository
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = os.environ.get("WRITE_BEHIND_ENABLED", "0") == "1"
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", "200"))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("WRITE_BEHIND_MAX_PENDING", "5000"))
+
+# Every buffered new log carries all of these
+LOG_COLUMNS = (
+    "id", "user_id", "word", "difficulty", "sentence", "score", "level", "suggestion",
+    "corrected_sentence", "provisional", "status", "created_at", "updated_at",
+)
+LOG_DEFAULTS = {"provisional": False}
+# NOT NULL columns without a default: an upsert checks them before it finds the existing row, so
+# every buffered update carries them. Status comes from the update itself; the others never change
+# after the insert and are copied from the caller's row.
+INSERT_COLUMNS = ("id", "user_id", "word", "difficulty", "status")
+IMMUTABLE_COLUMNS = ("user_id", "word", "difficulty")
+
+
+class WriteBehindStats:
+    def __init__(self):
+        self.buffered_writes = 0
+        self.coalesced_writes = 0
+        self.flushes = 0
+        self.flushed_logs = 0
+        self.flushed_pointers = 0
+        self.upstream_calls = 0
+        self.failed_flushes = 0
+
+    def as_dict(self):
+        return {
+            "enabled": WRITE_BEHIND_ENABLED,
+            "pending_logs": len(_logs),
+            "pending_pointers": len(_pointers),
+            "buffered_writes": self.buffered_writes,
+            "coalesced_writes": self.coalesced_writes,
+            "flushes": self.flushes,
+            "flushed_logs": self.flushed_logs,
+            "flushed_pointers": self.flushed_pointers,
+            "upstream_calls": self.upstream_calls,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+write_stats = WriteBehindStats()
+
+_logs: Dict[str, dict] = {}          # log_id -> columns waiting to be written (the full row for new logs)
+_pointers: Dict[str, str] = {}       # user_id -> current_log_id waiting to be written
+_flushing_logs: Dict[str, dict] = {}
+_flushing_pointers: Dict[str, str] = {}
+_pending_users: Dict[str, int] = {}  # user_id -> pending logs + pointers (buffered or being flushed)
+
+_flush_lock: Optional[asyncio.Lock] = None
+_wake: Optional[asyncio.Event] = None
+_task: Optional[asyncio.Task] = None
+_stopping = False
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _full_row(row: dict) -> dict:
+    return {column: row.get(column, LOG_DEFAULTS.get(column)) for column in LOG_COLUMNS}
+
+
+def _mark(user_id: str, amount: int):
+    count = _pending_users.get(user_id, 0) + amount
+    if count > 0:
+        _pending_users[user_id] = count
+    else:
+        _pending_users.pop(user_id, None)
+
+
+def _buffer_log(row: dict):
+    if row["id"] in _logs:
+        write_stats.coalesced_writes += 1
+    else:
+        _mark(row["user_id"], 1)
+    _logs[row["id"]] = row
+    write_stats.buffered_writes += 1
+
+
+async def _after_write():
+    if _wake is None:
+        await startup()
+    if len(_logs) >= WRITE_BEHIND_MAX_PENDING:
+        await flush()
+    elif len(_logs) >= WRITE_BEHIND_BATCH_SIZE:
+        _wake.set()
+
+
+# --- writes ---
+
+async def insert_log(log: dict) -> dict:
+    if not WRITE_BEHIND_ENABLED:
+        return await repository.insert_log(log)
+    return (await insert_logs([log]))[0]
+
+
+async def insert_logs(logs: List[dict]) -> List[dict]:
+    if not WRITE_BEHIND_ENABLED:
+        return await repository.insert_logs(logs)
+    rows = []
+    for log in logs:
+        now = _now()
+        row = _full_row({"id": str(uuid.uuid4()), "created_at": now, **log, "updated_at": now})
+        _buffer_log(row)
+        rows.append(dict(row))
+    if rows:
+        await _after_write()
+    return rows
+
+
+async def update_log(log_id: str, payload: dict, current: Optional[dict] = None):
+    """Update a log; `current` is the caller's copy of the row, which supplies `INSERT_COLUMNS`."""
+    patch = {**payload, "id": log_id, "updated_at": _now()}
+    pending = _logs.get(log_id)
+    if pending is not None:
+        patch = {**pending, **patch}
+    else:
+        base = _flushing_logs.get(log_id) or current or {}
+        patch = {**{column: base[column] for column in IMMUTABLE_COLUMNS if column in base}, **patch}
+    if not WRITE_BEHIND_ENABLED or any(column not in patch for column in INSERT_COLUMNS):
+        await flush_log(log_id)
+        await repository.update_log(log_id, payload)
+        return
+    _buffer_log(patch)
+    await _after_write()
+
+
+async def set_current_log(user_id: str, log_id: str):
+    if not WRITE_BEHIND_ENABLED:
+        await repository.set_current_log(user_id, log_id)
+        return
+    if user_id in _pointers:
+        write_stats.coalesced_writes += 1
+    else:
+        _mark(user_id, 1)
+    _pointers[user_id] = log_id
+    write_stats.buffered_writes += 1
+    await _after_write()
+
+
+# --- reads that see pending writes ---
+
+async def get_log(log_id: str) -> Optional[dict]:
+    pending = {**_flushing_logs.get(log_id, {}), **_logs.get(log_id, {})}
+    if all(column in pending for column in LOG_COLUMNS):
+        return pending
+    row = await repository.get_log(log_id)
+    if row is None or not pending:
+        return row
+    return {**row, **pending}
+
+
+async def get_current_log_id(user_id: str) -> Optional[str]:
+    log_id = _pointers.get(user_id) or _flushing_pointers.get(user_id)
+    if log_id is not None:
+        return log_id
+    return await repository.get_current_log_id(user_id)
+
+
+async def flush_user(user_id: str):
+    """Make the user's pending writes visible to database reads (call before range queries)."""
+    if user_id in _pending_users:
+        await flush()
+
+
+async def flush_users(user_ids: List[str]):
+    if any(user_id in _pending_users for user_id in user_ids):
+        await flush()
+
+
+async def flush_log(log_id: str):
+    if log_id in _logs or log_id in _flushing_logs:
+        await flush()
+
+
+# --- flushing ---
+
+async def flush():
+    """
+    Write everything pending: one bulk upsert per set of log columns, then one of the pointers
+    (logs first, for the user_state foreign key).
+    """
+    global _logs, _pointers, _flushing_logs, _flushing_pointers
+    if _flush_lock is None:
+        await startup()
+    async with _flush_lock:
+        if not _logs and not _pointers:
+            return
+        _flushing_logs, _logs = _logs, {}
+        _flushing_pointers, _pointers = _pointers, {}
+        try:
+            # A bulk upsert needs the same columns in every row
+            by_columns = {}
+            for row in _flushing_logs.values():
+                by_columns.setdefault(tuple(sorted(row)), []).append(row)
+            for rows in by_columns.values():
+                write_stats.upstream_calls += 1
+                await repository.upsert_logs(rows)
+            if _flushing_pointers:
+                write_stats.upstream_calls += 1
+                await repository.set_current_logs(
+                    [{"user_id": user_id, "current_log_id": log_id} for user_id, log_id in _flushing_pointers.items()]
+                )
+        except BaseException:
+            write_stats.failed_flushes += 1
+            # Newer writes made during the flush win over the columns being put back
+            newer_logs, newer_pointers = _logs, _pointers
+            _logs = dict(_flushing_logs)
+            for log_id, row in newer_logs.items():
+                if log_id in _logs:
+                    _mark(row["user_id"], -1)
+                    _logs[log_id] = {**_logs[log_id], **row}
+                else:
+                    _logs[log_id] = row
+            _pointers = {**_flushing_pointers, **newer_pointers}
+            for user_id in _flushing_pointers:
+                if user_id in newer_pointers:
+                    _mark(user_id, -1)
+            raise
+        else:
+            write_stats.flushes += 1
+            write_stats.flushed_logs += len(_flushing_logs)
+            write_stats.flushed_pointers += len(_flushing_pointers)
+            for row in _flushing_logs.values():
+                _mark(row["user_id"], -1)
+            for user_id in _flushing_pointers:
+                _mark(user_id, -1)
+        finally:
+            _flushing_logs, _flushing_pointers = {}, {}
+
+
+async def _flusher():
+    while not _stopping:
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=WRITE_BEHIND_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+        if _stopping:
+            return
+        try:
+            await flush()
+        except Exception as e:
+            logger.warning("Write-behind flush failed, will retry: %r", e)
+            await asyncio.sleep(WRITE_BEHIND_FLUSH_INTERVAL)
+
+
+async def startup():
+    """Start the flusher. Called from the FastAPI lifespan."""
+    global _flush_lock, _wake, _task
+    if _flush_lock is None:
+        _flush_lock = asyncio.Lock()
+        _wake = asyncio.Event()
+    if WRITE_BEHIND_ENABLED and _task is None:
+        _task = asyncio.create_task(_flusher())
+
+
+async def shutdown():
+    """Stop the flusher and drain the buffer."""
+    global _flush_lock, _wake, _task, _stopping
+    if _task is not None:
+        # Stopped with a flag rather than cancel(): wait_for can swallow a cancellation that
+        # arrives as the wake-up event is set, which would leave the flusher running
+        _stopping = True
+        _wake.set()
+        await _task
+        _task = None
+        _stopping = False
+    if _flush_lock is not None:
+        try:
+            await flush()
+        except Exception as e:
+            logger.error("Write-behind drain failed, %d logs and %d pointers lost: %r", len(_logs), len(_pointers), e)
+    _flush_lock = None
+    _wake = None
+
+
+def stats() -> dict:
+    return write_stats.as_dict()
@@ -0,0 +1,116 @@
+"""
+Per-request auth cost: local JWT verification vs. remote `supabase.auth.get_user`, and
+auth-server calls per login: `/auth/signin-up` with and without the known-email cache, and
+renewing an expired session by password vs. with `/auth/refresh`.
+
+The remote mode talks to a local stand-in of the Supabase auth server, so the numbers
+are a lower bound for the real thing (no TLS, no WAN latency).
+
+Usage:
+    python -m benchmarks.bench_auth --requests 2000 --logins 200
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+from benchmarks.stand_ins import configure_env, make_token, start_fake_supabase
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "mean_us": round(statistics.fmean(samples) * 1e6, 1),
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 1),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1] * 1e6, 1),
+    }
+
+
+async def login_costs(server, logins: int) -> dict:
+    """Auth-server calls and mean latency per login scenario, with the email cache off and on."""
+    from app.services import auth_service
+
+    handler = server.RequestHandlerClass
+
+    async def measure(scenario):
+        calls_before = handler.auth_calls
+        samples = []
+        for i in range(logins):
+            start = time.perf_counter()
+            await scenario(i)
+            samples.append(time.perf_counter() - start)
+        return {
+            "auth_calls_per_login": round((handler.auth_calls - calls_before) / logins, 2),
+            "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+        }
+
+    async def wrong_password(email):
+        try:
+            await auth_service.sign_in_or_up(email, "wrong-password")
+        except auth_service.AuthError:
+            pass
+
+    results = {}
+    for cached in (False, True):
+        auth_service.AUTH_EMAIL_CACHE_ENABLED = cached
+        prefix = f"bench-{'cached' if cached else 'uncached'}"
+        sessions = {}
+
+        async def new_user(i):
+            sessions[i] = await auth_service.sign_in_or_up(f"{prefix}-{i}@example.com", "password")
+
+        async def returning_user(i):
+            await auth_service.sign_in_or_up(f"{prefix}-{i}@example.com", "password")
+
+        results["cache_on" if cached else "cache_off"] = {
+            "new_user": await measure(new_user),
+            "returning_user": await measure(returning_user),
+            "wrong_password": await measure(lambda i: wrong_password(f"{prefix}-{i}@example.com")),
+        }
+
+    async def refresh(i):
+        sessions[i] = await auth_service.refresh(sessions[i]["refresh_token"])
+
+    results["session_renewal"] = {"password": results["cache_on"]["returning_user"], "refresh_token": await measure(refresh)}
+    await auth_service.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args()
+
+    server = start_fake_supabase()
+    configure_env(server)
+
+    from fastapi.security import HTTPAuthorizationCredentials
+    from app.routers.auth import get_current_user
+    from app.services import token_service
+
+    user_id = str(uuid.uuid4())
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=make_token(user_id))
+
+    results = {}
+    for mode in ("local", "remote"):
+        token_service.AUTH_VERIFY_MODE = mode
+        get_current_user(credentials)  # warm up connections / caches
+        samples = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            user = get_current_user(credentials)
+            samples.append(time.perf_counter() - start)
+            assert user.user.id == user_id
+        results[mode] = summarize(samples)
+
+    results["speedup"] = round(results["remote"]["mean_us"] / results["local"]["mean_us"], 1)
+    results["logins"] = asyncio.run(login_costs(server, args.logins))
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
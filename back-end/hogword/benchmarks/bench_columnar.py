@@ -0,0 +1,88 @@
+"""
+Row-by-row vs. vectorized dashboard aggregation at increasing history sizes.
+Also checks that both engines produce identical summaries.
+
+Usage:
+    python -m benchmarks.bench_columnar --rows 1000 100000 1000000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.stand_ins import configure_env, start_fake_supabase
+
+
+def make_logs(rows: int, now: datetime, users: int = 1):
+    random.seed(rows)
+    words = [f"word{i}" for i in range(500)]
+    start = now - timedelta(days=365)
+    step = 365 * 86400 / rows
+    logs = []
+    for i in range(rows):
+        status = random.choices(["completed", "resigned", "active"], weights=[8, 1, 1])[0]
+        logs.append({
+            "user_id": f"user-{random.randrange(users)}",
+            "created_at": (start + timedelta(seconds=i * step)).isoformat() + "+00:00",
+            "word": random.choice(words),
+            "score": random.randint(0, 10) if status == "completed" else None,
+            "difficulty": random.choice(["beginner", "intermediate", "advanced"]),
+            "status": status,
+        })
+    return logs
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, round((time.perf_counter() - start) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--users", type=int, default=1)
+    args = parser.parse_args()
+
+    configure_env(start_fake_supabase())
+    from app.services import columnar_stats, stats_service
+
+    now = datetime.utcnow()
+    today = now.date().isoformat()
+    results = []
+    for rows in args.rows:
+        logs = make_logs(rows, now, args.users)
+
+        def scan():
+            by_user = {}
+            for log in logs:
+                by_user.setdefault(log["user_id"], []).append(log)
+            return {
+                user_id: stats_service.compute_dashboard_stats(
+                    user_logs,
+                    sum(1 for l in user_logs if l["status"] == "resigned" and l["created_at"] >= today),
+                    now,
+                )
+                for user_id, user_logs in by_user.items()
+            }
+
+        expected, scan_ms = timed(scan)
+        columns, transpose_ms = timed(lambda: columnar_stats.to_columns(logs))
+        actual, columnar_ms = timed(lambda: columnar_stats.aggregate(columns, now))
+        _, aggregated_ms = timed(lambda: columnar_stats.aggregate(columns, now, score_points="aggregated"))
+        results.append({
+            "rows": rows,
+            "users": args.users,
+            "scan_ms": scan_ms,
+            "columnar_transpose_ms": transpose_ms,
+            "columnar_full_ms": columnar_ms,
+            "columnar_aggregated_ms": aggregated_ms,
+            "identical": actual == expected,
+        })
+        del logs, columns, expected, actual
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
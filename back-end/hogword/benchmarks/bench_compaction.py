@@ -0,0 +1,193 @@
+"""
+Compaction of old practice_logs: rows left in practice_logs, rows read per dashboard rebuild, and
+a check that every stats mode returns the same dashboard before and after compaction.
+
+Each user gets `--days` days of history (`--per-day` logs a day, fractional scores, a few resigned
+and skipped logs, one provisional log), ending with an active current log, in
+`benchmarks.memory_repository`. Dashboards are computed in every `STATS_MODE` (full and
+aggregated `score_count_data`) plus the cohort path, then the users are compacted with
+`--retention-days` (archiving the raw rows to a temporary directory) and everything is computed
+again and compared. Compacted scores are summed as totals, in a different order than row by row,
+so an average that falls on a rounding tie may move by 0.01; those dashboards are counted in
+`rounding_differences` and anything else is a mismatch. `score_points=full` is refused for users
+with compacted history (counted in `full_refused`) and must be unchanged for the others.
+
+Usage:
+    python -m benchmarks.bench_compaction --users 20 --days 365 --per-day 10 --retention-days 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from benchmarks.stand_ins import configure_env, start_fake_supabase
+from benchmarks import memory_repository
+
+MODES = ("incremental", "columnar", "scan")
+
+
+def seed(users: int, days: int, per_day: int, now: datetime) -> list:
+    random.seed(users * days * per_day)
+    words = [f"word{i}" for i in range(200)]
+    user_ids = [f"compaction-user-{i}" for i in range(users)]
+    start = now - timedelta(days=days)
+    step = 86400 / per_day
+    for user_id in user_ids:
+        provisional_at = random.randrange(days * per_day)
+        for i in range(days * per_day):
+            status = random.choices(["completed", "resigned", "skipped"], weights=[16, 2, 1])[0]
+            memory_repository._insert({
+                "user_id": user_id,
+                "created_at": (start + timedelta(seconds=i * step)).isoformat(),
+                "word": random.choice(words),
+                "difficulty": random.choice(["beginner", "intermediate", "advanced"]),
+                "sentence": f"A sentence written for attempt {i}.",
+                "suggestion": "Some feedback about the sentence." if status == "completed" else None,
+                "score": random.randint(0, 9) + random.choice([0, 0.3, 0.5, 0.7]) if status == "completed" else None,
+                "provisional": status == "completed" and i == provisional_at,
+                "status": status,
+            })
+        current = memory_repository._insert({
+            "user_id": user_id, "created_at": now.isoformat(), "word": "current", "difficulty": "beginner",
+            "status": "active",
+        })
+        memory_repository._state[user_id] = current["id"]
+    return user_ids
+
+
+async def dashboards(user_ids: list) -> dict:
+    from app.services import stats_service, stats_store
+
+    results = {}
+    for mode in MODES:
+        stats_service.STATS_MODE = mode
+        for score_points in ("full", "aggregated"):
+            for user_id in user_ids:
+                stats_store.invalidate(user_id)
+                await stats_service.summary_cache.invalidate(user_id)
+                try:
+                    stats = await stats_service.get_user_dashboard_stats(user_id, score_points)
+                except stats_store.FullPointsUnavailable:
+                    stats = None
+                results[f"{mode}:{score_points}:{user_id}"] = stats
+    cohort = await stats_service.get_cohort_dashboard_stats(user_ids)
+    results.update({f"cohort:aggregated:{user_id}": stats for user_id, stats in cohort.items()})
+    return results
+
+
+def close(expected, actual) -> bool:
+    """Equal, except that rounded floats may differ by one unit in the last (second) decimal."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        return expected.keys() == actual.keys() and all(close(expected[k], actual[k]) for k in expected)
+    if isinstance(expected, list) and isinstance(actual, list):
+        return len(expected) == len(actual) and all(close(e, a) for e, a in zip(expected, actual))
+    if isinstance(expected, float) or isinstance(actual, float):
+        return isinstance(actual, (int, float)) and abs(expected - actual) <= 0.010001
+    return expected == actual
+
+
+def compare(before: dict, after: dict, compacted_users: set) -> tuple:
+    """
+    (modes with mismatched dashboards, number of dashboards that differ only by rounding, number of
+    full dashboards refused after compaction).
+    """
+    mismatched = set()
+    rounding = 0
+    refused = 0
+    for key, expected in before.items():
+        actual = after.get(key)
+        if key.split(":")[1] == "full" and actual is None and key.rsplit(":", 1)[1] in compacted_users:
+            refused += 1
+            continue
+        if expected != actual:
+            if close(expected, actual):
+                rounding += 1
+            else:
+                mismatched.add(key)
+    return sorted({key.rsplit(":", 1)[0] for key in mismatched}), rounding, refused
+
+
+async def rebuild_cost(user_ids: list) -> dict:
+    from app.services import stats_store
+
+    start = time.perf_counter()
+    rows = 0
+    for user_id in user_ids:
+        rollup, logs = await stats_store.load_history(user_id, stats_store.LOG_COLUMNS)
+        stats_store.build_from_logs(logs, rollup)
+        stored = memory_repository._rollups.get(user_id)
+        rows += len(logs) + (len(stored["words"]) + len(stored["attempts"]) if stored else 0)
+    history_ms = (time.perf_counter() - start) * 1000
+    return {
+        "practice_logs_rows": sum(len(logs) for logs in memory_repository._user_logs.values()),
+        "history_rows_per_user": rows // len(user_ids),
+        "history_rebuild_ms_per_user": round(history_ms / len(user_ids), 2),
+    }
+
+
+async def run(args) -> dict:
+    from app.services import compaction, stats_store
+
+    stats_store.COMPACTION_ENABLED = compaction.COMPACTION_ENABLED = True
+    now = datetime.now(timezone.utc)
+    user_ids = seed(args.users, args.days, args.per_day, now)
+    before = await dashboards(user_ids)
+    cost_before = await rebuild_cost(user_ids)
+
+    with tempfile.TemporaryDirectory() as archive_dir:
+        compaction.COMPACTION_RETENTION_DAYS = args.retention_days
+        compaction.COMPACTION_ARCHIVE_DIR = archive_dir
+        start = time.perf_counter()
+        compacted = await compaction.run(now)
+        compaction_seconds = time.perf_counter() - start
+        archived = 0
+        for name in os.listdir(archive_dir):
+            with np.load(os.path.join(archive_dir, name)) as archive:
+                archived += len(archive["id"])
+        archive_bytes = sum(os.path.getsize(os.path.join(archive_dir, name)) for name in os.listdir(archive_dir))
+
+    after = await dashboards(user_ids)
+    mismatched, rounding, refused = compare(before, after, set(memory_repository._rollups))
+    return {
+        "users": args.users,
+        "before": cost_before,
+        "after": await rebuild_cost(user_ids),
+        "logs_compacted": compacted,
+        "logs_archived": archived,
+        "archive_bytes": archive_bytes,
+        "rollup_rows": {
+            table: sum(len(rollup[table]) for rollup in memory_repository._rollups.values())
+            for table in ("days", "words", "attempts")
+        },
+        "compaction_seconds": round(compaction_seconds, 3),
+        "dashboards_compared": len(before),
+        "rounding_differences": rounding,
+        "full_refused": refused,
+        "mismatched_dashboards": mismatched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=10)
+    parser.add_argument("--retention-days", type=int, default=30)
+    args = parser.parse_args()
+
+    configure_env(start_fake_supabase())
+    memory_repository.install()
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if result["mismatched_dashboards"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
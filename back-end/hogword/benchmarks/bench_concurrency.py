@@ -0,0 +1,57 @@
+"""
+Throughput of the data-access layer as concurrent users grow.
+
+Every PostgREST call goes to a local stand-in that sleeps `--latency` seconds. With a
+blocking client, throughput stays flat no matter how many users are active; with the
+async repository it should grow roughly linearly until `DB_MAX_WORKERS` is saturated.
+
+Usage:
+    python -m benchmarks.bench_concurrency --latency 0.02 --levels 1 2 4 8 16 32
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from benchmarks.stand_ins import configure_env, start_fake_supabase
+
+
+async def user_session(word_service, stats_service, rounds: int):
+    user_id = str(uuid.uuid4())
+    for _ in range(rounds):
+        await word_service.fetch_current_word(user_id)
+        await stats_service.get_user_dashboard_stats(user_id)
+
+
+async def measure(concurrency: int, rounds: int):
+    from app.services import word_service, stats_service
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user_session(word_service, stats_service, rounds) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return concurrency * rounds / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    server = start_fake_supabase(latency=args.latency)
+    configure_env(server)
+
+    results = []
+    for level in args.levels:
+        throughput = asyncio.run(measure(level, args.rounds))
+        results.append({"concurrent_users": level, "sessions_per_sec": round(throughput, 1)})
+
+    server.shutdown()
+    scaling = all(b["sessions_per_sec"] > a["sessions_per_sec"] for a, b in zip(results, results[1:]))
+    print(json.dumps({"results": results, "throughput_grows_with_users": scaling}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
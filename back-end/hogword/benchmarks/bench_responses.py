@@ -0,0 +1,113 @@
+"""
+/api/summary and /api/today-log through the full FastAPI stack: time per request for the
+response-model path vs. the `FAST_JSON_RESPONSES` path, and bytes on the wire per
+Content-Encoding.
+
+Usage:
+    python -m benchmarks.bench_responses --histories 1000 10000 100000
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.stand_ins import configure_env, start_fake_supabase, make_token
+from benchmarks.bench_summary import make_history
+
+
+def today_logs(count: int, now: datetime):
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "created_at": (now - timedelta(seconds=i)).isoformat() + "+00:00",
+            "word": f"word{i % 200}",
+            "sentence": f"This is practice sentence number {i} for word{i % 200}.",
+            "score": random.randint(1, 10),
+            "suggestion": "Try a more specific verb." if i % 3 else None,
+        }
+        for i in range(count)
+    ]
+
+
+def normalized(body: bytes):
+    """Decoded body with timestamps parsed: the fast path passes them through as stored (`+00:00`)."""
+    payload = json.loads(body)
+    if isinstance(payload, list):
+        for item in payload:
+            item["datetime"] = datetime.fromisoformat(item["datetime"].replace("Z", "+00:00"))
+    return payload
+
+
+def timed(client, path, headers, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(path, headers=headers)
+    return response, (time.perf_counter() - start) / repeat * 1000
+
+
+def measure(client, routers, path, auth, repeat):
+    result = {}
+    for fast in (False, True):
+        for router in routers:
+            router.FAST_JSON_RESPONSES = fast
+        response, ms = timed(client, path, {**auth, "Accept-Encoding": "identity"}, repeat)
+        result["fast_ms" if fast else "model_ms"] = round(ms, 2)
+        result["fast_body" if fast else "model_body"] = response.content
+    assert normalized(result.pop("fast_body")) == normalized(result["model_body"])
+    result["identity_bytes"] = len(result.pop("model_body"))
+    for encoding in ("gzip", "br"):
+        response, ms = timed(client, path, {**auth, "Accept-Encoding": encoding}, repeat)
+        if response.headers.get("content-encoding") == encoding:
+            result[f"{encoding}_bytes"] = int(response.headers["content-length"])
+            result[f"{encoding}_ms"] = round(ms, 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--histories", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    configure_env(start_fake_supabase())
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.db import repository
+    from app.routers import analytics, logs
+    from app.services import stats_service, stats_store
+
+    random.seed(7)
+    now = datetime.utcnow()
+    client = TestClient(app)
+    auth = {"Authorization": f"Bearer {make_token(str(uuid.uuid4()))}"}
+    results = []
+    for attempts in args.histories:
+        aggregate, history = make_history(stats_store, attempts, now)
+        stats = aggregate.summary(now, score_count_data=stats_store.score_points_from_logs(history))
+        rows = today_logs(min(attempts, 5000), now)
+
+        async def get_stats(*_args, **_kwargs):
+            return stats
+
+        async def latest_log_update(*_args, **_kwargs):
+            return len(rows), now.isoformat()
+
+        async def list_logs_page(*_args, **_kwargs):
+            return rows
+
+        stats_service.get_user_dashboard_stats = get_stats
+        repository.latest_log_update = latest_log_update
+        repository.list_logs_page = list_logs_page
+        results.append({
+            "attempts": attempts,
+            "summary_full": measure(client, [analytics], "/api/summary?score_points=full", auth, args.repeat),
+            "today_log_rows": len(rows),
+            "today_log": measure(client, [logs], "/api/today-log", auth, args.repeat),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
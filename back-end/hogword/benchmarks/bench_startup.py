@@ -0,0 +1,135 @@
+"""
+Startup cost: `import app.main` time, and for each server mode the time until `/readyz` answers
+200, the latency of the first and of later `/api/summary` requests, the memory of the whole
+process tree (PSS, so pages shared copy-on-write are counted once) and the shutdown time.
+
+Modes: a single uvicorn process, and gunicorn with `--workers` uvicorn workers with and without
+`GUNICORN_PRELOAD`. The servers run as subprocesses against the local Supabase stand-in, with the
+memory cache backend (`GUNICORN_ALLOW_MEMORY_BACKEND=1`; startup cost does not depend on it).
+The import is timed without Supabase credentials, which must not fail.
+
+Usage:
+    python -m benchmarks.bench_startup --workers 2 --imports 5
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from benchmarks.stand_ins import configure_env, make_token, start_fake_supabase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def import_seconds(repeats: int) -> dict:
+    env = {key: value for key, value in os.environ.items() if not key.startswith("SUPABASE_")}
+    samples = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return {"median_ms": round(statistics.median(samples) * 1000, 1), "max_ms": round(max(samples) * 1000, 1)}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_tree(pid: int) -> list:
+    pids = [pid]
+    for child in open(f"/proc/{pid}/task/{pid}/children").read().split():
+        pids.extend(process_tree(int(child)))
+    return pids
+
+
+def pss_mb(pid: int) -> float:
+    total = 0
+    for member in process_tree(pid):
+        with open(f"/proc/{member}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    total += int(line.split()[1])
+    return round(total / 1024, 1)
+
+
+def measure(name: str, command: list, env: dict, requests: int) -> dict:
+    port = free_port()
+    env = {**env, "HOST": "127.0.0.1", "PORT": str(port)}
+    command = [part.replace("{port}", str(port)) for part in command]
+    base = f"http://127.0.0.1:{port}"
+    headers = {"Authorization": f"Bearer {make_token(str(uuid.uuid4()))}"}
+
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=base, timeout=10) as client:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{name} exited with {process.returncode}")
+                try:
+                    if client.get("/readyz").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+            ready = time.perf_counter() - start
+
+            latencies = []
+            for _ in range(requests):
+                request_start = time.perf_counter()
+                client.get("/api/summary", headers=headers).raise_for_status()
+                latencies.append(time.perf_counter() - request_start)
+            time.sleep(0.5)  # let every worker finish starting before measuring memory
+            memory = pss_mb(process.pid)
+            processes = len(process_tree(process.pid))
+    finally:
+        stop = time.perf_counter()
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+    return {
+        "mode": name,
+        "processes": processes,
+        "ready_ms": round(ready * 1000, 1),
+        "first_request_ms": round(latencies[0] * 1000, 1),
+        "later_requests_p50_ms": round(statistics.median(latencies[1:]) * 1000, 2) if len(latencies) > 1 else None,
+        "pss_mb": memory,
+        "shutdown_ms": round((time.perf_counter() - stop) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--imports", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    configure_env(start_fake_supabase())
+    env = {**os.environ, "GUNICORN_ALLOW_MEMORY_BACKEND": "1"}
+    gunicorn = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"]
+    modes = [
+        ("uvicorn", [sys.executable, "-m", "uvicorn", "app.main:app", "--port", "{port}"], env),
+        (f"gunicorn x{args.workers}", gunicorn, {**env, "WEB_CONCURRENCY": str(args.workers), "GUNICORN_PRELOAD": "0"}),
+        (f"gunicorn x{args.workers} preload", gunicorn, {**env, "WEB_CONCURRENCY": str(args.workers), "GUNICORN_PRELOAD": "1"}),
+    ]
+    result = {
+        "import_without_credentials": import_seconds(args.imports),
+        "servers": [measure(name, command, mode_env, args.requests) for name, command, mode_env in modes],
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
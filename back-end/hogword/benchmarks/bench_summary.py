@@ -0,0 +1,70 @@
+"""
+/api/summary response size and build/validate/serialize time against history length,
+for the full `score_count_data` (built from the logs, without the database read) and the
+aggregated (bounded) form, which only reads the incremental aggregate.
+
+Usage:
+    python -m benchmarks.bench_summary --histories 1000 10000 100000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.stand_ins import configure_env, start_fake_supabase
+
+
+def make_history(stats_store, attempts: int, now: datetime):
+    words = [f"word{i}" for i in range(max(10, attempts // 20))]
+    start = now - timedelta(days=365)
+    logs = [
+        {
+            "created_at": (start + timedelta(seconds=i * 365 * 86400 / attempts)).isoformat() + "+00:00",
+            "word": random.choice(words),
+            "difficulty": random.choice(stats_store.DIFFICULTY_ORDER),
+            "score": random.randint(1, 10),
+            "status": "completed",
+        }
+        for i in range(attempts)
+    ]
+    return stats_store.build_from_logs(logs), logs
+
+
+def measure(stats_store, aggregate, logs, now, score_points, schemas, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if score_points == "full":
+            stats = aggregate.summary(now, score_count_data=stats_store.score_points_from_logs(logs))
+        else:
+            stats = aggregate.summary(now)
+        body = schemas.SummaryResponse(**stats).model_dump_json(exclude_none=True)
+    elapsed = (time.perf_counter() - start) / repeat
+    return {"points": len(stats["score_count_data"]), "bytes": len(body), "ms": round(elapsed * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--histories", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    configure_env(start_fake_supabase())
+    from app.models import schemas
+    from app.services import stats_store
+
+    random.seed(7)
+    now = datetime.utcnow()
+    results = []
+    for attempts in args.histories:
+        aggregate, logs = make_history(stats_store, attempts, now)
+        results.append({
+            "attempts": attempts,
+            "full": measure(stats_store, aggregate, logs, now, "full", schemas, args.repeat),
+            "aggregated": measure(stats_store, aggregate, logs, now, "aggregated", schemas, args.repeat),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
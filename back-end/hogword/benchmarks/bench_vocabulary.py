@@ -0,0 +1,94 @@
+"""
+Vocabulary engine: build time, memory and selection cost against vocabulary size, and how
+often a user is offered a word they saw recently, compared with plain `random.choice`.
+
+Usage:
+    python -m benchmarks.bench_vocabulary --sizes 200 100000 1000000
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from benchmarks.stand_ins import configure_env, start_fake_supabase
+
+
+def make_data(size: int) -> dict:
+    per_level = size // 3
+    return {
+        difficulty: [f"{difficulty}-word-{i}" for i in range(per_level)]
+        for difficulty in ("beginner", "intermediate", "advanced")
+    }
+
+
+def repeats(pick, picks: int, window: int) -> int:
+    """Picks that repeat one of the previous `window` words."""
+    history = []
+    count = 0
+    for _ in range(picks):
+        word = pick()
+        count += word in history[-window:]
+        history.append(word)
+    return count
+
+
+def measure(vocabulary, size: int, picks: int):
+    data = make_data(size)
+    raw = json.dumps(data)
+    start = time.perf_counter()
+    engine = vocabulary.Vocabulary(json.loads(raw))
+    build_ms = (time.perf_counter() - start) * 1000
+    # What a loaded vocabulary keeps, words included: the parsed file is dropped once it is built
+    del engine
+    tracemalloc.start()
+    engine = vocabulary.Vocabulary(json.loads(raw))
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    recent = vocabulary.RecentWords(vocabulary.VOCABULARY_RECENT_WINDOW)
+
+    def pick_engine():
+        word = engine.pick(random.choice(engine.available), recent)
+        recent.add(word)
+        return word
+
+    def pick_baseline():
+        return random.choice(data[random.choice(list(data))])
+
+    start = time.perf_counter()
+    for _ in range(picks):
+        pick_engine()
+    pick_us = (time.perf_counter() - start) / picks * 1e6
+
+    start = time.perf_counter()
+    for _ in range(picks):
+        engine.difficulty_of(f"advanced-word-{random.randrange(size // 3)}")
+    lookup_us = (time.perf_counter() - start) / picks * 1e6
+
+    window = vocabulary.VOCABULARY_RECENT_WINDOW
+    return {
+        "words": len(engine),
+        "build_ms": round(build_ms, 1),
+        "bytes_per_word": round(memory / max(1, len(engine)), 1),
+        "pick_us": round(pick_us, 2),
+        "lookup_us": round(lookup_us, 2),
+        f"repeats_in_last_{window}_engine": repeats(pick_engine, 1000, window),
+        f"repeats_in_last_{window}_random_choice": repeats(pick_baseline, 1000, window),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 100000, 1000000])
+    parser.add_argument("--picks", type=int, default=20000)
+    args = parser.parse_args()
+
+    configure_env(start_fake_supabase())
+    from app.services import vocabulary
+
+    print(json.dumps([measure(vocabulary, size, args.picks) for size in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Write-behind buffer: Supabase write calls and session latency under a synthetic burst, with
+`WRITE_BEHIND_ENABLED` off and on.
+
+Each virtual user runs `--rounds` sessions through `word_service` (new word, then a graded
+sentence, then `--think` seconds of pause) at the same time as all the others, against
+`benchmarks.memory_repository` with `--db-latency` seconds per call. Every new word is read back
+past the active-log cache, so reads must see writes still sitting in the buffer. After the burst
+the buffer is drained and every user's current log is compared with the database, to check that
+nothing written through the buffer was lost.
+
+Usage:
+    python -m benchmarks.bench_write_behind --users 50 --rounds 10 --think 0.1 --db-latency 0.005
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.stand_ins import configure_env, start_fake_supabase
+from benchmarks import memory_repository
+
+WRITE_CALLS = ("insert_log", "insert_logs", "update_log", "set_current_log", "upsert_logs", "set_current_logs")
+
+
+def count_writes(counts: dict):
+    """Wrap the in-memory repository's write functions so every call is counted."""
+    from app.db import repository
+
+    for name in WRITE_CALLS:
+        function = getattr(memory_repository, name)
+
+        async def counted(*args, _name=name, _function=function, **kwargs):
+            counts[_name] = counts.get(_name, 0) + 1
+            return await _function(*args, **kwargs)
+
+        setattr(repository, name, counted)
+
+
+async def run(users: int, rounds: int, think: float, enabled: bool) -> dict:
+    from app.services import word_service, write_behind
+
+    write_behind.WRITE_BEHIND_ENABLED = enabled
+    counts = {}
+    count_writes(counts)
+    await write_behind.startup()
+    user_ids = [f"{'on' if enabled else 'off'}-user-{i}" for i in range(users)]
+
+    async def session(user_id: str):
+        for i in range(rounds):
+            generated = await word_service.generate_new_word(user_id)
+            # Skips the active-log cache: the user_state / practice_logs reads go through the buffer
+            active_log = await word_service._read_current_log(user_id)
+            assert active_log["id"] == generated["log_id"], "read did not see the buffered write"
+            result = {"score": 7, "level": "B1", "suggestion": None, "corrected_sentence": f"Sentence {i}."}
+            await word_service.record_attempt(user_id, active_log, f"sentence {i}", result)
+            await asyncio.sleep(think)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(user_id) for user_id in user_ids))
+    burst = time.perf_counter() - start
+    await write_behind.shutdown()
+
+    lost = 0
+    for user_id in user_ids:
+        current = memory_repository._logs.get(memory_repository._state.get(user_id))
+        if current is None or current["status"] != "completed" or current["sentence"] != f"sentence {rounds - 1}":
+            lost += 1
+    return {
+        "write_behind": enabled,
+        "sessions": users * rounds,
+        "write_calls": sum(counts.values()),
+        "write_calls_by_function": counts,
+        "burst_seconds": round(burst, 3),
+        "users_with_missing_writes": lost,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--think", type=float, default=0.1)
+    parser.add_argument("--db-latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    configure_env(start_fake_supabase())
+    memory_repository.install(args.db_latency)
+
+    async def both():
+        return [await run(args.users, args.rounds, args.think, enabled) for enabled in (False, True)]
+
+    print(json.dumps(asyncio.run(both()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Single-flight check of `n8n_service.validate_sentence` against the n8n stand-in, counting webhook
+hits (`server.RequestHandlerClass.hits`):
+- `--callers` concurrent identical validations make one webhook call and all get its result;
+- cancelling all but one caller leaves the call running for the last one, and cancelling every
+  caller cancels it (the next call goes upstream again);
+- a failing webhook call raises the same error in every caller.
+Each scenario uses its own sentence, so the validation cache does not answer. Exits non-zero if
+any check fails.
+
+Usage:
+    python -m benchmarks.check_single_flight --callers 20 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from benchmarks.stand_ins import configure_env, start_fake_n8n, start_fake_supabase
+
+WORD = "ephemeral"
+
+
+async def identical_calls(n8n_service, hits, callers: int) -> list:
+    start = hits()
+    results = await asyncio.gather(*(
+        n8n_service.validate_sentence(WORD, "An ephemeral joy.") for _ in range(callers)
+    ))
+    failures = []
+    if hits() - start != 1:
+        failures.append(f"{callers} identical calls made {hits() - start} webhook calls")
+    if any(result != results[0] for result in results):
+        failures.append("identical calls got different results")
+    return failures
+
+
+async def cancelled_waiters(n8n_service, hits, callers: int, latency: float) -> list:
+    failures = []
+    start = hits()
+    tasks = [asyncio.ensure_future(n8n_service.validate_sentence(WORD, "An ephemeral fad.")) for _ in range(callers)]
+    await asyncio.sleep(latency / 4)
+    for task in tasks[1:]:
+        task.cancel()
+    result = await tasks[0]
+    if not isinstance(result, dict) or result.get("score") is None:
+        failures.append("the remaining caller got no result after the others were cancelled")
+    if hits() - start != 1:
+        failures.append(f"cancelling all but one caller made {hits() - start} webhook calls")
+
+    tasks = [asyncio.ensure_future(n8n_service.validate_sentence(WORD, "An ephemeral trend.")) for _ in range(callers)]
+    await asyncio.sleep(latency / 4)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if n8n_service._in_flight:
+        failures.append("a call nobody waits for is still in flight")
+    start = hits()
+    await n8n_service.validate_sentence(WORD, "An ephemeral trend.")
+    if hits() - start != 1:
+        failures.append("the call after cancelling every caller did not go upstream")
+    return failures
+
+
+async def failing_call(n8n_service, failing_server, callers: int) -> list:
+    n8n_service.N8N_WEBHOOK_URL = f"http://127.0.0.1:{failing_server.server_port}/webhook"
+    handler = failing_server.RequestHandlerClass
+    start = handler.hits
+    results = await asyncio.gather(*(
+        n8n_service.validate_sentence(WORD, "An ephemeral error.") for _ in range(callers)
+    ), return_exceptions=True)
+    failures = []
+    if handler.hits - start != 1:
+        failures.append(f"{callers} identical failing calls made {handler.hits - start} webhook calls")
+    if not all(isinstance(result, type(results[0])) and isinstance(result, Exception) for result in results):
+        failures.append("the webhook error did not reach every caller")
+    return failures
+
+
+async def run(callers: int, latency: float, n8n_server, failing_server) -> dict:
+    from app.services import n8n_service, admission
+
+    await admission.startup()
+    await n8n_service.startup()
+    hits = lambda: n8n_server.RequestHandlerClass.hits  # noqa: E731
+    try:
+        checks = {
+            "identical_calls": await identical_calls(n8n_service, hits, callers),
+            "cancelled_waiters": await cancelled_waiters(n8n_service, hits, callers, latency),
+            "failing_call": await failing_call(n8n_service, failing_server, callers),
+        }
+    finally:
+        await n8n_service.shutdown()
+        await admission.shutdown()
+    return {"callers": callers, "coalesced": n8n_service.pool_stats.coalesced, "failures": checks}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    n8n_server = start_fake_n8n(latency=args.latency)
+    failing_server = start_fake_n8n(latency=args.latency, error_rate=1.0)
+    configure_env(start_fake_supabase(), n8n_server)
+    # Errors must reach the callers as they are: no retries, fallback scorer or circuit breaker
+    os.environ.update({
+        "N8N_MAX_RETRIES": "0", "N8N_FALLBACK_ENABLED": "0", "CIRCUIT_ENABLED": "0", "VALIDATION_CACHE_DB": "",
+    })
+
+    result = asyncio.run(run(args.callers, args.latency, n8n_server, failing_server))
+    print(json.dumps(result, indent=2))
+    return 1 if any(result["failures"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+End-to-end load test of the API against local stand-ins.
+
+Virtual users run the dashboard flow in a loop: sign in once, then fetch a word, validate a
+sentence, poll the summary and check today's log (every `--gen-every` rounds they ask for a
+new word instead). Requests go through the real ASGI app in-process; PostgREST is replaced by
+`benchmarks.memory_repository` (`--db-latency` per call), auth and n8n are the HTTP stand-ins.
+
+Reports p50/p95/p99 latency and requests/sec per endpoint for each concurrency level and writes
+them as JSON. `--compare` checks the run against an earlier results file and exits non-zero when
+an endpoint's p95 regressed by more than `--tolerance`.
+
+Usage:
+    python -m benchmarks.load_test --levels 1 8 32 --duration 10 --output results.json
+    python -m benchmarks.load_test --compare baseline.json --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+
+from benchmarks.stand_ins import configure_env, start_fake_supabase, start_fake_n8n
+
+
+def percentile(samples, q: float) -> float:
+    """Nearest-rank percentile of a sorted list."""
+    if not samples:
+        return 0.0
+    rank = max(1, -(-len(samples) * q // 100))
+    return samples[int(rank) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}  # endpoint -> [seconds]
+        self.errors = {}     # endpoint -> count
+
+    def record(self, endpoint: str, elapsed: float, ok: bool):
+        self.latencies.setdefault(endpoint, []).append(elapsed)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, wall: float) -> dict:
+        result = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            samples.sort()
+            result[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "rps": round(len(samples) / wall, 1),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            }
+        return result
+
+
+async def request(client, recorder: Recorder, endpoint: str, method: str, url: str, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    recorder.record(endpoint, time.perf_counter() - start, response.status_code < 400)
+    return response
+
+
+async def virtual_user(client, recorder: Recorder, deadline: float, gen_every: int):
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    response = await request(client, recorder, "POST /auth/signin-up", "POST", "/auth/signin-up",
+                             json={"email": email, "password": "load-test"})
+    if response.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    round_number = 0
+    while time.perf_counter() < deadline:
+        round_number += 1
+        state = "gen" if gen_every and round_number % gen_every == 0 else "fetch"
+        response = await request(client, recorder, f"GET /api/word?state={state}", "GET", f"/api/word?state={state}",
+                                 headers=headers)
+        if response.status_code != 200:
+            continue
+        word = response.json()["word"]
+        await request(client, recorder, "POST /api/validate-sentence", "POST", "/api/validate-sentence",
+                      headers=headers,
+                      json={"word": word, "user_sentence": f"I used {word} in sentence {round_number} today."})
+        await request(client, recorder, "GET /api/summary", "GET", "/api/summary", headers=headers)
+        await request(client, recorder, "GET /api/today-log", "GET", "/api/today-log", headers=headers)
+
+
+async def run_level(app, users: int, duration: float, gen_every: int) -> dict:
+    import httpx
+
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(virtual_user(client, recorder, deadline, gen_every) for _ in range(users)))
+        wall = time.perf_counter() - start
+    endpoints = recorder.summary(wall)
+    total = sum(e["requests"] for e in endpoints.values())
+    return {"users": users, "wall_seconds": round(wall, 2), "total_rps": round(total / wall, 1), "endpoints": endpoints}
+
+
+async def run(args) -> list:
+    from app.main import app
+
+    results = []
+    async with app.router.lifespan_context(app):
+        for users in args.levels:
+            results.append(await run_level(app, users, args.duration, args.gen_every))
+            print(f"users={users}: {results[-1]['total_rps']} req/s", file=sys.stderr)
+    return results
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """p95 regressions beyond `tolerance` (a fraction) for endpoints present in both runs."""
+    previous = {level["users"]: level["endpoints"] for level in baseline["levels"]}
+    regressions = []
+    for level in current["levels"]:
+        for endpoint, stats in level["endpoints"].items():
+            before = previous.get(level["users"], {}).get(endpoint)
+            if before and before["p95_ms"] > 0 and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append({
+                    "users": level["users"],
+                    "endpoint": endpoint,
+                    "baseline_p95_ms": before["p95_ms"],
+                    "p95_ms": stats["p95_ms"],
+                })
+    return regressions
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per concurrency level")
+    parser.add_argument("--gen-every", type=int, default=5, help="ask for a new word every N rounds (0 = never)")
+    parser.add_argument("--db-latency", type=float, default=0.01, help="seconds per simulated PostgREST call")
+    parser.add_argument("--auth-latency", type=float, default=0.02)
+    parser.add_argument("--n8n-latency", type=float, default=0.3)
+    parser.add_argument("--n8n-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--compare", help="earlier results file to check for p95 regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    supabase_server = start_fake_supabase(latency=args.auth_latency)
+    n8n_server = start_fake_n8n(latency=args.n8n_latency, error_rate=args.n8n_error_rate)
+    configure_env(supabase_server, n8n_server)
+
+    from benchmarks import memory_repository
+    memory_repository.install(latency=args.db_latency)
+
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "levels": asyncio.run(run(args)),
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        print(json.dumps({"regressions": regressions}, indent=2))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
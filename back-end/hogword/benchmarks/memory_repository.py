@@ -0,0 +1,306 @@
+"""
+In-memory implementation of `app.db.repository` for load tests.
+
+`install(latency)` swaps every repository function for a dict-backed one that sleeps `latency`
+seconds per call (one simulated PostgREST round trip) and is timed by `metrics.track`, so
+call counts and the Server-Timing breakdown look like they do against Supabase.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+_logs = {}        # log_id -> log
+_user_logs = {}   # user_id -> [log, ...] in insertion (created_at) order
+_state = {}       # user_id -> current_log_id
+_rollups = {}     # user_id -> {"compacted_before", "days": {day: {...}}, "words": {(word, difficulty): {...}}, "attempts": {(attempt, difficulty): {...}}}
+_leases = {}      # name -> (holder, expires_at monotonic)
+_latency = 0.0
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _select(log: dict, columns: str) -> dict:
+    if columns.strip() == "*":
+        return dict(log)
+    return {name.strip(): log.get(name.strip()) for name in columns.split(",")}
+
+
+async def _round_trip():
+    from app.services import metrics
+
+    with metrics.track("supabase"):
+        await asyncio.sleep(_latency)
+
+
+def _insert(log: dict) -> dict:
+    now = _now()
+    row = {
+        "id": str(uuid.uuid4()), "created_at": now, "updated_at": now, "sentence": None, "score": None,
+        "level": None, "suggestion": None, "corrected_sentence": None, "provisional": False, **log,
+    }
+    if row["updated_at"] == "now()":
+        row["updated_at"] = now
+    _logs[row["id"]] = row
+    _user_logs.setdefault(row["user_id"], []).append(row)
+    return dict(row)
+
+
+def _update(log_id: str, payload: dict) -> Optional[dict]:
+    row = _logs.get(log_id)
+    if row is None:
+        return None
+    row.update(payload)
+    row["updated_at"] = _now()
+    return dict(row)
+
+
+def _filtered(user_id: str, status=None, since=None, until=None) -> List[dict]:
+    return [
+        log for log in _user_logs.get(user_id, [])
+        if (not status or log["status"] == status)
+        and (not since or log["created_at"] >= since)
+        and (not until or log["created_at"] < until)
+    ]
+
+
+async def get_current_log_id(user_id: str) -> Optional[str]:
+    await _round_trip()
+    return _state.get(user_id)
+
+
+async def set_current_log(user_id: str, log_id: str):
+    await _round_trip()
+    _state[user_id] = log_id
+
+
+async def set_current_logs(states: List[dict]):
+    await _round_trip()
+    for state in states:
+        _state[state["user_id"]] = state["current_log_id"]
+
+
+async def get_log(log_id: str) -> Optional[dict]:
+    await _round_trip()
+    log = _logs.get(log_id)
+    return dict(log) if log else None
+
+
+async def insert_log(log: dict) -> dict:
+    await _round_trip()
+    return _insert(log)
+
+
+async def insert_logs(logs: List[dict]) -> List[dict]:
+    if not logs:
+        return []
+    await _round_trip()
+    return [_insert(log) for log in logs]
+
+
+async def upsert_logs(logs: List[dict]):
+    await _round_trip()
+    for log in logs:
+        if log["id"] in _logs:
+            _logs[log["id"]].update(log)
+        else:
+            row = dict(log)
+            _logs[row["id"]] = row
+            _user_logs.setdefault(row["user_id"], []).append(row)
+
+
+async def update_log(log_id: str, payload: dict):
+    await _round_trip()
+    _update(log_id, payload)
+
+
+async def list_provisional_logs(limit: int) -> List[dict]:
+    await _round_trip()
+    logs = sorted((log for log in _logs.values() if log["provisional"]), key=lambda l: l["created_at"])
+    return [_select(log, "id,user_id,word,sentence") for log in logs[:limit]]
+
+
+async def regrade_log(log_id: str, payload: dict) -> bool:
+    await _round_trip()
+    row = _logs.get(log_id)
+    if row is None or not row["provisional"]:
+        return False
+    _update(log_id, payload)
+    return True
+
+
+async def list_logs(user_id: str, columns: str = "*", status=None, since=None, desc: bool = False) -> List[dict]:
+    await _round_trip()
+    logs = _filtered(user_id, status, since)
+    return [_select(log, columns) for log in (reversed(logs) if desc else logs)]
+
+
+async def list_logs_for_users(user_ids: List[str], columns: str = "*") -> List[dict]:
+    await _round_trip()
+    logs = sorted((log for user_id in user_ids for log in _user_logs.get(user_id, [])), key=lambda l: l["created_at"])
+    return [_select(log, columns) for log in logs]
+
+
+async def list_logs_page(user_id, columns, status=None, since=None, before=None, limit=None, until=None, desc=True):
+    await _round_trip()
+
+    def key(log):
+        return log["created_at"], log["id"]
+
+    logs = sorted(_filtered(user_id, status, since, until), key=key, reverse=desc)
+    if before:
+        logs = [log for log in logs if (key(log) < tuple(before) if desc else key(log) > tuple(before))]
+    return [_select(log, columns) for log in (logs[:limit] if limit else logs)]
+
+
+async def latest_log_update(user_id: str, status=None, since=None) -> tuple:
+    await _round_trip()
+    logs = _filtered(user_id, status, since)
+    return len(logs), max((log["updated_at"] for log in logs), default=None)
+
+
+async def fetch_word_session(user_id: str) -> Optional[dict]:
+    await _round_trip()
+    log = _logs.get(_state.get(user_id))
+    return dict(log) if log else None
+
+
+async def generate_word_session(user_id: str, word: str, difficulty: str) -> dict:
+    await _round_trip()
+    current = _logs.get(_state.get(user_id))
+    resigned = _update(current["id"], {"status": "resigned"}) if current and current["status"] == "active" else None
+    new_log = _insert({"user_id": user_id, "word": word, "difficulty": difficulty, "status": "active"})
+    _state[user_id] = new_log["id"]
+    return {"log": new_log, "resigned": resigned}
+
+
+async def complete_word_session(user_id: str, log_id: str, result: dict) -> Optional[dict]:
+    await _round_trip()
+    log = _logs.get(log_id)
+    if log is None or log["user_id"] != user_id:
+        return None
+    current = _state.get(user_id) == log_id
+    if log["status"] == "active":
+        return {"log": _update(log_id, {**result, "status": "completed"}), "retry": False, "current": current}
+    completed = _insert({
+        "user_id": user_id, "word": log["word"], "difficulty": log["difficulty"], **result, "status": "completed",
+    })
+    if current:
+        _state[user_id] = completed["id"]
+    return {"log": completed, "retry": True, "current": current}
+
+
+def _cutoff(user_id: str, before: str) -> str:
+    logs = _user_logs.get(user_id, [])
+    current = _logs.get(_state.get(user_id))
+    pinned = [log["created_at"] for log in logs if log["status"] == "active" or log["provisional"]]
+    if current is not None:
+        pinned.append(current["created_at"])
+    return min([before, *pinned])
+
+
+async def compaction_candidates(before: str, limit: int) -> List[str]:
+    await _round_trip()
+    return [
+        user_id for user_id, logs in _user_logs.items()
+        if any(log["created_at"] < _cutoff(user_id, before) for log in logs)
+    ][:limit]
+
+
+async def compaction_cutoff(user_id: str, before: str) -> Optional[str]:
+    await _round_trip()
+    return _cutoff(user_id, before)
+
+
+async def compact_logs(user_id: str, before: str) -> dict:
+    await _round_trip()
+    cutoff = _cutoff(user_id, before)
+    logs = _user_logs.get(user_id, [])
+    moved = sorted((log for log in logs if log["created_at"] < cutoff), key=lambda l: (l["created_at"], l["id"]))
+    if moved:
+        _user_logs[user_id] = [log for log in logs if log["created_at"] >= cutoff]
+        rollup = _rollups.setdefault(user_id, {"compacted_before": cutoff, "days": {}, "words": {}, "attempts": {}})
+        rollup["compacted_before"] = max(rollup["compacted_before"], cutoff)
+        # Attempt numbers continue from the attempts compacted earlier
+        attempts = {}
+        for (word, _), totals in rollup["words"].items():
+            attempts[word] = attempts.get(word, 0) + totals["completed"]
+        for log in moved:
+            del _logs[log["id"]]
+            day_key = log["created_at"][:10]
+            day = rollup["days"].setdefault(day_key, {"completed": 0, "resigned": 0, "score_sum": 0})
+            word = rollup["words"].setdefault(
+                (log["word"], log["difficulty"]),
+                {"completed": 0, "resigned": 0, "score_sum": 0, "first_day": day_key, "last_day": day_key},
+            )
+            word["last_day"] = day_key
+            if log["status"] == "completed" and log["score"] is not None:
+                attempts[log["word"]] = attempts.get(log["word"], 0) + 1
+                point = rollup["attempts"].setdefault(
+                    (attempts[log["word"]], log["difficulty"]), {"samples": 0, "score_sum": 0}
+                )
+                for totals in (day, word):
+                    totals["completed"] += 1
+                    totals["score_sum"] += log["score"]
+                point["samples"] += 1
+                point["score_sum"] += log["score"]
+            elif log["status"] == "resigned":
+                day["resigned"] += 1
+                word["resigned"] += 1
+    return {"compacted": len(moved), "compacted_before": cutoff}
+
+
+async def fetch_log_rollups(user_ids: List[str]) -> dict:
+    await _round_trip()
+    return {
+        user_id: {
+            "compacted_before": _rollups[user_id]["compacted_before"],
+            "words": [
+                {"word": word, "difficulty": difficulty, "completed": totals["completed"], "score_sum": totals["score_sum"]}
+                for (word, difficulty), totals in sorted(
+                    _rollups[user_id]["words"].items(), key=lambda item: (item[1]["first_day"], item[0])
+                )
+            ],
+            "attempts": [
+                {"attempt": attempt, "difficulty": difficulty, **totals}
+                for (attempt, difficulty), totals in sorted(_rollups[user_id]["attempts"].items())
+            ],
+        }
+        for user_id in user_ids if user_id in _rollups
+    }
+
+
+async def acquire_lease(name: str, holder: str, seconds: float) -> bool:
+    await _round_trip()
+    current = _leases.get(name)
+    now = asyncio.get_running_loop().time()
+    if current is not None and current[0] != holder and current[1] >= now:
+        return False
+    _leases[name] = (holder, now + seconds)
+    return True
+
+
+async def release_lease(name: str, holder: str):
+    await _round_trip()
+    if _leases.get(name, (None,))[0] == holder:
+        del _leases[name]
+
+
+def install(latency: float = 0.0):
+    """Replace the functions of `app.db.repository` with the in-memory ones."""
+    global _latency
+    from app.db import repository
+
+    _latency = latency
+    for name in (
+        "get_current_log_id", "set_current_log", "set_current_logs", "get_log", "insert_log", "insert_logs",
+        "upsert_logs", "update_log",
+        "list_provisional_logs", "regrade_log",
+        "list_logs", "list_logs_for_users", "list_logs_page", "latest_log_update",
+        "fetch_word_session", "generate_word_session", "complete_word_session",
+        "compaction_candidates", "compaction_cutoff", "compact_logs", "fetch_log_rollups",
+        "acquire_lease", "release_lease",
+    ):
+        setattr(repository, name, globals()[name])
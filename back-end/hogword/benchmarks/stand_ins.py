@@ -0,0 +1,199 @@
+"""
+Local stand-ins for the Supabase auth server, PostgREST and the n8n validation webhook,
+so benchmarks can run the real client code paths without live services.
+"""
+import os
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+
+JWT_SECRET = "bench-secret-bench-secret-bench-secret"
+
+
+def make_token(user_id: str, ttl: int = 3600) -> str:
+    return jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "role": "authenticated", "exp": int(time.time()) + ttl},
+        JWT_SECRET,
+        algorithm="HS256",
+    )
+
+
+class FakeSupabaseHandler(BaseHTTPRequestHandler):
+    """
+    PostgREST answers with empty results (procedures with `null`); the auth endpoints keep accounts
+    (email -> password) and single-use refresh tokens in memory and count calls in `auth_calls`.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+    users = {}
+    refresh_tokens = {}
+    auth_calls = 0
+
+    def _send_json(self, payload, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        self._read_json()
+        if self.path.startswith("/auth/v1/user"):
+            token = self.headers.get("Authorization", "").split(" ")[-1]
+            claims = jwt.decode(token, options={"verify_signature": False})
+            self._send_json({
+                "id": claims["sub"],
+                "aud": "authenticated",
+                "role": "authenticated",
+                "app_metadata": {},
+                "user_metadata": {},
+                "created_at": "2024-01-01T00:00:00+00:00",
+            })
+        else:
+            self._send_json([])
+
+    def _send_session(self, email: str, status: int = 200):
+        user_id = str(uuid.uuid5(uuid.NAMESPACE_URL, email))
+        refresh_token = uuid.uuid4().hex
+        self.refresh_tokens[refresh_token] = email
+        self._send_json({
+            "access_token": make_token(user_id),
+            "token_type": "bearer",
+            "expires_in": 3600,
+            "expires_at": int(time.time()) + 3600,
+            "refresh_token": refresh_token,
+            "user": {
+                "id": user_id,
+                "aud": "authenticated",
+                "role": "authenticated",
+                "email": email,
+                "app_metadata": {},
+                "user_metadata": {},
+                "created_at": "2024-01-01T00:00:00+00:00",
+            },
+        }, status=status)
+
+    def _send_error(self, status: int, code: str, message: str):
+        self._send_json({"code": status, "error_code": code, "msg": message}, status=status)
+
+    def do_POST(self):
+        time.sleep(self.latency)
+        body = self._read_json()
+        if self.path.startswith("/auth/v1/"):
+            type(self).auth_calls += 1
+        if self.path.startswith("/auth/v1/token") and "grant_type=refresh_token" in self.path:
+            email = self.refresh_tokens.pop(body["refresh_token"], None)
+            if email is None:
+                self._send_error(400, "refresh_token_not_found", "Invalid Refresh Token: Refresh Token Not Found")
+            else:
+                self._send_session(email)
+            return
+        if self.path.startswith("/auth/v1/token"):
+            if self.users.get(body["email"]) != body["password"]:
+                self._send_error(400, "invalid_credentials", "Invalid login credentials")
+            else:
+                self._send_session(body["email"])
+            return
+        if self.path.startswith("/auth/v1/signup"):
+            if body["email"] in self.users:
+                self._send_error(422, "user_already_exists", "User already registered")
+            else:
+                self.users[body["email"]] = body["password"]
+                self._send_session(body["email"])
+            return
+        if self.path.startswith("/rest/v1/rpc/"):
+            # Procedures answer as if the user had no state yet
+            self._send_json(None)
+            return
+        rows = body if isinstance(body, list) else [body]
+        self._send_json([{"id": str(uuid.uuid4()), **row} for row in rows], status=201)
+
+    def do_PATCH(self):
+        time.sleep(self.latency)
+        self._read_json()
+        self._send_json([])
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeN8NHandler(BaseHTTPRequestHandler):
+    """Grades any sentence that contains the word; fails `error_rate` of requests with a 503."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+    error_rate = 0.0
+    hits = 0
+
+    def do_POST(self):
+        type(self).hits += 1
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length))
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            body = b"{}"
+            self.send_response(503)
+        else:
+            used = payload["word"].lower() in payload["user"].lower()
+            body = json.dumps({
+                "score": 8 if used else 3,
+                "level": "B1",
+                "suggestion": None if used else f"Use the word '{payload['word']}' in your sentence.",
+                "corrected_sentence": payload["user"],
+            }).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client cancelled the call
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(handler) -> ThreadingHTTPServer:
+    server_class = type("Server", (ThreadingHTTPServer,), {"request_queue_size": 1024})
+    server = server_class(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_fake_supabase(latency: float = 0.0) -> ThreadingHTTPServer:
+    """Start the stand-in on a free port; `latency` seconds are added to every request."""
+    return _serve(type("Handler", (FakeSupabaseHandler,), {"latency": latency, "users": {}, "refresh_tokens": {}}))
+
+
+def start_fake_n8n(latency: float = 0.0, error_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Start the webhook stand-in; the handler class counts hits in `server.RequestHandlerClass.hits`."""
+    return _serve(type("Handler", (FakeN8NHandler,), {"latency": latency, "error_rate": error_rate}))
+
+
+def configure_env(server: ThreadingHTTPServer, n8n_server: ThreadingHTTPServer = None):
+    """Point the app's env vars at the stand-ins. Call before importing `app`."""
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SUPABASE_KEY"] = jwt.encode({"role": "service_role"}, JWT_SECRET, algorithm="HS256")
+    os.environ["SUPABASE_JWT_SECRET"] = JWT_SECRET
+    # Virtual users validate far faster than a person; keep the per-user rate limit out of the
+    # measurements (the global concurrency limit and load shedding stay on)
+    os.environ.setdefault("ADMISSION_USER_RATE", "1000")
+    os.environ.setdefault("ADMISSION_USER_BURST", "1000")
+    if n8n_server is not None:
+        os.environ["N8N_WEBHOOK_URL"] = f"http://127.0.0.1:{n8n_server.server_port}/webhook"
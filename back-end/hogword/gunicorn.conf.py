@@ -0,0 +1,60 @@
+"""
+Multi-worker production server: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+- `WEB_CONCURRENCY` workers, by default one per CPU this process may run on (each worker is a
+  single-threaded event loop, so more workers than cores only adds contention) with
+  `CACHE_BACKEND=redis`, and one otherwise.
+- `GUNICORN_PRELOAD=1` imports the app and parses the vocabulary once in the master before forking,
+  so workers share those pages copy-on-write and start faster. The Supabase, httpx and Redis
+  clients and the SQLite validation cache are still created per worker by the FastAPI lifespan, so
+  no client or open connection crosses the fork.
+- The caches, async validation jobs and rate limits are only shared between workers with
+  `CACHE_BACKEND=redis`, so more than one worker without it refuses to start. Set
+  `GUNICORN_ALLOW_MEMORY_BACKEND=1` to run them anyway (e.g. for benchmarks): then a user's requests
+  may see another worker's stale cache entries, and a job polled on another worker is not found.
+  The write-behind buffer and circuit breaker stay per worker either way; see `.env.example`.
+"""
+import gc
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+shared_backend = os.environ.get("CACHE_BACKEND", "memory").lower() == "redis"
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '80')}"
+workers = int(os.environ.get("WEB_CONCURRENCY") or (_cpu_count() if shared_backend else 1))
+if workers > 1 and not shared_backend and os.environ.get("GUNICORN_ALLOW_MEMORY_BACKEND") != "1":
+    raise RuntimeError(
+        f"WEB_CONCURRENCY={workers} needs CACHE_BACKEND=redis so workers share their caches and jobs "
+        "(or GUNICORN_ALLOW_MEMORY_BACKEND=1 to run per-worker caches anyway)."
+    )
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+# Seconds a worker may be unresponsive before it is restarted, and may take to drain on shutdown
+# (the lifespan flushes the write-behind buffer and finishes queued validations)
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+
+def on_starting(server):
+    if preload_app:
+        from app.services import vocabulary
+
+        vocabulary.current()
+        # Objects that exist now move to a generation the collector never scans, so collections in
+        # the workers do not write to (and un-share) their pages
+        gc.freeze()
@@ -0,0 +1,6 @@
+-- Provisional grades from the local fallback scorer (n8n circuit breaker), for databases created
+-- from a schema.sql older than the column. Safe to run more than once.
+ALTER TABLE public.practice_logs ADD COLUMN IF NOT EXISTS provisional BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Re-grading queue: only the few provisionally graded rows are indexed
+CREATE INDEX IF NOT EXISTS idx_practice_logs_provisional ON public.practice_logs(created_at) WHERE provisional;
@@ -0,0 +1,197 @@
+-- Compaction of old practice_logs (app/services/compaction.py) and the composite indexes of the log
+-- reads, for databases created from a schema.sql older than them, with the compaction functions
+-- (the same as in schema.sql). Safe to run more than once. Afterwards set COMPACTION_ENABLED=1.
+
+ALTER TABLE public.user_state ADD COLUMN IF NOT EXISTS compacted_before TIMESTAMPTZ;
+
+CREATE TABLE IF NOT EXISTS public.practice_log_daily_rollups (
+    user_id UUID REFERENCES auth.users(id) NOT NULL,
+    day DATE NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    resigned INTEGER NOT NULL DEFAULT 0,
+    score_sum NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS public.practice_log_word_rollups (
+    user_id UUID REFERENCES auth.users(id) NOT NULL,
+    word TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    resigned INTEGER NOT NULL DEFAULT 0,
+    score_sum NUMERIC NOT NULL DEFAULT 0,
+    first_day DATE NOT NULL,
+    last_day DATE NOT NULL,
+    PRIMARY KEY (user_id, word, difficulty)
+);
+
+CREATE TABLE IF NOT EXISTS public.practice_log_attempt_rollups (
+    user_id UUID REFERENCES auth.users(id) NOT NULL,
+    attempt INTEGER NOT NULL,
+    difficulty TEXT NOT NULL,
+    samples INTEGER NOT NULL DEFAULT 0,
+    score_sum NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, attempt, difficulty)
+);
+
+ALTER TABLE public.practice_log_daily_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.practice_log_word_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.practice_log_attempt_rollups ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own daily rollups" ON public.practice_log_daily_rollups;
+CREATE POLICY "Users can view their own daily rollups" ON public.practice_log_daily_rollups
+    FOR SELECT USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can view their own word rollups" ON public.practice_log_word_rollups;
+CREATE POLICY "Users can view their own word rollups" ON public.practice_log_word_rollups
+    FOR SELECT USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can view their own attempt rollups" ON public.practice_log_attempt_rollups;
+CREATE POLICY "Users can view their own attempt rollups" ON public.practice_log_attempt_rollups
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- Composite indexes replace the single-column ones. On a large practice_logs, create them with
+-- CREATE INDEX CONCURRENTLY outside a transaction first; these statements then do nothing.
+CREATE INDEX IF NOT EXISTS idx_practice_logs_user_created ON public.practice_logs(user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_practice_logs_user_status_created ON public.practice_logs(user_id, status, created_at, id);
+DROP INDEX IF EXISTS public.idx_practice_logs_user_id;
+DROP INDEX IF EXISTS public.idx_practice_logs_created_at;
+
+-- The latest safe cutoff at or before p_before: active logs, provisional logs (still to be re-graded)
+-- and the log user_state points at are never compacted, and neither is anything after them.
+CREATE OR REPLACE FUNCTION public.compaction_cutoff(p_user_id UUID, p_before TIMESTAMPTZ)
+RETURNS TIMESTAMPTZ
+LANGUAGE sql STABLE
+AS $$
+    SELECT LEAST(
+        p_before,
+        (SELECT MIN(created_at) FROM public.practice_logs WHERE user_id = p_user_id AND status = 'active'),
+        (SELECT MIN(created_at) FROM public.practice_logs WHERE provisional AND user_id = p_user_id),
+        (SELECT l.created_at FROM public.user_state s
+         JOIN public.practice_logs l ON l.id = s.current_log_id
+         WHERE s.user_id = p_user_id)
+    );
+$$;
+
+-- Up to p_limit users with logs before their cutoff.
+CREATE OR REPLACE FUNCTION public.compaction_candidates(p_before TIMESTAMPTZ, p_limit INTEGER)
+RETURNS TABLE (user_id UUID)
+LANGUAGE sql STABLE
+AS $$
+    SELECT s.user_id
+    FROM public.user_state s
+    WHERE EXISTS (
+        SELECT 1 FROM public.practice_logs l
+        WHERE l.user_id = s.user_id AND l.created_at < public.compaction_cutoff(s.user_id, p_before)
+    )
+    LIMIT p_limit;
+$$;
+
+-- Fold the user's logs before their cutoff into the rollups and delete them, in one transaction.
+-- Runs under the lock on the user's user_state row, like the word session procedures.
+-- Returns {"compacted": <number of logs>, "compacted_before": <cutoff>}.
+CREATE OR REPLACE FUNCTION public.compact_practice_logs(p_user_id UUID, p_before TIMESTAMPTZ)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cutoff TIMESTAMPTZ;
+    v_count INTEGER;
+BEGIN
+    INSERT INTO public.user_state (user_id) VALUES (p_user_id) ON CONFLICT (user_id) DO NOTHING;
+    PERFORM 1 FROM public.user_state WHERE user_id = p_user_id FOR UPDATE;
+    v_cutoff := public.compaction_cutoff(p_user_id, p_before);
+
+    WITH moved AS (
+        DELETE FROM public.practice_logs
+        WHERE user_id = p_user_id AND created_at < v_cutoff
+        RETURNING *, (created_at AT TIME ZONE 'UTC')::DATE AS day,
+            (status = 'completed' AND score IS NOT NULL) AS graded
+    ), days AS (
+        INSERT INTO public.practice_log_daily_rollups AS r (user_id, day, completed, resigned, score_sum)
+        SELECT p_user_id, day,
+            COUNT(*) FILTER (WHERE graded),
+            COUNT(*) FILTER (WHERE status = 'resigned'),
+            COALESCE(SUM(score) FILTER (WHERE graded), 0)
+        FROM moved
+        GROUP BY day
+        ON CONFLICT (user_id, day) DO UPDATE
+        SET completed = r.completed + EXCLUDED.completed,
+            resigned = r.resigned + EXCLUDED.resigned,
+            score_sum = r.score_sum + EXCLUDED.score_sum
+    ), words AS (
+        INSERT INTO public.practice_log_word_rollups AS r (
+            user_id, word, difficulty, completed, resigned, score_sum, first_day, last_day
+        )
+        SELECT p_user_id, word, difficulty,
+            COUNT(*) FILTER (WHERE graded),
+            COUNT(*) FILTER (WHERE status = 'resigned'),
+            COALESCE(SUM(score) FILTER (WHERE graded), 0),
+            MIN(day), MAX(day)
+        FROM moved
+        GROUP BY word, difficulty
+        ON CONFLICT (user_id, word, difficulty) DO UPDATE
+        SET completed = r.completed + EXCLUDED.completed,
+            resigned = r.resigned + EXCLUDED.resigned,
+            score_sum = r.score_sum + EXCLUDED.score_sum,
+            first_day = LEAST(r.first_day, EXCLUDED.first_day),
+            last_day = GREATEST(r.last_day, EXCLUDED.last_day)
+    ), attempts AS (
+        -- Every statement in this WITH sees the word rollups as they were before it, i.e. the
+        -- attempts compacted by earlier runs, which all came before the moved logs
+        INSERT INTO public.practice_log_attempt_rollups AS r (user_id, attempt, difficulty, samples, score_sum)
+        SELECT p_user_id, attempt, difficulty, COUNT(*), SUM(score)
+        FROM (
+            SELECT m.difficulty, m.score,
+                COALESCE((
+                    SELECT SUM(w.completed) FROM public.practice_log_word_rollups w
+                    WHERE w.user_id = p_user_id AND w.word = m.word
+                ), 0) + ROW_NUMBER() OVER (PARTITION BY m.word ORDER BY m.created_at, m.id) AS attempt
+            FROM moved m
+            WHERE m.graded
+        ) numbered
+        GROUP BY attempt, difficulty
+        ON CONFLICT (user_id, attempt, difficulty) DO UPDATE
+        SET samples = r.samples + EXCLUDED.samples,
+            score_sum = r.score_sum + EXCLUDED.score_sum
+    )
+    SELECT COUNT(*) INTO v_count FROM moved;
+
+    IF v_count > 0 THEN
+        UPDATE public.user_state
+        SET compacted_before = GREATEST(COALESCE(compacted_before, v_cutoff), v_cutoff)
+        WHERE user_id = p_user_id;
+    END IF;
+
+    RETURN jsonb_build_object('compacted', v_count, 'compacted_before', v_cutoff);
+END;
+$$;
+
+-- Compacted history of several users:
+-- {user_id: {"compacted_before", "words": [{"word", "difficulty", "completed", "score_sum"}],
+--            "attempts": [{"attempt", "difficulty", "samples", "score_sum"}]}}.
+-- Users with nothing compacted are left out.
+CREATE OR REPLACE FUNCTION public.fetch_log_rollups(p_user_ids UUID[])
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+    SELECT COALESCE(jsonb_object_agg(s.user_id, jsonb_build_object(
+        'compacted_before', s.compacted_before,
+        'words', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'word', w.word, 'difficulty', w.difficulty, 'completed', w.completed, 'score_sum', w.score_sum
+            ) ORDER BY w.first_day, w.word, w.difficulty)
+            FROM public.practice_log_word_rollups w
+            WHERE w.user_id = s.user_id
+        ), '[]'::JSONB),
+        'attempts', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'attempt', a.attempt, 'difficulty', a.difficulty, 'samples', a.samples, 'score_sum', a.score_sum
+            ) ORDER BY a.attempt, a.difficulty)
+            FROM public.practice_log_attempt_rollups a
+            WHERE a.user_id = s.user_id
+        ), '[]'::JSONB)
+    )), '{}'::JSONB)
+    FROM public.user_state s
+    WHERE s.user_id = ANY(p_user_ids) AND s.compacted_before IS NOT NULL;
+$$;
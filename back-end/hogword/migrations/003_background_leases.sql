@@ -0,0 +1,35 @@
+-- Leases of the background loops (app/services/leases.py) and their functions (the same as in
+-- schema.sql), for databases created from a schema.sql older than them. Safe to run more than once.
+
+CREATE TABLE IF NOT EXISTS public.background_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+ALTER TABLE public.background_leases ENABLE ROW LEVEL SECURITY;
+
+-- Take the lease, or extend it when p_holder already has it, for p_seconds. False while another
+-- holder's lease has not expired.
+CREATE OR REPLACE FUNCTION public.acquire_lease(p_name TEXT, p_holder TEXT, p_seconds DOUBLE PRECISION)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+    WITH acquired AS (
+        INSERT INTO public.background_leases AS l (name, holder, expires_at)
+        VALUES (p_name, p_holder, now() + make_interval(secs => p_seconds))
+        ON CONFLICT (name) DO UPDATE
+            SET holder = EXCLUDED.holder, expires_at = EXCLUDED.expires_at
+            WHERE l.holder = EXCLUDED.holder OR l.expires_at < now()
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM acquired);
+$$;
+
+-- Give the lease up (on shutdown), so another process takes over without waiting for it to expire.
+CREATE OR REPLACE FUNCTION public.release_lease(p_name TEXT, p_holder TEXT)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    DELETE FROM public.background_leases WHERE name = p_name AND holder = p_holder;
+$$;
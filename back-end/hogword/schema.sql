@@ -10,19 +10,24 @@ CREATE TABLE public.practice_logs (
     suggestion TEXT,
     corrected_sentence TEXT,
     status TEXT NOT NULL CHECK (status IN ('active', 'completed', 'resigned', 'skipped')),
+    provisional BOOLEAN NOT NULL DEFAULT FALSE, -- Graded by the local fallback scorer, waiting for n8n
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
--- Index for querying analytics faster
-CREATE INDEX idx_practice_logs_user_id ON public.practice_logs(user_id);
-CREATE INDEX idx_practice_logs_created_at ON public.practice_logs(created_at);
+-- Indexes matching the query shapes of app/db/repository.py: every read filters on user_id and
+-- orders or ranges on created_at (keyset pages add id); today's log and skip counts also filter on status
+CREATE INDEX idx_practice_logs_user_created ON public.practice_logs(user_id, created_at, id);
+CREATE INDEX idx_practice_logs_user_status_created ON public.practice_logs(user_id, status, created_at, id);
+-- Re-grading queue: only the few provisionally graded rows are indexed
+CREATE INDEX idx_practice_logs_provisional ON public.practice_logs(created_at) WHERE provisional;
 
 -- Create table specifically for tracking current state to avoid complex queries on logs
 -- This is an optimization for /api/word?state=fetch
 CREATE TABLE public.user_state (
     user_id UUID REFERENCES auth.users(id) PRIMARY KEY,
     current_log_id UUID REFERENCES public.practice_logs(id),
+    compacted_before TIMESTAMPTZ, -- Logs created before this were folded into the rollup tables below
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
@@ -50,3 +55,342 @@ CREATE POLICY "Users can insert their own state" ON public.user_state
 
 CREATE POLICY "Users can update their own state" ON public.user_state
     FOR UPDATE USING (auth.uid() = user_id);
+
+-- Word session transitions as single atomic calls (used when WORD_SESSION_MODE=rpc).
+-- Each function locks the caller's user_state row first, so concurrent requests for the
+-- same user (e.g. a double-clicked "new word") run one after the other instead of interleaving.
+
+-- The active log joined through user_state, or NULL.
+CREATE OR REPLACE FUNCTION public.fetch_word_session(p_user_id UUID)
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+    SELECT to_jsonb(l)
+    FROM public.user_state s
+    JOIN public.practice_logs l ON l.id = s.current_log_id
+    WHERE s.user_id = p_user_id;
+$$;
+
+-- Resign the current word if it is still active, insert a new active log and point user_state at it.
+-- Returns {"log": <new log>, "resigned": <resigned log or null>}.
+CREATE OR REPLACE FUNCTION public.generate_word_session(p_user_id UUID, p_word TEXT, p_difficulty TEXT)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_current_log_id UUID;
+    v_resigned public.practice_logs;
+    v_new public.practice_logs;
+BEGIN
+    INSERT INTO public.user_state (user_id) VALUES (p_user_id) ON CONFLICT (user_id) DO NOTHING;
+    SELECT current_log_id INTO v_current_log_id
+    FROM public.user_state WHERE user_id = p_user_id FOR UPDATE;
+
+    UPDATE public.practice_logs
+    SET status = 'resigned', updated_at = NOW()
+    WHERE id = v_current_log_id AND status = 'active'
+    RETURNING * INTO v_resigned;
+
+    INSERT INTO public.practice_logs (user_id, word, difficulty, status)
+    VALUES (p_user_id, p_word, p_difficulty, 'active')
+    RETURNING * INTO v_new;
+
+    UPDATE public.user_state SET current_log_id = v_new.id, updated_at = NOW() WHERE user_id = p_user_id;
+
+    RETURN jsonb_build_object(
+        'log', to_jsonb(v_new),
+        'resigned', CASE WHEN v_resigned.id IS NULL THEN NULL ELSE to_jsonb(v_resigned) END
+    );
+END;
+$$;
+
+-- Store a graded sentence against the log the caller validated (p_log_id).
+-- An active log is completed in place; a retry on a completed word inserts a new completed log
+-- and, if that word is still the current one, points user_state at it.
+-- p_result carries sentence, score, level, suggestion, corrected_sentence and provisional.
+-- Returns {"log": <completed log>, "retry": <bool>, "current": <whether that log is now the user's
+-- current log>}, or NULL if p_log_id is not the caller's log.
+CREATE OR REPLACE FUNCTION public.complete_word_session(p_user_id UUID, p_log_id UUID, p_result JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_current_log_id UUID;
+    v_log public.practice_logs;
+    v_completed public.practice_logs;
+BEGIN
+    INSERT INTO public.user_state (user_id) VALUES (p_user_id) ON CONFLICT (user_id) DO NOTHING;
+    SELECT current_log_id INTO v_current_log_id
+    FROM public.user_state WHERE user_id = p_user_id FOR UPDATE;
+
+    SELECT * INTO v_log FROM public.practice_logs WHERE id = p_log_id AND user_id = p_user_id;
+    IF v_log.id IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    IF v_log.status = 'active' THEN
+        UPDATE public.practice_logs
+        SET sentence = p_result->>'sentence',
+            score = (p_result->>'score')::NUMERIC,
+            level = p_result->>'level',
+            suggestion = p_result->>'suggestion',
+            corrected_sentence = p_result->>'corrected_sentence',
+            provisional = COALESCE((p_result->>'provisional')::BOOLEAN, FALSE),
+            status = 'completed',
+            updated_at = NOW()
+        WHERE id = p_log_id
+        RETURNING * INTO v_completed;
+        RETURN jsonb_build_object(
+            'log', to_jsonb(v_completed), 'retry', FALSE, 'current', v_current_log_id IS NOT DISTINCT FROM p_log_id
+        );
+    END IF;
+
+    INSERT INTO public.practice_logs (
+        user_id, word, difficulty, sentence, score, level, suggestion, corrected_sentence, provisional, status
+    )
+    VALUES (
+        p_user_id, v_log.word, v_log.difficulty,
+        p_result->>'sentence', (p_result->>'score')::NUMERIC, p_result->>'level',
+        p_result->>'suggestion', p_result->>'corrected_sentence',
+        COALESCE((p_result->>'provisional')::BOOLEAN, FALSE), 'completed'
+    )
+    RETURNING * INTO v_completed;
+
+    IF v_current_log_id = p_log_id THEN
+        UPDATE public.user_state SET current_log_id = v_completed.id, updated_at = NOW() WHERE user_id = p_user_id;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'log', to_jsonb(v_completed), 'retry', TRUE, 'current', v_current_log_id IS NOT DISTINCT FROM p_log_id
+    );
+END;
+$$;
+
+-- Compaction of old practice_logs (app/services/compaction.py).
+-- Logs created before a user's cutoff are deleted and folded into per-day, per-word and per-attempt
+-- rollups, and user_state.compacted_before moves up to the cutoff. The stats read the per-word and
+-- per-attempt totals for the compacted history and practice_logs for the rest, so the dashboard's
+-- averages and aggregated `score_count_data` stay the same while reading O(words + attempt numbers)
+-- rows instead of one per compacted log.
+
+-- One row per user and UTC day: activity counts of the compacted days.
+CREATE TABLE public.practice_log_daily_rollups (
+    user_id UUID REFERENCES auth.users(id) NOT NULL,
+    day DATE NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    resigned INTEGER NOT NULL DEFAULT 0,
+    score_sum NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+
+-- Per-word totals over the compacted history: attempt numbering continues from `completed`, and the
+-- per-difficulty averages are sums over these rows.
+CREATE TABLE public.practice_log_word_rollups (
+    user_id UUID REFERENCES auth.users(id) NOT NULL,
+    word TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    resigned INTEGER NOT NULL DEFAULT 0,
+    score_sum NUMERIC NOT NULL DEFAULT 0,
+    first_day DATE NOT NULL,
+    last_day DATE NOT NULL,
+    PRIMARY KEY (user_id, word, difficulty)
+);
+
+-- Per-(attempt number, difficulty) totals over the compacted history, the points of the aggregated
+-- `score_count_data`. `attempt` is the log's attempt number at that word, counted from the user's first log.
+CREATE TABLE public.practice_log_attempt_rollups (
+    user_id UUID REFERENCES auth.users(id) NOT NULL,
+    attempt INTEGER NOT NULL,
+    difficulty TEXT NOT NULL,
+    samples INTEGER NOT NULL DEFAULT 0,
+    score_sum NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, attempt, difficulty)
+);
+
+ALTER TABLE public.practice_log_daily_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.practice_log_word_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.practice_log_attempt_rollups ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own daily rollups" ON public.practice_log_daily_rollups
+    FOR SELECT USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can view their own word rollups" ON public.practice_log_word_rollups
+    FOR SELECT USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can view their own attempt rollups" ON public.practice_log_attempt_rollups
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- The latest safe cutoff at or before p_before: active logs, provisional logs (still to be re-graded)
+-- and the log user_state points at are never compacted, and neither is anything after them.
+CREATE OR REPLACE FUNCTION public.compaction_cutoff(p_user_id UUID, p_before TIMESTAMPTZ)
+RETURNS TIMESTAMPTZ
+LANGUAGE sql STABLE
+AS $$
+    SELECT LEAST(
+        p_before,
+        (SELECT MIN(created_at) FROM public.practice_logs WHERE user_id = p_user_id AND status = 'active'),
+        (SELECT MIN(created_at) FROM public.practice_logs WHERE provisional AND user_id = p_user_id),
+        (SELECT l.created_at FROM public.user_state s
+         JOIN public.practice_logs l ON l.id = s.current_log_id
+         WHERE s.user_id = p_user_id)
+    );
+$$;
+
+-- Up to p_limit users with logs before their cutoff.
+CREATE OR REPLACE FUNCTION public.compaction_candidates(p_before TIMESTAMPTZ, p_limit INTEGER)
+RETURNS TABLE (user_id UUID)
+LANGUAGE sql STABLE
+AS $$
+    SELECT s.user_id
+    FROM public.user_state s
+    WHERE EXISTS (
+        SELECT 1 FROM public.practice_logs l
+        WHERE l.user_id = s.user_id AND l.created_at < public.compaction_cutoff(s.user_id, p_before)
+    )
+    LIMIT p_limit;
+$$;
+
+-- Fold the user's logs before their cutoff into the rollups and delete them, in one transaction.
+-- Runs under the lock on the user's user_state row, like the word session procedures.
+-- Returns {"compacted": <number of logs>, "compacted_before": <cutoff>}.
+CREATE OR REPLACE FUNCTION public.compact_practice_logs(p_user_id UUID, p_before TIMESTAMPTZ)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_cutoff TIMESTAMPTZ;
+    v_count INTEGER;
+BEGIN
+    INSERT INTO public.user_state (user_id) VALUES (p_user_id) ON CONFLICT (user_id) DO NOTHING;
+    PERFORM 1 FROM public.user_state WHERE user_id = p_user_id FOR UPDATE;
+    v_cutoff := public.compaction_cutoff(p_user_id, p_before);
+
+    WITH moved AS (
+        DELETE FROM public.practice_logs
+        WHERE user_id = p_user_id AND created_at < v_cutoff
+        RETURNING *, (created_at AT TIME ZONE 'UTC')::DATE AS day,
+            (status = 'completed' AND score IS NOT NULL) AS graded
+    ), days AS (
+        INSERT INTO public.practice_log_daily_rollups AS r (user_id, day, completed, resigned, score_sum)
+        SELECT p_user_id, day,
+            COUNT(*) FILTER (WHERE graded),
+            COUNT(*) FILTER (WHERE status = 'resigned'),
+            COALESCE(SUM(score) FILTER (WHERE graded), 0)
+        FROM moved
+        GROUP BY day
+        ON CONFLICT (user_id, day) DO UPDATE
+        SET completed = r.completed + EXCLUDED.completed,
+            resigned = r.resigned + EXCLUDED.resigned,
+            score_sum = r.score_sum + EXCLUDED.score_sum
+    ), words AS (
+        INSERT INTO public.practice_log_word_rollups AS r (
+            user_id, word, difficulty, completed, resigned, score_sum, first_day, last_day
+        )
+        SELECT p_user_id, word, difficulty,
+            COUNT(*) FILTER (WHERE graded),
+            COUNT(*) FILTER (WHERE status = 'resigned'),
+            COALESCE(SUM(score) FILTER (WHERE graded), 0),
+            MIN(day), MAX(day)
+        FROM moved
+        GROUP BY word, difficulty
+        ON CONFLICT (user_id, word, difficulty) DO UPDATE
+        SET completed = r.completed + EXCLUDED.completed,
+            resigned = r.resigned + EXCLUDED.resigned,
+            score_sum = r.score_sum + EXCLUDED.score_sum,
+            first_day = LEAST(r.first_day, EXCLUDED.first_day),
+            last_day = GREATEST(r.last_day, EXCLUDED.last_day)
+    ), attempts AS (
+        -- Every statement in this WITH sees the word rollups as they were before it, i.e. the
+        -- attempts compacted by earlier runs, which all came before the moved logs
+        INSERT INTO public.practice_log_attempt_rollups AS r (user_id, attempt, difficulty, samples, score_sum)
+        SELECT p_user_id, attempt, difficulty, COUNT(*), SUM(score)
+        FROM (
+            SELECT m.difficulty, m.score,
+                COALESCE((
+                    SELECT SUM(w.completed) FROM public.practice_log_word_rollups w
+                    WHERE w.user_id = p_user_id AND w.word = m.word
+                ), 0) + ROW_NUMBER() OVER (PARTITION BY m.word ORDER BY m.created_at, m.id) AS attempt
+            FROM moved m
+            WHERE m.graded
+        ) numbered
+        GROUP BY attempt, difficulty
+        ON CONFLICT (user_id, attempt, difficulty) DO UPDATE
+        SET samples = r.samples + EXCLUDED.samples,
+            score_sum = r.score_sum + EXCLUDED.score_sum
+    )
+    SELECT COUNT(*) INTO v_count FROM moved;
+
+    IF v_count > 0 THEN
+        UPDATE public.user_state
+        SET compacted_before = GREATEST(COALESCE(compacted_before, v_cutoff), v_cutoff)
+        WHERE user_id = p_user_id;
+    END IF;
+
+    RETURN jsonb_build_object('compacted', v_count, 'compacted_before', v_cutoff);
+END;
+$$;
+
+-- Compacted history of several users:
+-- {user_id: {"compacted_before", "words": [{"word", "difficulty", "completed", "score_sum"}],
+--            "attempts": [{"attempt", "difficulty", "samples", "score_sum"}]}}.
+-- Users with nothing compacted are left out.
+CREATE OR REPLACE FUNCTION public.fetch_log_rollups(p_user_ids UUID[])
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+    SELECT COALESCE(jsonb_object_agg(s.user_id, jsonb_build_object(
+        'compacted_before', s.compacted_before,
+        'words', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'word', w.word, 'difficulty', w.difficulty, 'completed', w.completed, 'score_sum', w.score_sum
+            ) ORDER BY w.first_day, w.word, w.difficulty)
+            FROM public.practice_log_word_rollups w
+            WHERE w.user_id = s.user_id
+        ), '[]'::JSONB),
+        'attempts', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'attempt', a.attempt, 'difficulty', a.difficulty, 'samples', a.samples, 'score_sum', a.score_sum
+            ) ORDER BY a.attempt, a.difficulty)
+            FROM public.practice_log_attempt_rollups a
+            WHERE a.user_id = s.user_id
+        ), '[]'::JSONB)
+    )), '{}'::JSONB)
+    FROM public.user_state s
+    WHERE s.user_id = ANY(p_user_ids) AND s.compacted_before IS NOT NULL;
+$$;
+
+-- Leases that let one process at a time run a background loop (app/services/leases.py): re-grading
+-- and compaction. Only the service role touches them, so RLS is on without policies.
+CREATE TABLE public.background_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+ALTER TABLE public.background_leases ENABLE ROW LEVEL SECURITY;
+
+-- Take the lease, or extend it when p_holder already has it, for p_seconds. False while another
+-- holder's lease has not expired.
+CREATE OR REPLACE FUNCTION public.acquire_lease(p_name TEXT, p_holder TEXT, p_seconds DOUBLE PRECISION)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+    WITH acquired AS (
+        INSERT INTO public.background_leases AS l (name, holder, expires_at)
+        VALUES (p_name, p_holder, now() + make_interval(secs => p_seconds))
+        ON CONFLICT (name) DO UPDATE
+            SET holder = EXCLUDED.holder, expires_at = EXCLUDED.expires_at
+            WHERE l.holder = EXCLUDED.holder OR l.expires_at < now()
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM acquired);
+$$;
+
+-- Give the lease up (on shutdown), so another process takes over without waiting for it to expire.
+CREATE OR REPLACE FUNCTION public.release_lease(p_name TEXT, p_holder TEXT)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    DELETE FROM public.background_leases WHERE name = p_name AND holder = p_holder;
+$$;